@@ -0,0 +1,65 @@
+import os
+
+import pandas as pd
+
+from app.locales import LOCALE_DEFINITIONS, get_locale_tables
+from app.takeout_source import DEFAULT_SCAN_WORKERS
+
+CATALOG_COLUMNS = ('path', 'relative_path', 'product', 'kind', 'format', 'size', 'mtime')
+
+
+def classify_file(relative_parts, locale_tables):
+    """
+    Return the (product, kind) of a takeout file from its path parts
+    relative to the takeout root. The product is the top folder of the
+    file, or for activity logs the product folder under the activity
+    root. The kind is 'activity_log', 'calendar', the name of a known
+    path of the locale (e.g. 'profile_json') or 'other'.
+    """
+    paths = locale_tables.paths
+    parts = tuple(relative_parts)
+    product = parts[0] if len(parts) > 1 else None
+    activity_root = paths['activity_root']
+    if (len(parts) == len(activity_root) + 2 and parts[:-2] == activity_root
+            and parts[-1] == locale_tables.activity_log_name):
+        return parts[-2], 'activity_log'
+    if parts[:-1] == paths['calendar'] and parts[-1].lower().endswith('.ics'):
+        return product, 'calendar'
+    for name, known_parts in paths.items():
+        if parts == known_parts:
+            return product, name
+    return product, 'other'
+
+
+def is_parsed_file(relative_path):
+    """
+    Return True if a '/'-separated path relative to the takeout root is a
+    file the pipeline parses in one of the supported locales.
+    """
+    parts = relative_path.split('/')
+    return any(
+        classify_file(parts, get_locale_tables(code))[1] != 'other' for code in LOCALE_DEFINITIONS
+    )
+
+
+def scan_takeout(source, takeout_path, lang, max_workers=DEFAULT_SCAN_WORKERS):
+    """
+    Catalog every file of a takeout, read through a takeout source (see
+    app.takeout_source): extracted trees are scanned with parallel
+    os.scandir, archives are listed from their index. Returns a DataFrame
+    with the CATALOG_COLUMNS, one row per file, sorted by path.
+    """
+    locale_tables = get_locale_tables(lang)
+    rows = []
+    for path, size, mtime in source.scan(takeout_path, max_workers):
+        parts = os.path.relpath(path, takeout_path).split(os.sep)
+        product, kind = classify_file(parts, locale_tables)
+        file_format = os.path.splitext(parts[-1])[1].lstrip('.').lower()
+        rows.append((path, '/'.join(parts), product, kind, file_format, size, mtime))
+    return pd.DataFrame(rows, columns=list(CATALOG_COLUMNS)).astype({'size': 'int64', 'mtime': 'float64'})
+
+
+def catalog_activity_logs(catalog):
+    """Return the paths of the activity logs of a catalog, largest first."""
+    logs = catalog[catalog['kind'] == 'activity_log']
+    return logs.sort_values(['size', 'path'], ascending=[False, True])['path'].tolist()
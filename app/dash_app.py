@@ -35,6 +35,7 @@ def init_dash_app(server, pathname, takeout_processor):
     )
 
     takeout_processor = takeout_processor
+    date_range = takeout_processor.run_query('activity_date_range')
     container_style = {
         'backgroundColor': CONFIG["background"]["paper_bgcolor"],
         'padding': '20px',
@@ -55,7 +56,7 @@ def init_dash_app(server, pathname, takeout_processor):
                         html.Div(
                             [
                                 html.H1(
-                                    f"Welcome, {takeout_processor.query_data('SELECT MAX(FormattedName) as name FROM clean_profiles')['name'].iloc[0]}",
+                                    f"Welcome, {takeout_processor.run_query('profile_name')['name'].iloc[0]}",
                                     className="text-center",
                                     style={"color": CONFIG["font"]["color"], "fontSize": "1.8rem", "fontWeight": "600"}
                                 ),
@@ -83,9 +84,7 @@ def init_dash_app(server, pathname, takeout_processor):
                             id="platform-filter",
                             options=[
                                 {"label": platform, "value": platform}
-                                for platform in takeout_processor.query_data(
-                                    "SELECT DISTINCT platform FROM clean_activity_history"
-                                )["platform"]
+                                for platform in takeout_processor.run_query('activity_platforms')["platform"]
                             ],
                             placeholder="Select Platform",
                             multi=True,
@@ -96,8 +95,8 @@ def init_dash_app(server, pathname, takeout_processor):
                     dbc.Col(
                         dcc.DatePickerRange(
                             id="date-filter",
-                            start_date=takeout_processor.query_data("SELECT MIN(activity_timestamp) AS start FROM clean_activity_history")["start"].iloc[0],
-                            end_date=takeout_processor.query_data("SELECT MAX(activity_timestamp) AS end FROM clean_activity_history")["end"].iloc[0],
+                            start_date=date_range["start"].iloc[0],
+                            end_date=date_range["end"].iloc[0],
                             display_format="YYYY-MM-DD",
                             style={"marginBottom": "1rem"}
                         ),
@@ -156,15 +155,9 @@ def init_dash_app(server, pathname, takeout_processor):
     )
     def update_kpi(platform_filter, start_date, end_date):
         """Update KPI metrics based on filters."""
-        query = f"""
-        SELECT platform, COUNT(*) AS count 
-        FROM clean_activity_history 
-        WHERE activity_timestamp BETWEEN '{start_date}' AND '{end_date}'
-        """
-        if platform_filter:
-            query += f" AND platform IN ({', '.join([f"'{p}'" for p in platform_filter])})"
-        query += " GROUP BY platform ORDER BY count DESC"
-        df_kpi = takeout_processor.query_data(query)
+        df_kpi = takeout_processor.run_activity_query(
+            'kpi_by_platform', platform_filter, start_date, end_date
+        )
         total_count = df_kpi["count"].sum()
         rows = generate_dynamic_rows_kpi(df_kpi)
         return total_count, rows
@@ -175,22 +168,9 @@ def init_dash_app(server, pathname, takeout_processor):
     )
     def update_chart1(platform_filter, start_date, end_date):
         """Update Chart 1 based on filters."""
-        query = f"""
-        SELECT 
-            YEAR(activity_timestamp) AS period_year,
-            MONTH(activity_timestamp) AS month_no,
-            CONCAT(YEAR(activity_timestamp), '-', MONTH(activity_timestamp)) AS period,
-            COUNT(*) AS count
-        FROM clean_activity_history
-        WHERE activity_timestamp BETWEEN '{start_date}' AND '{end_date}'
-        """
-        if platform_filter:
-            query += f" AND platform IN ({', '.join([f"'{p}'" for p in platform_filter])})"
-        query += """
-        GROUP BY 1, 2
-        ORDER BY period_year ASC, month_no ASC
-        """
-        filtered_df = takeout_processor.query_data(query)
+        filtered_df = takeout_processor.run_activity_query(
+            'monthly_timeline', platform_filter, start_date, end_date
+        )
         return create_custom_chart(
             filtered_df,
             x_col='period',
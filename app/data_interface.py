@@ -1,10 +1,16 @@
 import os
 import json
+import hashlib
+import time
+import uuid
+import threading
 import mmap
 import pathlib
 import itertools
+from contextlib import contextmanager
 from datetime import datetime
 from multiprocessing import Pool
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
 import pandas as pd
 from bs4 import BeautifulSoup, SoupStrainer
@@ -16,15 +22,43 @@ import locale
 import duckdb
 import csv
 import app.data_preprocessor as dp
+from app.fingerprints import fingerprint_files
+from app.locales import get_locale_tables, detect_locale
+from app.takeout_source import open_source
+from app.catalog import scan_takeout, catalog_activity_logs, is_parsed_file
+from app.query_cache import QueryResultCache
+from app.queries import get_query, route_activity_query, ROLLUP_TABLES
+from app.query_executor import QueryExecutor, DASHBOARD, ADHOC
+from app.query_results import (
+    prepare_user_query, paged_query, is_pageable, encode_page_token, decode_page_token,
+    clamp_page_size, limit_batches, STREAM_BATCH_SIZE, MAX_RESULT_ROWS,
+)
+
+MANIFEST_TABLE = "ingest_manifest"
+# Manifest entry of a stage standing for what its tables depend on besides
+# its source files (see GoogleTakeoutProcessor.stage_settings_digest).
+STAGE_SETTINGS_ENTRY = "<stage settings>"
+CATALOG_TABLE = "takeout_catalog"
+DEFAULT_POOL_SIZE = 8
+DEFAULT_POOL_TIMEOUT = 30
+HEALTH_CHECK_INTERVAL = 30
+# Instance-wide limits of the read-only query connection, so a runaway
+# ad-hoc query cannot take all memory and cores from the dashboard.
+DEFAULT_QUERY_MEMORY_LIMIT = "2GB"
+DEFAULT_QUERY_THREADS = max(1, (os.cpu_count() or 2) // 2)
+DEFAULT_QUERY_TIME_LIMIT = 60
+MAX_QUERY_TIME_LIMIT = 600
+INTERRUPT_RETRY_INTERVAL = 0.05
+DEFAULT_MAPPING_WORKERS = 4
 
 
 class DuckDBInterface:
     """Handles DuckDB database connections and operations."""
 
     @staticmethod
-    def create_connection(db_file, read_only=False):
-        """Create and return a DuckDB connection."""
-        return duckdb.connect(database=db_file, read_only=read_only)
+    def create_connection(db_file, read_only=False, config=None):
+        """Create and return a DuckDB connection, with optional DuckDB settings."""
+        return duckdb.connect(database=db_file, read_only=read_only, config=config or {})
 
     @staticmethod
     def query_data(db_file, query):
@@ -42,35 +76,369 @@ class DuckDBInterface:
         return db_file
 
     @staticmethod
-    def create_raw_view(db_file, file_path, table_name):
-        """Create or replace a raw view in the database."""
+    def list_tables(db_file):
+        """Return the names of all tables in the database."""
         conn = DuckDBInterface.create_connection(db_file, read_only=False)
-        view_name = f"raw_{table_name}"
         try:
-            if file_path.endswith('.csv'):
-                conn.execute(f"CREATE OR REPLACE VIEW {view_name} AS SELECT * FROM read_csv_auto('{file_path}')")
-            elif file_path.endswith('.json'):
-                conn.execute(f"CREATE OR REPLACE VIEW {view_name} AS SELECT * FROM read_json_auto('{file_path}')")
-            elif file_path.endswith('.xml'):
-                conn.execute(f"CREATE OR REPLACE VIEW {view_name} AS SELECT * FROM read_xml_auto('{file_path}')")
-            else:
-                raise ValueError(f"Unsupported file type for {file_path}")
+            rows = conn.execute("SELECT table_name FROM information_schema.tables").fetchall()
+        finally:
+            conn.close()
+        return {row[0] for row in rows}
+
+    @staticmethod
+    def load_manifest(db_file):
+        """
+        Return the ingest manifest as {stage_id: {source_path: (size, mtime, content_hash)}},
+        creating the manifest table if needed.
+        """
+        conn = DuckDBInterface.create_connection(db_file, read_only=False)
+        try:
+            conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS {MANIFEST_TABLE} (
+                    stage_id VARCHAR,
+                    source_path VARCHAR,
+                    size BIGINT,
+                    mtime DOUBLE,
+                    content_hash VARCHAR,
+                    ingested_at TIMESTAMP DEFAULT current_timestamp
+                )
+            """)
+            rows = conn.execute(
+                f"SELECT stage_id, source_path, size, mtime, content_hash FROM {MANIFEST_TABLE}"
+            ).fetchall()
         finally:
             conn.close()
+        manifest = {}
+        for stage_id, source_path, size, mtime, content_hash in rows:
+            manifest.setdefault(stage_id, {})[source_path] = (size, mtime, content_hash)
+        return manifest
 
     @staticmethod
-    def create_table_from_mapping(db_file, mapping_path):
-        """Execute a SQL script from a mapping file."""
+    def save_manifest(db_file, stage_fingerprints):
+        """Replace the manifest rows of the given stages with new fingerprints."""
         conn = DuckDBInterface.create_connection(db_file, read_only=False)
         try:
-            with open(mapping_path, 'r') as file:
-                script = file.read().strip()
-                if not script:
-                    raise ValueError("Mapping file is empty or only contains whitespace.")
-            conn.execute(script)
+            for stage_id, fingerprints in stage_fingerprints.items():
+                conn.execute(f"DELETE FROM {MANIFEST_TABLE} WHERE stage_id = ?", [stage_id])
+                conn.executemany(
+                    f"INSERT INTO {MANIFEST_TABLE} (stage_id, source_path, size, mtime, content_hash) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    [(stage_id, path, *fingerprint) for path, fingerprint in fingerprints.items()]
+                )
         finally:
             conn.close()
 
+    @staticmethod
+    def save_catalog(db_file, catalog):
+        """Replace the takeout catalog table with a scanned catalog (see app.catalog)."""
+        conn = DuckDBInterface.create_connection(db_file, read_only=False)
+        try:
+            conn.register('scanned_catalog', catalog)
+            conn.execute(f"CREATE OR REPLACE TABLE {CATALOG_TABLE} AS SELECT * FROM scanned_catalog")
+        finally:
+            conn.close()
+
+    @staticmethod
+    def create_raw_view(db_file, file_path, table_name, conn=None):
+        """
+        Create or replace a raw view in the database. Runs on `conn` when
+        given, otherwise on a new connection to db_file.
+        """
+        view_name = f"raw_{table_name}"
+        if file_path.endswith('.csv'):
+            statement = f"CREATE OR REPLACE VIEW {view_name} AS SELECT * FROM read_csv_auto('{file_path}')"
+        elif file_path.endswith('.json'):
+            statement = f"CREATE OR REPLACE VIEW {view_name} AS SELECT * FROM read_json_auto('{file_path}')"
+        elif file_path.endswith('.xml'):
+            statement = f"CREATE OR REPLACE VIEW {view_name} AS SELECT * FROM read_xml_auto('{file_path}')"
+        elif file_path.endswith('.parquet'):
+            statement = f"CREATE OR REPLACE VIEW {view_name} AS SELECT * FROM read_parquet('{file_path}')"
+        else:
+            raise ValueError(f"Unsupported file type for {file_path}")
+        with DuckDBInterface.writer(db_file, conn) as writer:
+            writer.execute(statement)
+
+    @staticmethod
+    def create_table_from_mapping(db_file, mapping_path, frames=None, table=None, sort_by=None,
+                                  enums=None, conn=None):
+        """
+        Execute a SQL script from a mapping file. Optional in-memory frames
+        (pandas DataFrames or Arrow tables, keyed by view name) are registered
+        on the connection first, so the script scans them without any text
+        serialization. When a sort key is given, the created table is then
+        rewritten in that order so its row groups' min/max zone maps stay
+        narrow and range filters on the key can skip whole row groups.
+        Columns listed in `enums` are converted to ENUMs first.
+        Runs on `conn` when given, otherwise on a new connection to db_file.
+        """
+        with open(mapping_path, 'r') as file:
+            script = file.read().strip()
+            if not script:
+                raise ValueError("Mapping file is empty or only contains whitespace.")
+        with DuckDBInterface.writer(db_file, conn) as writer:
+            for view_name, frame in (frames or {}).items():
+                writer.register(view_name, frame)
+            writer.execute(script)
+            if enums:
+                DuckDBInterface.encode_enums(writer, table, enums)
+            if sort_by:
+                DuckDBInterface.sort_table(writer, table, sort_by)
+
+    @staticmethod
+    @contextmanager
+    def writer(db_file, conn=None):
+        """Yield `conn` as is, or a new write connection closed after the block."""
+        if conn is not None:
+            yield conn
+            return
+        conn = DuckDBInterface.create_connection(db_file, read_only=False)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def encode_enums(conn, table, columns):
+        """
+        Convert string columns of a table to ENUMs of their observed values,
+        in sorted order so ENUM comparisons and ORDER BY match the strings.
+        Columns that already are ENUMs (scanned from pandas Categoricals)
+        or have no values at all (e.g. an empty table; DuckDB has no empty
+        ENUM) are left as they are.
+        """
+        types = dict(conn.execute(
+            "SELECT column_name, data_type FROM information_schema.columns WHERE table_name = ?",
+            [table]
+        ).fetchall())
+        for column in columns:
+            if types[column].startswith('ENUM'):
+                continue
+            values = [row[0] for row in conn.execute(
+                f'SELECT DISTINCT "{column}" FROM "{table}" WHERE "{column}" IS NOT NULL ORDER BY 1'
+            ).fetchall()]
+            if not values:
+                continue
+            labels = ', '.join("'" + value.replace("'", "''") + "'" for value in values)
+            conn.execute(f'ALTER TABLE "{table}" ALTER COLUMN "{column}" TYPE ENUM({labels})')
+
+    @staticmethod
+    def sort_table(conn, table, sort_by):
+        """Rewrite a table ordered by the given columns."""
+        order = ', '.join(f'"{column}"' for column in sort_by)
+        conn.execute(f'CREATE OR REPLACE TABLE "{table}" AS SELECT * FROM "{table}" ORDER BY {order}')
+
+
+class QueryCancelledError(RuntimeError):
+    """Raised when an in-flight query is cancelled through its query id."""
+
+
+class DuckDBConnectionPool:
+    """
+    Pooled read-only access to a DuckDB file.
+
+    A single long-lived read-only connection is opened lazily; each thread
+    gets its own cursor off that connection, reused across queries. At most
+    pool_size cursors run queries at the same time. Cursors are health
+    checked when they have been idle for a while, and close() shuts
+    everything down; the pool reopens on the next query, so it can be
+    closed while the database is being rewritten.
+
+    Queries can be given a wall-clock time limit and a query id; running
+    queries are interrupted when their limit expires or when cancel() is
+    called with their id.
+    """
+
+    def __init__(self, db_file, pool_size=DEFAULT_POOL_SIZE, timeout=DEFAULT_POOL_TIMEOUT,
+                 health_check_interval=HEALTH_CHECK_INTERVAL,
+                 memory_limit=DEFAULT_QUERY_MEMORY_LIMIT, threads=DEFAULT_QUERY_THREADS):
+        """
+        :param db_file: Path to the DuckDB database file.
+        :param pool_size: Maximum number of concurrently used cursors.
+        :param timeout: Seconds to wait for a free cursor before giving up.
+        :param health_check_interval: Idle seconds after which a cursor is
+                                      checked with 'SELECT 1' before reuse.
+        :param memory_limit: DuckDB memory_limit of the query connection
+                             (None: DuckDB default).
+        :param threads: DuckDB worker threads of the query connection
+                        (None: DuckDB default, one per core).
+        """
+        self.db_file = db_file
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        # memory_limit and threads are instance-wide in DuckDB, so they are
+        # set once on the shared connection rather than per cursor.
+        self.settings = {
+            key: str(value) for key, value in
+            (('memory_limit', memory_limit), ('threads', threads)) if value is not None
+        }
+        self._running = {}
+        self._slots = threading.BoundedSemaphore(pool_size)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._connection = None
+        self._cursors = {}
+        self._generation = 0
+
+    def _get_connection(self):
+        with self._lock:
+            if self._connection is None:
+                self._connection = DuckDBInterface.create_connection(
+                    self.db_file, read_only=True, config=self.settings
+                )
+            return self._connection
+
+    def _new_cursor(self):
+        cursor = self._get_connection().cursor()
+        with self._lock:
+            # Request threads come and go: drop cursors of finished threads.
+            finished = [thread for thread in self._cursors if not thread.is_alive()]
+            stale = [self._cursors.pop(thread) for thread in finished]
+            self._cursors[threading.current_thread()] = cursor
+        for old_cursor in stale:
+            try:
+                old_cursor.close()
+            except duckdb.Error:
+                pass
+        self._local.cursor = cursor
+        self._local.generation = self._generation
+        self._local.last_used = time.monotonic()
+        return cursor
+
+    def _discard_cursor(self, cursor):
+        with self._lock:
+            self._cursors.pop(threading.current_thread(), None)
+        try:
+            cursor.close()
+        except duckdb.Error:
+            pass
+        self._local.cursor = None
+
+    @staticmethod
+    def _is_healthy(cursor):
+        try:
+            cursor.execute("SELECT 1").fetchone()
+            return True
+        except duckdb.Error:
+            return False
+
+    def _thread_cursor(self):
+        cursor = getattr(self._local, 'cursor', None)
+        if cursor is not None and self._local.generation != self._generation:
+            # The pool was closed since this cursor was created.
+            cursor = None
+        if cursor is None:
+            return self._new_cursor()
+        if time.monotonic() - self._local.last_used > self.health_check_interval:
+            if not self._is_healthy(cursor):
+                self._discard_cursor(cursor)
+                return self._new_cursor()
+        return cursor
+
+    @contextmanager
+    def cursor(self, query_id=None, time_limit=None):
+        """
+        Check out the calling thread's cursor for the duration of a block.
+
+        :param query_id: Id under which the running query can be cancelled.
+        :param time_limit: Seconds after which the running query is
+                           interrupted; the block then raises TimeoutError.
+        """
+        if not self._slots.acquire(timeout=self.timeout):
+            raise TimeoutError(f"No free DuckDB cursor after {self.timeout} seconds")
+        try:
+            cursor = self._thread_cursor()
+            with self._interruptible(cursor, query_id, time_limit):
+                yield cursor
+            self._local.last_used = time.monotonic()
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def _interruptible(self, cursor, query_id, time_limit):
+        if query_id is None and time_limit is None:
+            yield
+            return
+        key = query_id if query_id is not None else object()
+        run = {'cursor': cursor, 'reason': None}
+        with self._lock:
+            if key in self._running:
+                raise ValueError(f"Query id already running: {query_id}")
+            self._running[key] = run
+        timer = None
+        if time_limit is not None:
+            timer = threading.Timer(time_limit, self._interrupt, (key, 'timeout'))
+            timer.daemon = True
+            timer.start()
+        try:
+            yield
+        except (duckdb.InterruptException, OSError):
+            # Streamed results surface the interrupt through pyarrow, as
+            # "OSError: INTERRUPT Error: Interrupted!".
+            if run['reason'] == 'timeout':
+                raise TimeoutError(f"Query exceeded its time limit of {time_limit} seconds") from None
+            if run['reason'] == 'cancelled':
+                raise QueryCancelledError(f"Query {query_id} was cancelled") from None
+            raise
+        finally:
+            if timer is not None:
+                timer.cancel()
+            with self._lock:
+                self._running.pop(key, None)
+
+    def _interrupt(self, key, reason):
+        with self._lock:
+            run = self._running.get(key)
+            if run is None:
+                return False
+            run['reason'] = reason
+            run['cursor'].interrupt()
+        # An interrupt that lands before DuckDB starts the query is reset
+        # by it, so keep interrupting until the run is over.
+        retry = threading.Timer(INTERRUPT_RETRY_INTERVAL, self._interrupt, (key, reason))
+        retry.daemon = True
+        retry.start()
+        return True
+
+    def cancel(self, query_id):
+        """Interrupt the running query with this id. Returns False if none is running."""
+        return self._interrupt(query_id, 'cancelled')
+
+    def query_data(self, query, params=None, query_id=None, time_limit=None):
+        """Execute a query on a pooled cursor and return the result as a DataFrame."""
+        with self.cursor(query_id, time_limit) as cursor:
+            return cursor.execute(query, params).df()
+
+    def stream_batches(self, query, params=None, batch_size=STREAM_BATCH_SIZE,
+                       query_id=None, time_limit=None):
+        """
+        Generator yielding the result schema first, then the query result as
+        Arrow record batches of `batch_size` rows. The pooled cursor stays
+        checked out until the generator is exhausted or closed, and the time
+        limit covers the whole stream: an interrupt while batches are being
+        fetched raises TimeoutError or QueryCancelledError from the generator.
+        """
+        with self.cursor(query_id, time_limit) as cursor:
+            result = cursor.execute(query, params)
+            # fetch_record_batch was renamed to_arrow_reader in newer DuckDB releases.
+            reader = getattr(result, 'to_arrow_reader', result.fetch_record_batch)(batch_size)
+            yield reader.schema
+            yield from reader
+
+    def close(self):
+        """Close every cursor and the shared connection."""
+        with self._lock:
+            cursors, self._cursors = self._cursors, {}
+            connection, self._connection = self._connection, None
+            self._generation += 1
+        for cursor in cursors.values():
+            try:
+                cursor.close()
+            except duckdb.Error:
+                pass
+        if connection is not None:
+            connection.close()
+
 
 class GoogleTakeoutProcessor:
     """
@@ -79,67 +447,307 @@ class GoogleTakeoutProcessor:
     parsing and preparing data prior to DB ingestion.
     """
 
-    def __init__(self, takeout_path, data_output_folder, reset_db=True):
+    def __init__(self, takeout_path, data_output_folder, reset_db=True, staging_format=None,
+                 language_code=None):
+        """
+        :param takeout_path: Root folder of the extracted Google Takeout, or
+                             one of its .zip/.tgz archives, read in place
+                             together with the other parts of the export.
+        :param data_output_folder: Folder holding the DuckDB file and staging files.
+        :param reset_db: Delete the existing DuckDB file before ingesting. When
+                         False, only sources that changed since the last run
+                         (according to the ingest manifest) are re-parsed.
+        :param staging_format: None to register parsed datasets straight into
+                               DuckDB, or 'parquet' to persist them as Parquet
+                               staging files that the mappings read from.
+        :param language_code: Locale of the takeout (see app.locales). Detected
+                              from its folder names when None.
+        """
+        if staging_format not in (None, 'parquet'):
+            raise ValueError(f"Unsupported staging format: {staging_format}")
         self.takeout_path = takeout_path
         self.data_output_folder = data_output_folder
+        self.staging_format = staging_format
         self.db_file = DuckDBInterface.setup_database(
             os.path.join(data_output_folder, 'my_duckdb.duckdb'), 
             reset=reset_db
         )
+        self.connection_pool = DuckDBConnectionPool(self.db_file)
+        self.query_cache = QueryResultCache()
+        # Worker threads running dashboard and ad-hoc queries off the
+        # request threads; running jobs are cancelled through the pool.
+        self.query_executor = QueryExecutor(interrupt=self.connection_pool.cancel)
 
-        self.paths = {
-            "activity_root": os.path.join(self.takeout_path, "Mi actividad"),
-            "profile_json": os.path.join(self.takeout_path, "Perfil", "Perfil.json"),
-            "subscriptions_csv": os.path.join(
-                self.takeout_path, "YouTube y YouTube Music", "suscripciones", "suscripciones.csv"
-            ),
-            "video_metadata_csv": os.path.join(
-                self.takeout_path, "YouTube y YouTube Music", "metadatos del vídeo", "vídeos.csv"
-            ),
-            "playlists_csv": os.path.join(
-                self.takeout_path, "YouTube y YouTube Music", "listas de reproducción", "Listas de reproducción.csv"
-            ),
-            "calendar": os.path.join(self.takeout_path, "Calendar"),
-            "access_logs_csv": os.path.join(
-                self.takeout_path, "Actividad de registro de accesos", 
-                "Actividades_ una lista con los servicios de Google.csv"
-            ),
-        }
+        # Parsed files of .tgz takeouts are kept in memory while indexing
+        # (reaching a tar member means inflating its part up to it).
+        self.source = open_source(takeout_path, spool=is_parsed_file)
+        self.language_code = language_code or detect_locale(takeout_path, self.source.exists)
+        locale_tables = get_locale_tables(self.language_code)
+        self.paths = locale_tables.resolve_paths(self.takeout_path)
 
-        self.activity_logs = [
-            os.path.join(self.paths["activity_root"], "Drive", "MiActividad.html"),
-            os.path.join(self.paths["activity_root"], "Takeout", "MiActividad.html"),
-            os.path.join(self.paths["activity_root"], "YouTube", "MiActividad.html"),
-        ]
+        # Every file of the takeout, classified by product and kind; the
+        # activity logs of all products are parsed, largest first.
+        self.catalog = scan_takeout(self.source, self.takeout_path, self.language_code)
+        self.activity_logs = catalog_activity_logs(self.catalog)
 
         self.data_preprocessor = dp.DataPreprocessor(
             html_chunk_factor=4,
             max_threads=8,
             calendar_path=self.paths["calendar"],
             profile_path=self.paths["profile_json"],
-            activity_log_paths=self.activity_logs
+            activity_log_paths=self.activity_logs,
+            output_folder=self.data_output_folder,
+            lang=self.language_code,
+            source=self.source
         )
-        for filename, content in self.data_preprocessor.load_all_datasets().items():
-            content.to_csv(os.path.join(data_output_folder, filename+'.csv',), index=False)
-        
-        self.run_mapping(os.path.join('config', 'mapping.json'))
+        self.datasets = {}
+        # Parse errors of the datasets that failed to load, by name.
+        self.dataset_errors = {}
+        self.rollups_ready = False
+        self.ingest(os.path.join('config', 'mapping.json'), self.language_code)
+
+    def stage_sources(self, cfg):
+        """
+        Return the files a mapping stage depends on: its SQL mapping plus
+        either the sources of its parsed dataset or its raw input file
+        (derived stages only read other stages' tables).
+        """
+        if cfg['dataset']:
+            sources = self.data_preprocessor.dataset_sources(cfg['dataset'])
+        elif not cfg['file_path']:
+            sources = []
+        else:
+            sources = [cfg['file_path']] if self.source.isfile(cfg['file_path']) else []
+        return [cfg['mapping_path']] + sources
+
+    def stage_settings_digest(self, cfg):
+        """
+        Return a digest of what a stage builds its tables from besides its
+        source files: the text of its SQL mapping, its table options, the
+        takeout locale and, for stages parsed in Python, PARSER_VERSION.
+        The SQL text is always hashed, even when the mapping file kept its
+        size and mtime.
+        """
+        with open(cfg['mapping_path'], 'rb') as file:
+            sql = file.read()
+        parsed = bool(cfg['dataset'] or cfg['reader'])
+        settings = {
+            'parser_version': dp.PARSER_VERSION if parsed else None,
+            'lang': self.language_code,
+            'tables': cfg['tables'],
+            'sort_by': cfg['sort_by'],
+            'enums': cfg['enums'],
+            'reader': cfg['reader'],
+        }
+        digest = hashlib.blake2b(json.dumps(settings, sort_keys=True).encode(), digest_size=20)
+        digest.update(sql)
+        return digest.hexdigest()
 
-    def run_mapping(self, config_path, language_code='es'):
+    def find_stale_stages(self, config, manifest):
+        """
+        Fingerprint the sources of every enabled stage and compare them with
+        the manifest. Returns (stale stage ids, {stage_id: fingerprints}).
+        A stage is stale when any of its sources was added, removed or had
+        its content changed, when its settings (SQL text, options, locale or
+        parser version) changed, when it has inputs but one of its tables is
+        missing, or when a stage it depends on is stale.
+        """
+        tables = DuckDBInterface.list_tables(self.db_file)
+        stale, fingerprints = [], {}
+        for key, cfg in config.items():
+            if not cfg['enabled']:
+                continue
+            known = manifest.get(key, {})
+            sources = self.stage_sources(cfg)
+            fingerprints[key] = fingerprint_files(sources, known, self.source)
+            fingerprints[key][STAGE_SETTINGS_ENTRY] = (0, 0.0, self.stage_settings_digest(cfg))
+            has_inputs = len(sources) > 1 or bool(cfg['depends_on'])
+            unchanged = (
+                (set(cfg['tables']) <= tables or not has_inputs)
+                and fingerprints[key].keys() == known.keys()
+                and all(fp[2] == known[path][2] for path, fp in fingerprints[key].items())
+            )
+            if not unchanged:
+                stale.append(key)
+        stale = [key for key in self.downstream_stages(config, stale) if config[key]['enabled']]
+        return sorted(stale), fingerprints
+
+    def ingest(self, config_path, language_code='es'):
+        """
+        Parse and map only the stages whose sources changed since the last
+        run, then record the new source fingerprints in the manifest.
+        A dataset failing to parse fails the stages mapping it (and blocks
+        the stages depending on them); the other stages still run.
+        """
+        self.connection_pool.close()
+        config = self.load_config(config_path, language_code)
+        DuckDBInterface.save_catalog(self.db_file, self.catalog)
+        manifest = DuckDBInterface.load_manifest(self.db_file)
+        stale, fingerprints = self.find_stale_stages(config, manifest)
+
+        needed = {config[key]['dataset'] for key in stale if config[key]['dataset']}
+        self.dataset_errors = {}
+        self.datasets = self.data_preprocessor.load_all_datasets(needed, errors=self.dataset_errors)
+        if self.staging_format == 'parquet':
+            for name, content in self.datasets.items():
+                content.to_parquet(self.staging_path(name), index=False)
+
+        finished = self.run_mapping(config_path, language_code, stages=stale)
+        DuckDBInterface.save_manifest(self.db_file, {
+            key: stage_fingerprints for key, stage_fingerprints in fingerprints.items()
+            if key not in stale or key in finished
+        })
+
+    def run_mapping(self, config_path, language_code='es', stages=None):
         """
         Load and apply SQL mappings to create or update 
         tables/views in the DuckDB database.
+
+        A stage starts as soon as the stages it depends on ('depends_on' in
+        the mapping config) are done. Up to DEFAULT_MAPPING_WORKERS stages
+        run at once, each on its own cursor of a single writer connection.
+        A failed stage only blocks the stages depending on it; the outcome
+        and timing of every stage is kept in self.mapping_report.
+
+        :param stages: Optional list of stage ids to run, together with the
+                       stages depending on them; all when None.
+        :return: List of stage ids that finished successfully (including
+                 stages skipped because they had no data).
         """
+        # Read-only pooled connections cannot coexist with the writer below.
+        self.connection_pool.close()
+        config = self.load_config(config_path, language_code)
+        selected = set(config) if stages is None else self.downstream_stages(config, stages)
+        report, pending, running = {}, set(), {}
+        for key in selected:
+            if config[key]['enabled']:
+                pending.add(key)
+            else:
+                report[key] = {'status': 'ignored', 'seconds': 0.0, 'error': None}
+                print(f"IGNORED {key}")
+
+        conn = DuckDBInterface.create_connection(self.db_file, read_only=False)
         try:
-            paths = self.load_config(config_path, language_code)
-            for key, cfg in paths.items():
-                if cfg['enabled']:
-                    DuckDBInterface.create_raw_view(self.db_file, cfg['file_path'], key)
-                    DuckDBInterface.create_table_from_mapping(self.db_file, cfg['mapping_path'])
-                    print(f"FINISHED processing {key} from {cfg['file_path']} using {cfg['mapping_path']}")
+            with ThreadPoolExecutor(max_workers=DEFAULT_MAPPING_WORKERS) as workers:
+                while pending or running:
+                    busy = pending | set(running.values())
+                    for key in sorted(pending):
+                        if busy.intersection(config[key]['depends_on']):
+                            continue
+                        pending.discard(key)
+                        failed = [dep for dep in config[key]['depends_on']
+                                  if report.get(dep, {}).get('status') in ('failed', 'blocked')]
+                        if failed:
+                            error = f"depends on failed stage(s) {', '.join(failed)}"
+                            report[key] = {'status': 'blocked', 'seconds': 0.0, 'error': error}
+                            print(f"BLOCKED {key}: {error}")
+                        else:
+                            running[workers.submit(self.run_stage, conn, key, config)] = key
+                    if running:
+                        done, _ = wait(running, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            report[running.pop(future)] = future.result()
+        finally:
+            conn.close()
+
+        self.mapping_report = report
+        finished = [key for key in config if report.get(key, {}).get('status') in ('finished', 'skipped')]
+        self.rollups_ready = set(ROLLUP_TABLES) <= DuckDBInterface.list_tables(self.db_file)
+        # Cached query results over rebuilt tables are now stale.
+        self.query_cache.invalidate([
+            table for key in finished if report[key]['status'] == 'finished'
+            for table in config[key]['tables']
+        ])
+        return finished
+
+    def run_stage(self, conn, key, config):
+        """
+        Run one mapping stage on its own cursor of the writer connection.
+        Returns its report entry: status ('finished', 'skipped' or 'failed'),
+        elapsed seconds and error message.
+        """
+        cfg = config[key]
+        start = time.perf_counter()
+        status, error = 'finished', None
+        cursor = conn.cursor()
+        try:
+            if cfg['dataset'] in self.dataset_errors:
+                reason = self.dataset_errors[cfg['dataset']]
+                status, error = 'failed', f"dataset {cfg['dataset']} failed to parse: {reason}"
+            elif cfg['dataset'] and cfg['dataset'] not in self.datasets:
+                status, error = 'skipped', f"dataset {cfg['dataset']} is empty"
+            elif cfg['file_path'] and not self.source.isfile(cfg['file_path']):
+                status, error = 'skipped', f"input file {cfg['file_path']} is missing"
+            elif not cfg['dataset'] and not cfg['file_path']:
+                # Derived stage: it only reads the tables of its dependencies,
+                # and has nothing to do when none of them has any.
+                existing = {row[0] for row in cursor.execute(
+                    "SELECT table_name FROM information_schema.tables").fetchall()}
+                inputs = [table for dep in cfg['depends_on'] for table in config[dep]['tables']]
+                if not existing.intersection(inputs):
+                    status, error = 'skipped', f"input table(s) {', '.join(inputs)} missing"
                 else:
-                    print(f"IGNORED {key} from {cfg['file_path']}")
+                    DuckDBInterface.create_table_from_mapping(
+                        self.db_file, cfg['mapping_path'],
+                        table=cfg['table'], sort_by=cfg['sort_by'],
+                        enums=cfg['enums'], conn=cursor
+                    )
+            elif cfg['reader']:
+                # Streamed straight from the source file in bounded batches.
+                with self.data_preprocessor.open_stream_reader(cfg['reader'], cfg['file_path']) as reader:
+                    DuckDBInterface.create_table_from_mapping(
+                        self.db_file, cfg['mapping_path'], frames={f"raw_{key}": reader},
+                        table=cfg['table'], sort_by=cfg['sort_by'],
+                        enums=cfg['enums'], conn=cursor
+                    )
+            elif cfg['file_path'] and self.source.local_path(cfg['file_path']) is None:
+                # Archive member: DuckDB cannot scan it by path, so it is
+                # read through the takeout source into Arrow.
+                with self.data_preprocessor.open_raw_reader(cfg['file_path']) as raw:
+                    DuckDBInterface.create_table_from_mapping(
+                        self.db_file, cfg['mapping_path'], frames={f"raw_{key}": raw},
+                        table=cfg['table'], sort_by=cfg['sort_by'],
+                        enums=cfg['enums'], conn=cursor
+                    )
+            elif cfg['dataset'] and self.staging_format is None:
+                DuckDBInterface.create_table_from_mapping(
+                    self.db_file, cfg['mapping_path'],
+                    frames={f"raw_{key}": self.datasets[cfg['dataset']]},
+                    table=cfg['table'], sort_by=cfg['sort_by'],
+                    enums=cfg['enums'], conn=cursor
+                )
+            else:
+                file_path = self.staging_path(cfg['dataset']) if cfg['dataset'] else cfg['file_path']
+                DuckDBInterface.create_raw_view(self.db_file, file_path, key, conn=cursor)
+                DuckDBInterface.create_table_from_mapping(
+                    self.db_file, cfg['mapping_path'],
+                    table=cfg['table'], sort_by=cfg['sort_by'],
+                    enums=cfg['enums'], conn=cursor
+                )
         except Exception as e:
-            print(f"Error while processing files: {e}")
+            status, error = 'failed', f"{type(e).__name__}: {e}"
+        finally:
+            cursor.close()
+        seconds = round(time.perf_counter() - start, 3)
+        if status == 'finished':
+            source = cfg['dataset'] or cfg['file_path'] or ', '.join(cfg['depends_on'])
+            print(f"FINISHED processing {key} from {source} using {cfg['mapping_path']} in {seconds}s")
+        else:
+            print(f"{status.upper()} {key}: {error}")
+        return {'status': status, 'seconds': seconds, 'error': error}
+
+    @staticmethod
+    def downstream_stages(config, stages):
+        """Return the given stage ids plus every stage depending on them, transitively."""
+        selected = set(stages)
+        changed = True
+        while changed:
+            changed = False
+            for key, cfg in config.items():
+                if key not in selected and selected.intersection(cfg['depends_on']):
+                    selected.add(key)
+                    changed = True
+        return selected
 
     def load_config(self, config_path, language_code='es'):
         """Load mapping configurations for data ingestion."""
@@ -147,20 +755,159 @@ class GoogleTakeoutProcessor:
             config = json.load(file)
         data_mapping = {}
         for item in config['data_files']:
-            file_path = item['files'][language_code]\
-                .replace("{base_path}", self.takeout_path)\
-                .replace("{transformations_path}", self.data_output_folder)
+            file_path = None
+            if 'files' in item:
+                file_path = item['files'][language_code]\
+                    .replace("{base_path}", self.takeout_path)\
+                    .replace("{transformations_path}", self.data_output_folder)
             mapping_path = item['mapping_file'].replace("{base_path}", self.takeout_path)
+            tables = item.get('tables') or [item.get('table', f"clean_{item['id']}")]
             data_mapping[item['id']] = {
                 'file_path': file_path,
+                'dataset': item.get('dataset'),
+                'table': tables[0],
+                'tables': tables,
+                'sort_by': item.get('sort_by', []),
+                'enums': item.get('enums', []),
+                'depends_on': item.get('depends_on', []),
+                'reader': item.get('reader'),
                 'mapping_path': mapping_path,
                 'enabled': item.get('enabled', True)
             }
+        self.validate_stages(data_mapping)
         return data_mapping
 
-    def query_data(self, query):
-        """Run a SQL query on the database."""
-        return DuckDBInterface.query_data(self.db_file, query)
+    @staticmethod
+    def validate_stages(config):
+        """Raise ValueError on unknown stage readers or dependencies, or dependency cycles."""
+        for key, cfg in config.items():
+            if cfg['reader'] and cfg['reader'] not in dp.DataPreprocessor.STREAM_READERS:
+                raise ValueError(f"Stage {key} uses unknown reader: {cfg['reader']}")
+            unknown = [dep for dep in cfg['depends_on'] if dep not in config]
+            if unknown:
+                raise ValueError(f"Stage {key} depends on unknown stage(s): {', '.join(unknown)}")
+        visiting, done = set(), set()
+
+        def visit(key):
+            if key in done:
+                return
+            if key in visiting:
+                raise ValueError(f"Dependency cycle through stage {key}")
+            visiting.add(key)
+            for dep in config[key]['depends_on']:
+                visit(dep)
+            visiting.discard(key)
+            done.add(key)
+
+        for key in config:
+            visit(key)
+
+    def staging_path(self, dataset):
+        """Return the Parquet staging file path of a parsed dataset."""
+        return os.path.join(self.data_output_folder, f"{dataset}.parquet")
+
+    def query_data(self, query, params=None, use_cache=True, query_id=None, time_limit=None):
+        """
+        Run a SQL query on the database through the connection pool.
+        Results are served from the query result cache when possible.
+
+        :param query_id: Id under which the query can be cancelled while running.
+        :param time_limit: Wall-clock seconds after which the query is interrupted.
+        """
+        def execute():
+            return self.connection_pool.query_data(query, params, query_id, time_limit)
+
+        if not use_cache:
+            return execute()
+        return self.query_cache.get_or_execute(query, params, execute)
+
+    def query_page(self, query, page_size=None, page_token=None, query_id=None,
+                   time_limit=DEFAULT_QUERY_TIME_LIMIT):
+        """
+        Run an ad-hoc query and return one page of its rows:
+        (DataFrame, token of the next page or None). The page size is capped
+        at MAX_PAGE_SIZE and no page starts past MAX_RESULT_ROWS; one extra
+        row is fetched to detect further pages. Pages are only stable for
+        queries with a total ORDER BY (see paged_query).
+
+        Statements that cannot be wrapped as a subquery (PRAGMA, EXPLAIN,
+        SHOW, ...) are run as they are and returned as a single page.
+        """
+        query = prepare_user_query(query)
+        page_size = clamp_page_size(page_size)
+        offset = decode_page_token(query, page_token)
+        if not is_pageable(query):
+            df = self.query_data(query, use_cache=False, query_id=query_id, time_limit=time_limit)
+            return df, None
+        df = self.query_data(
+            paged_query(query), {'limit': page_size + 1, 'offset': offset},
+            query_id=query_id, time_limit=time_limit
+        )
+        next_token = None
+        if len(df) > page_size:
+            df = df.iloc[:page_size]
+            if offset + page_size < MAX_RESULT_ROWS:
+                next_token = encode_page_token(query, offset + page_size)
+        return df, next_token
+
+    def stream_query(self, query, max_rows=MAX_RESULT_ROWS, batch_size=STREAM_BATCH_SIZE,
+                     query_id=None, time_limit=DEFAULT_QUERY_TIME_LIMIT):
+        """
+        Run an ad-hoc query without materializing it: returns the result
+        schema and an iterator over at most `max_rows` rows as Arrow record
+        batches. Results are not cached; the time limit covers the stream.
+        """
+        stream = self.connection_pool.stream_batches(
+            prepare_user_query(query), batch_size=batch_size,
+            query_id=query_id, time_limit=time_limit
+        )
+        schema = next(stream)
+        return schema, limit_batches(stream, max_rows)
+
+    def submit_query_page(self, query, page_size=None, page_token=None, query_id=None,
+                          time_limit=DEFAULT_QUERY_TIME_LIMIT):
+        """
+        Queue query_page() on the query executor as an ad-hoc job and return
+        the job without waiting; the job id doubles as the query id used to
+        cancel it. Raises ExecutorBusyError when the ad-hoc queue is full.
+        """
+        query_id = query_id or uuid.uuid4().hex
+        return self.query_executor.submit(
+            self.query_page, query, page_size, page_token,
+            priority=ADHOC, job_id=query_id, query_id=query_id, time_limit=time_limit
+        )
+
+    def cancel_query(self, query_id):
+        """
+        Cancel a queued or running query by id (executor job or stream).
+        Returns False when no such query is pending.
+        """
+        return self.query_executor.cancel(query_id) or self.connection_pool.cancel(query_id)
+
+    def run_query(self, name, params=None, use_cache=True):
+        """
+        Run a registered query (see app.queries) with bound parameters.
+        User input is only ever passed through `params`, never into the SQL.
+        It runs on the query executor as a dashboard job, ahead of any
+        queued ad-hoc queries.
+        """
+        return self.query_executor.run(self.query_data, get_query(name), params,
+                                       use_cache=use_cache, priority=DASHBOARD)
+
+    def run_activity_query(self, name, platforms=None, start_date=None, end_date=None):
+        """
+        Run a dashboard activity query for a platform/date filter, answered
+        from the rollup tables whenever they are available.
+        """
+        query_name, params = route_activity_query(
+            name, platforms, start_date, end_date, use_rollups=self.rollups_ready
+        )
+        return self.run_query(query_name, params)
+
+    def close(self):
+        """Stop the query executor and shut down the pooled database connections."""
+        self.query_executor.shutdown(wait=False)
+        self.connection_pool.close()
 
     def preprocess_data(self):
         """
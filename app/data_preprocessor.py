@@ -1,15 +1,153 @@
 import os
+import re
+import sys
+import copy
 import json
 import pathlib
 import mmap
-import itertools
-from datetime import datetime
-from multiprocessing import Pool
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, date, timezone
+from multiprocessing import Pool, shared_memory, resource_tracker
 
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
 from bs4 import BeautifulSoup, SoupStrainer
-from icalendar import Calendar
-from babel.dates import get_month_names, get_day_names
+from lxml import etree
+from icalendar import Calendar, Event, Timezone
+
+from app.locales import get_locale_tables, timezone_offset_minutes
+from app.parse_cache import ParseCache, DEFAULT_CACHE_MAX_BYTES
+from app.json_stream import iter_json_array
+from app.takeout_source import LocalSource
+
+# Bump whenever a parser's output changes, so cached results are not reused.
+PARSER_VERSION = 7
+
+OUTER_CELL_CLASS = "outer-cell mdl-cell mdl-cell--12-col mdl-shadow--2dp"
+CONTENT_CELL_CLASS = "content-cell mdl-cell mdl-cell--6-col mdl-typography--body-1"
+TITLE_CLASS = "mdl-typography--title"
+# Byte pattern marking the start of every activity entry in MiActividad.html.
+OUTER_CELL_MARKER = b'<div class="outer-cell'
+_OUTER_CELL_PATTERN = re.compile(re.escape(OUTER_CELL_MARKER))
+
+# Precompiled XPath expressions used by the lxml extraction engine.
+_XPATH_OUTER_CELLS = etree.XPath(f'//div[@class="{OUTER_CELL_CLASS}"]')
+_XPATH_TITLE = etree.XPath(
+    f'.//p[contains(concat(" ", normalize-space(@class), " "), " {TITLE_CLASS} ")]'
+)
+_XPATH_CONTENT_CELLS = etree.XPath(f'.//div[@class="{CONTENT_CELL_CLASS}"]')
+_XPATH_DIRECT_LINKS = etree.XPath('./a[@href]')
+_XPATH_TEXT = etree.XPath('.//text()')
+
+# Arrow schema of the column batches produced by the HTML workers. The
+# optional "all" column is appended when include_all_strings is enabled.
+ACTIVITY_SCHEMA = pa.schema([
+    ("platform", pa.string()),
+    ("action_code", pa.string()),
+    ("action_type", pa.string()),
+    ("timestamp", pa.timestamp('us')),
+    ("link_action_name", pa.string()),
+    ("link_action_text", pa.string()),
+    ("channel_link", pa.string()),
+    ("channel_name", pa.string()),
+    ("link3", pa.string()),
+    ("link3_text", pa.string()),
+])
+ALL_STRINGS_FIELD = pa.field("all", pa.list_(pa.string()))
+
+# Low-cardinality columns of each dataset, kept dictionary encoded end to
+# end: Arrow dictionaries in the workers, pandas Categoricals in the parsed
+# DataFrames (which DuckDB scans as ENUMs).
+CATEGORICAL_COLUMNS = {
+    "activity_logs": ("platform", "action_code", "action_type", "channel_name"),
+}
+
+# Arrow schema of the calendar event batches. Start and End are naive UTC.
+CALENDAR_SCHEMA = pa.schema([
+    ("Calendar", pa.string()),
+    ("Title", pa.string()),
+    ("Start", pa.timestamp('us')),
+    ("End", pa.timestamp('us')),
+    ("Duration", pa.duration('us')),
+    ("Organizer", pa.string()),
+])
+
+# Arrow schema of the Chrome browser history batches.
+CHROME_HISTORY_SCHEMA = pa.schema([
+    ("time_usec", pa.int64()),
+    ("url", pa.string()),
+    ("title", pa.string()),
+    ("page_transition", pa.string()),
+    ("page_transition_qualifier", pa.string()),
+    ("favicon_url", pa.string()),
+    ("client_id", pa.string()),
+])
+CHROME_HISTORY_KEY = "Browser History"
+
+# Timezone tokens missing from TIMEZONE_OFFSETS already reported by this process.
+_UNKNOWN_TIMEZONES = set()
+
+
+def dictionary_encode_columns(batch, columns):
+    """Return the record batch with the listed string columns dictionary encoded."""
+    arrays = [
+        pc.dictionary_encode(array) if name in columns else array
+        for name, array in zip(batch.schema.names, batch.columns)
+    ]
+    return pa.RecordBatch.from_arrays(arrays, names=batch.schema.names)
+
+
+def concat_categorical(frames, columns):
+    """
+    Concatenate DataFrames whose listed columns are Categoricals. Every
+    frame is given the same sorted categories first, so the result stays
+    categorical (pd.concat falls back to strings on differing categories)
+    and category order matches string order.
+    """
+    frames = [df.copy(deep=False) for df in frames]
+    for name in columns:
+        present = [df for df in frames if name in df]
+        categories = sorted(set().union(*(
+            df[name].astype('category').cat.categories for df in present
+        )))
+        for df in present:
+            df[name] = df[name].astype('category').cat.set_categories(categories)
+    return pd.concat(frames, ignore_index=True)
+
+
+# Python 3.13+ can attach to a shared memory block without registering it
+# with the resource tracker (SharedMemory(track=False)).
+_SHARED_MEMORY_TRACK_OPTION = sys.version_info >= (3, 13)
+
+
+def _attach_shared_memory(name):
+    """
+    Attach a worker to a shared memory block created by the parent, which
+    alone unlinks it. On Python 3.13+ the worker does not register the
+    block. Before that, attaching always registers it, so workers must
+    come from _shared_memory_pool (see there).
+    """
+    if _SHARED_MEMORY_TRACK_OPTION:
+        return shared_memory.SharedMemory(name=name, track=False)
+    return shared_memory.SharedMemory(name=name)
+
+
+def _shared_memory_pool(processes):
+    """
+    Return a Pool for workers attaching to the parent's shared memory.
+    Before Python 3.13 the parent's resource tracker is started first, so
+    workers share it whatever the start method: a worker forked earlier
+    would run a tracker of its own, reporting every block it attached as
+    leaked at exit. In a shared tracker the worker's registration repeats
+    the parent's, which the parent's unlink clears. Unregistering in the
+    worker instead would drop the parent's entry from a shared tracker.
+    """
+    if not _SHARED_MEMORY_TRACK_OPTION:
+        resource_tracker.ensure_running()
+    return Pool(processes=processes)
 
 
 class DataPreprocessor:
@@ -19,6 +157,22 @@ class DataPreprocessor:
     calendar ICS files, and HTML activity logs.
     """
 
+    # Maps each supported HTML extraction engine to the method implementing it.
+    HTML_ENGINES = {
+        'lxml': '_extract_html_chunk_data_lxml',
+        'bs4': '_extract_html_chunk_data_bs4',
+    }
+    HTML_TRANSPORTS = ('mmap', 'shared_memory')
+    # Streaming readers usable by file stages of the mapping config
+    # ("reader" key), with the method yielding their record batches.
+    STREAM_READERS = {
+        'chrome_history': ('iter_chrome_history_batches', CHROME_HISTORY_SCHEMA),
+    }
+    DATASETS = (
+        "person_info", "subscribed_channels", "published_videos",
+        "calendar_events", "activity_logs"
+    )
+
     def __init__(
         self,
         html_chunk_factor=4,
@@ -28,7 +182,14 @@ class DataPreprocessor:
         activity_log_paths=None,
         subscribed_channels_csv=None,
         published_videos_csv=None,
-        output_folder=None
+        output_folder=None,
+        html_engine='lxml',
+        html_transport='mmap',
+        include_all_strings=False,
+        lang='es',
+        use_parse_cache=True,
+        cache_max_bytes=DEFAULT_CACHE_MAX_BYTES,
+        source=None
     ):
         """
         Initialize the DataPreprocessor with all required file paths and parameters.
@@ -42,9 +203,43 @@ class DataPreprocessor:
         :param subscribed_channels_csv: CSV file path for YouTube subscriptions data.
         :param published_videos_csv: CSV file path for published videos metadata.
         :param output_folder: Directory path for output data (if needed).
+        :param html_engine: Backend used to extract activity entries from HTML.
+                            'lxml' (fast, default) or 'bs4' (reference).
+        :param html_transport: How workers access the activity log bytes.
+                               'mmap' (each worker maps the file itself) or
+                               'shared_memory' (the parent maps it once into
+                               a multiprocessing.shared_memory block).
+        :param include_all_strings: Keep every stripped string of an activity
+                                    entry in an extra "all" list column.
+        :param lang: Locale of the takeout (see app.locales), used to parse
+                     dates and classify actions.
+        :param use_parse_cache: Reuse parsed sources from the on-disk cache
+                                under output_folder/parse_cache.
+        :param cache_max_bytes: Size cap of the parse cache.
+        :param source: Source the takeout files are read through (see
+                       app.takeout_source), e.g. an ArchiveSource to read
+                       them from the Takeout archives. Defaults to the
+                       local filesystem.
         """
+        if html_engine not in self.HTML_ENGINES:
+            raise ValueError(
+                f"Unsupported html_engine '{html_engine}'. "
+                f"Expected one of: {', '.join(self.HTML_ENGINES)}"
+            )
+        if html_transport not in self.HTML_TRANSPORTS:
+            raise ValueError(
+                f"Unsupported html_transport '{html_transport}'. "
+                f"Expected one of: {', '.join(self.HTML_TRANSPORTS)}"
+            )
+        self.html_engine = html_engine
+        self.html_transport = html_transport
+        self.include_all_strings = include_all_strings
+        self.lang = lang
         self.html_chunk_factor = html_chunk_factor
         self.max_threads = max_threads
+        self.source = source if source is not None else LocalSource()
+        # Worker pool shared by the logs of a read_activity_logs call.
+        self._activity_pool = None
 
         # Centralized Path Assignments
         self.calendar_path = calendar_path
@@ -55,10 +250,31 @@ class DataPreprocessor:
 
         # Optional output folder
         self.output_folder = output_folder if output_folder else "data"
+        self.parse_cache = (
+            ParseCache(
+                os.path.join(self.output_folder, "parse_cache"), cache_max_bytes,
+                digest=self.source.digest
+            )
+            if use_parse_cache else None
+        )
 
     # -------------------------------------------------------------------------
     #                      PRIVATE / UTILITY METHODS
     # -------------------------------------------------------------------------
+    def _for_workers(self, file_paths=()):
+        """
+        Return a shallow copy of this instance to send to worker processes,
+        whose source only knows file_paths: it is pickled with every task,
+        and the index of a large takeout archive can hold many members (and
+        the tar members it keeps in memory). Workers do not use the parse
+        cache, whose digest is bound to the full source.
+        """
+        worker = copy.copy(self)
+        worker.source = self.source.restricted(file_paths)
+        worker.parse_cache = None
+        worker._activity_pool = None
+        return worker
+
     def _calculate_chunk_size(self, factor=None):
         """
         Calculate chunk size in bytes as a multiple of the memory page size.
@@ -67,129 +283,419 @@ class DataPreprocessor:
         factor = factor if factor else self.html_chunk_factor
         return mmap.PAGESIZE * factor
 
-    def _translate_spanish_months(self, date_str):
-        """
-        Convert Spanish month abbreviations to English. 
-        Example: 'mar' -> 'Mar' (for March), so standard libraries can parse them.
-        """
-        month_map = {
-            'ene': 'Jan', 'feb': 'Feb', 'mar': 'Mar', 'abr': 'Apr',
-            'may': 'May', 'jun': 'Jun', 'jul': 'Jul', 'ago': 'Aug',
-            'oct': 'Oct', 'nov': 'Nov', 'dic': 'Dec', 'sept': 'Sep'
-        }
-        for sp, en in month_map.items():
-            date_str = date_str.replace(sp, en)
-        return date_str
-
     # -------------------------------------------------------------------------
     #                            DATE PARSING
     # -------------------------------------------------------------------------
-    def parse_date(self, date_str, lang='es'):
+    def parse_date(self, date_str, lang=None):
         """
-        Parse a date string and return it in 'YYYY-MM-DD HH:MM:SS' format.
-        If lang='es', Spanish month abbreviations are translated first.
-        Returns '-1' if parsing fails.
+        Parse a date string and return its wall-clock time in
+        'YYYY-MM-DD HH:MM:SS' format, using the timestamp format and month
+        names of the given takeout locale (self.lang by default). Returns
+        '-1' if parsing fails.
         """
-        if lang == 'es':
-            date_str = self._translate_spanish_months(date_str)
+        tables = get_locale_tables(lang or self.lang)
+        match = tables.timestamp_regex.match(date_str)
+        month = tables.months.get(match.group('month').lower()) if match else None
+        if month is None:
+            return '-1'
+        hour = int(match.group('hour'))
+        if match.group('ampm'):
+            hour = hour % 12 + (12 if match.group('ampm').lower().startswith('p') else 0)
         try:
-            dt = datetime.strptime(date_str, '%d %b %Y, %H:%M:%S cet')
-            return dt.strftime('%Y-%m-%d %H:%M:%S')
+            dt = datetime(
+                int(match.group('year')), month, int(match.group('day')),
+                hour, int(match.group('minute')), int(match.group('second'))
+            )
         except ValueError:
             return '-1'
+        return dt.strftime('%Y-%m-%d %H:%M:%S')
+
+    def _parse_timestamps_arrow(self, values, lang=None):
+        """
+        Arrow implementation of parse_timestamps, returning a
+        timestamp('us') array. Every step runs in Arrow compute kernels;
+        Python only sees the distinct timezone tokens.
+        """
+        tables = get_locale_tables(lang or self.lang)
+        strings = pa.array(values, pa.string())
+        # Memoize repeated strings: parse each distinct value only once.
+        uniques = pc.unique(strings)
+        parts = pc.extract_regex(uniques, tables.timestamp_pattern)
+
+        def field(name):
+            return pc.struct_field(parts, name)
+
+        month = pc.take(
+            pa.array(list(tables.months.values()), pa.int64()),
+            pc.index_in(pc.utf8_lower(field('month')),
+                        value_set=pa.array(list(tables.months.keys())))
+        )
+
+        # 12-hour clocks: "12 AM" is hour 0 and PM adds 12 hours.
+        hour = pc.cast(field('hour'), pa.int64())
+        ampm = pc.utf8_lower(pc.replace_substring(field('ampm'), '.', ''))
+        hour = pc.if_else(
+            pc.equal(ampm, ''),
+            hour,
+            pc.add(pc.if_else(pc.equal(hour, 12), 0, hour), pc.if_else(pc.equal(ampm, 'pm'), 12, 0))
+        )
+
+        def padded(values):
+            return pc.utf8_lpad(pc.cast(values, pa.string()), 2, '0')
+
+        normalized = pc.binary_join_element_wise(
+            pc.binary_join_element_wise(field('year'), padded(month), padded(field('day')), '-'),
+            pc.binary_join_element_wise(padded(hour), field('minute'), field('second'), ':'),
+            ' '
+        )
+        local = pc.strptime(normalized, format='%Y-%m-%d %H:%M:%S', unit='s', error_is_null=True)
+
+        timezones = pc.unique(field('tz'))
+        offsets = pc.take(
+            pa.array([self._timezone_offset(tz) for tz in timezones.to_pylist()], pa.int64()),
+            pc.index_in(field('tz'), value_set=timezones, skip_nulls=False)
+        )
+        utc_seconds = pc.subtract(pc.cast(local, pa.int64()), pc.multiply(offsets, 60))
+        parsed = pc.cast(pc.cast(utc_seconds, pa.timestamp('s')), pa.timestamp('us'))
+
+        return pc.take(parsed, pc.index_in(strings, value_set=uniques))
+
+    @staticmethod
+    def _timezone_offset(token):
+        """
+        Return the UTC offset in minutes of a timezone token. Unknown tokens
+        keep the wall-clock time (offset 0) and are reported once, instead
+        of nulling the timestamp and dropping its entry.
+        """
+        offset = timezone_offset_minutes(token)
+        if offset is not None:
+            return offset
+        if token.lower() not in _UNKNOWN_TIMEZONES:
+            _UNKNOWN_TIMEZONES.add(token.lower())
+            print(f"Unknown timezone {token!r}: keeping the wall-clock time as UTC")
+        return 0
+
+    def _classify_actions(self, action_codes):
+        """
+        Map localized action codes ("Has visto", "Watched", ...) to
+        language-independent action types through the locale's table.
+        Unknown codes map to null.
+        """
+        action_table = get_locale_tables(self.lang).action_codes
+        return pc.take(
+            pa.array(list(action_table.values()), pa.string()),
+            pc.index_in(pa.array(action_codes, pa.string()),
+                        value_set=pa.array(list(action_table.keys()), pa.string()))
+        )
+
+    def parse_timestamps(self, values, lang=None):
+        """
+        Vectorized parser for a whole column of takeout timestamps.
+
+        Repeated strings are parsed once, month tokens are resolved through
+        the locale's lookup table and the normalized strings are parsed with
+        a fixed format, all inside Arrow compute kernels. Timezone suffixes (CET,
+        CEST, UTC, "GMT+2", "+01:00", ...) are applied, so the result holds
+        naive UTC datetime64 values; unknown suffixes keep the wall-clock
+        time and unparseable entries become NaT.
+
+        :param values: Iterable of timestamp strings.
+        :param lang: Takeout locale of the timestamps; defaults to self.lang.
+        :return: pd.Series of datetime64 values aligned with 'values'.
+        """
+        return self._parse_timestamps_arrow(values, lang).to_pandas()
 
     # -------------------------------------------------------------------------
     #                           HTML PARSING
     # -------------------------------------------------------------------------
-    def _stream_html_in_chunks(self, file_path, chunk_size=524288):
-        """
-        Generator function that reads an HTML file incrementally, ensuring
-        we yield only complete tag boundaries. This avoids partial tags 
-        within a chunk.
-        """
-        with open(file_path, 'r', encoding='utf-8') as file:
-            buffer = ''
-            while True:
-                data = file.read(chunk_size)
-                if not data:
-                    if buffer:
-                        yield buffer
+    def _find_record_ranges(self, file_path, chunk_size):
+        """
+        Split an activity log into (offset, length) byte ranges of roughly
+        chunk_size bytes. Ranges are only cut at the start of an outer-cell
+        div (found with a byte-level scan over an mmap of the file), so no
+        activity entry is ever split across two ranges.
+        """
+        if os.path.getsize(file_path) == 0:
+            return []
+        with open(file_path, 'rb') as file, \
+                mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return self._split_record_ranges(mapped, len(mapped), chunk_size)
+
+    @staticmethod
+    def _split_record_ranges(buffer, size, chunk_size):
+        """
+        Split the first size bytes of a buffer (an mmap or a shared memory
+        view) into record-aligned (offset, length) ranges.
+        """
+        ranges = []
+        start = 0
+        while start < size:
+            match = None
+            if start + chunk_size < size:
+                match = _OUTER_CELL_PATTERN.search(buffer, start + chunk_size, size)
+            end = match.start() if match else size
+            ranges.append((start, end - start))
+            start = end
+        return ranges
+
+    def _read_html_range(self, transport, source, offset, length):
+        """
+        Read one byte range of an activity log without going through the
+        parent process. 'source' is the file path for the mmap transport
+        and the shared memory block name for the shared_memory transport.
+        """
+        if transport == 'shared_memory':
+            block = _attach_shared_memory(source)
+            try:
+                data = bytes(block.buf[offset:offset + length])
+            finally:
+                block.close()
+        else:
+            with open(source, 'rb') as file, \
+                    mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                data = mapped[offset:offset + length]
+        return data.decode('utf-8')
+
+    def _activity_schema(self):
+        """Return the Arrow schema of the activity batches for this instance."""
+        if self.include_all_strings:
+            return ACTIVITY_SCHEMA.append(ALL_STRINGS_FIELD)
+        return ACTIVITY_SCHEMA
+
+    def _extract_html_range_data(self, work_item):
+        """
+        Worker entry point: read one (transport, source, offset, length) range of an
+        activity log, extract its entries and return them as a serialized
+        Arrow IPC stream holding a single record batch.
+        """
+        columns = self._extract_html_chunk_data(self._read_html_range(*work_item))
+        columns["timestamp"] = self._parse_timestamps_arrow(columns["timestamp"])
+        columns["action_type"] = self._classify_actions(columns["action_code"])
+        batch = dictionary_encode_columns(
+            pa.RecordBatch.from_pydict(columns, schema=self._activity_schema()),
+            CATEGORICAL_COLUMNS["activity_logs"]
+        )
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, batch.schema) as writer:
+            writer.write_batch(batch)
+        return sink.getvalue()
+
+    def _copy_to_shared_memory(self, file_path):
+        """
+        Copy a file once into a new shared memory block and return the block.
+        Archive members are decompressed straight into it. The caller is
+        responsible for closing and unlinking it.
+        """
+        block = shared_memory.SharedMemory(create=True, size=self.source.stat(file_path)[0])
+        with self.source.open(file_path) as file:
+            view = block.buf
+            copied = 0
+            while copied < len(view):
+                read = file.readinto(view[copied:])
+                if not read:
                     break
-                buffer += data
-                last_tag_end = max(buffer.rfind('>'), buffer.rfind('/>'))
-                if last_tag_end == -1:
-                    continue
-                yield buffer[:last_tag_end + 1]
-                buffer = buffer[last_tag_end + 1:]
+                copied += read
+        return block
+
+    def _new_activity_columns(self):
+        """Return an empty dict-of-lists matching the activity schema."""
+        return {name: [] for name in self._activity_schema().names}
+
+    def _append_activity_entry(self, columns, platform, links, stripped_strings):
+        """
+        Append a single activity record, built from the pieces extracted by
+        an engine, to a dict-of-lists column batch.
+
+        :param columns: Column batch created by _new_activity_columns.
+        :param platform: Title of the outer cell (or None).
+        :param links: List of (href, text) tuples for the direct child links.
+        :param stripped_strings: All non-empty, stripped text nodes of the cell.
+        """
+        action_code, timestamp = '', ''
+        if stripped_strings:
+            action_parts = stripped_strings[0].split('|')
+            action_code = action_parts[0].strip()
+            timestamp = stripped_strings[-1].strip()
+
+        columns["platform"].append(platform)
+        columns["action_code"].append(action_code)
+        columns["action_type"].append(None)
+        columns["timestamp"].append(timestamp)
+        columns["link_action_name"].append(links[0][0] if len(links) > 0 else '')
+        columns["link_action_text"].append(links[0][1] if len(links) > 0 else '')
+        columns["channel_link"].append(links[1][0] if len(links) > 1 else '')
+        columns["channel_name"].append(links[1][1] if len(links) > 1 else '')
+        columns["link3"].append(links[2][0] if len(links) > 2 else '')
+        columns["link3_text"].append(links[2][1] if len(links) > 2 else '')
+        if self.include_all_strings:
+            columns["all"].append(stripped_strings)
 
     def _extract_html_chunk_data(self, html_content):
         """
         Extracts relevant data from a chunk of HTML content specific to 
-        Google Takeout's "My Activity" format.
+        Google Takeout's "My Activity" format, using the configured engine.
+        Returns the entries as a dict-of-lists column batch.
         """
-        strainer = SoupStrainer('div', class_="outer-cell mdl-cell mdl-cell--12-col mdl-shadow--2dp")
+        return getattr(self, self.HTML_ENGINES[self.html_engine])(html_content)
+
+    def _extract_html_chunk_data_bs4(self, html_content):
+        """
+        Reference extraction engine built on BeautifulSoup's html.parser.
+        """
+        strainer = SoupStrainer('div', class_=OUTER_CELL_CLASS)
         soup = BeautifulSoup(html_content, 'html.parser', parse_only=strainer)
-        entries = []
+        columns = self._new_activity_columns()
         for outer_div in soup.find_all('div', recursive=False):
             # Retrieve platform (if present)
-            platform_elem = outer_div.find('p', class_="mdl-typography--title")
+            platform_elem = outer_div.find('p', class_=TITLE_CLASS)
             platform = platform_elem.text.strip() if platform_elem else None
 
-            content_cells = outer_div.find_all(
-                'div', class_="content-cell mdl-cell mdl-cell--6-col mdl-typography--body-1"
+            for div in outer_div.find_all('div', class_=CONTENT_CELL_CLASS):
+                links = [
+                    (link['href'], link.get_text(strip=True))
+                    for link in div.find_all('a', href=True, recursive=False)
+                ]
+                self._append_activity_entry(
+                    columns, platform, links, list(div.stripped_strings)
+                )
+        return columns
+
+    def _extract_html_chunk_data_lxml(self, html_content):
+        """
+        Fast extraction engine: feeds the chunk to lxml's C HTML parser and
+        walks the resulting tree with precompiled XPath expressions.
+        Emits the same records as the BeautifulSoup engine.
+        """
+        parser = etree.HTMLParser()
+        parser.feed(html_content)
+        root = parser.close()
+        columns = self._new_activity_columns()
+        if root is None:
+            return columns
+
+        for outer_div in _XPATH_OUTER_CELLS(root):
+            platform_elems = _XPATH_TITLE(outer_div)
+            platform = (
+                ''.join(_XPATH_TEXT(platform_elems[0])).strip() if platform_elems else None
             )
-            for div in content_cells:
-                links = div.find_all('a', href=True, recursive=False)
-                stripped_strings = list(div.stripped_strings)
-                
-                link_action_text = links[0].get_text(strip=True) if links else ''
-                action_code, timestamp = '', ''
-
-                if stripped_strings:
-                    action_parts = stripped_strings[0].split('|')
-                    action_code = action_parts[0].strip()
-                    timestamp = stripped_strings[-1].strip()
-
-                entries.append({
-                    "platform": platform,
-                    "action_code": action_code,
-                    "timestamp": self.parse_date(timestamp),
-                    "link_action_name": links[0]['href'] if len(links) > 0 else '',
-                    "link_action_text": link_action_text,
-                    "channel_link": links[1]['href'] if len(links) > 1 else '',
-                    "channel_name": links[1].get_text(strip=True) if len(links) > 1 else '',
-                    "link3": links[2]['href'] if len(links) > 2 else '',
-                    "link3_text": links[2].get_text(strip=True) if len(links) > 2 else '',
-                    "all": stripped_strings
-                })
-        return entries
+
+            for div in _XPATH_CONTENT_CELLS(outer_div):
+                links = [
+                    (link.get('href'), ''.join(text.strip() for text in _XPATH_TEXT(link)))
+                    for link in _XPATH_DIRECT_LINKS(div)
+                ]
+                stripped_strings = [
+                    text.strip() for text in _XPATH_TEXT(div) if text.strip()
+                ]
+                self._append_activity_entry(columns, platform, links, stripped_strings)
+        return columns
 
     def read_activity_html(self, file_path):
         """
         Read and parse a large Google Takeout HTML activity log using multiprocessing.
-        Each chunk is processed by '_extract_html_chunk_data'.
+        The parent only computes record-aligned byte ranges and sends small
+        (transport, source, offset, length) descriptors; each worker reads its
+        own range through the configured transport and processes it with
+        '_extract_html_chunk_data'. Workers return Arrow IPC buffers, which
+        are concatenated column-wise into the resulting DataFrame, with
+        the CATEGORICAL_COLUMNS as Categoricals.
+
+        Archive members cannot be mapped, so they always go through shared
+        memory. Inside read_activity_logs, the ranges go to the worker pool
+        shared by all the logs instead of a pool of their own.
         """
-        file_size = os.path.getsize(file_path)
         chunk_size = self._calculate_chunk_size()
-        num_chunks = (file_size // chunk_size) + 1
-        num_processes = min(num_chunks, self.max_threads)
+        if self.source.stat(file_path)[0] == 0:
+            return pd.DataFrame()
+        block = None
+        if self.html_transport == 'shared_memory' or self.source.local_path(file_path) is None:
+            block = self._copy_to_shared_memory(file_path)
 
-        chunk_stream = self._stream_html_in_chunks(file_path, chunk_size=chunk_size)
-        with Pool(processes=num_processes) as pool:
-            result_iter = pool.imap_unordered(self._extract_html_chunk_data, chunk_stream)
-            records = itertools.chain.from_iterable(result_iter)
-            df = pd.DataFrame(records)
-        return df
+        try:
+            if block is None:
+                transport, source = 'mmap', self.source.local_path(file_path)
+                ranges = self._find_record_ranges(source, chunk_size)
+            else:
+                transport, source = 'shared_memory', block.name
+                ranges = self._split_record_ranges(block.buf, block.size, chunk_size)
+            work_items = [(transport, source, offset, length) for offset, length in ranges]
+            extract = self._for_workers()._extract_html_range_data
+            if self._activity_pool is not None:
+                buffers = self._activity_pool.imap_unordered(extract, work_items)
+                tables = [pa.ipc.open_stream(buffer).read_all() for buffer in buffers]
+            else:
+                with _shared_memory_pool(min(len(ranges), self.max_threads)) as pool:
+                    buffers = pool.imap_unordered(extract, work_items)
+                    tables = [pa.ipc.open_stream(buffer).read_all() for buffer in buffers]
+            df = pa.concat_tables(tables).to_pandas()
+        finally:
+            if block is not None:
+                block.close()
+                block.unlink()
+        return concat_categorical([df], CATEGORICAL_COLUMNS["activity_logs"])
+
+    def read_activity_logs(self, file_paths):
+        """
+        Parse many activity logs and return {file_path: DataFrame}.
+
+        All logs share one pool of worker processes instead of starting one
+        per log, and are scheduled largest first: up to max_threads logs
+        are read at once by threads that queue their ranges on the shared
+        pool, so the small logs of the many minor products fill in the
+        gaps left by the large ones. Archive members are inflated by those
+        threads concurrently (zlib releases the GIL).
+        """
+        file_paths = sorted(file_paths, key=lambda path: self.source.stat(path)[0], reverse=True)
+        if not file_paths:
+            return {}
+        pool = _shared_memory_pool(self.max_threads)
+        self._activity_pool = pool
+        try:
+            with ThreadPoolExecutor(max_workers=min(len(file_paths), self.max_threads)) as threads:
+                frames = dict(zip(file_paths, threads.map(self.read_activity_html, file_paths)))
+        finally:
+            self._activity_pool = None
+            pool.close()
+            pool.join()
+        return frames
 
     # -------------------------------------------------------------------------
     #                          ICS (CALENDAR) PARSING
     # -------------------------------------------------------------------------
+    def _extract_event(self, component, calendar_name):
+        """
+        Extract the fields of a VEVENT component into a dictionary
+        (title, start, end, etc.).
+        """
+        summary = component.get('summary')
+        start_value = component.get('dtstart')
+        end_value = component.get('dtend')
+        organizer_value = component.get('organizer')
+
+        start_dt = start_value.dt if start_value else None
+        end_dt = end_value.dt if end_value else None
+
+        organizer = None
+        if organizer_value:
+            # Convert organizer object to string then strip 'mailto:'
+            org_str = str(organizer_value)
+            organizer = org_str.replace('mailto:', '')
+
+        return {
+            'Calendar': calendar_name,
+            'Title': summary,
+            'Start': start_dt,
+            'End': end_dt,
+            'Duration': (end_dt - start_dt) if (start_dt and end_dt) else None,
+            'Organizer': organizer
+        }
+
     def parse_ics(self, file_path):
         """
         Parse calendar events from an ICS file and return them as 
         a list of dictionaries (title, start, end, etc.).
         """
-        with open(file_path, 'rb') as file:
+        with self.source.open(file_path) as file:
             data = file.read()
         cal = Calendar.from_ical(data)
         calendar_name = pathlib.Path(file_path).stem
@@ -197,30 +703,203 @@ class DataPreprocessor:
         meetings = []
         for component in cal.walk():
             if component.name == "VEVENT":
-                summary = component.get('summary')
-                start_value = component.get('dtstart')
-                end_value = component.get('dtend')
-                organizer_value = component.get('organizer')
-
-                start_dt = start_value.dt if start_value else None
-                end_dt = end_value.dt if end_value else None
-
-                organizer = None
-                if organizer_value:
-                    # Convert organizer object to string then strip 'mailto:'
-                    org_str = str(organizer_value)
-                    organizer = org_str.replace('mailto:', '')
-
-                meetings.append({
-                    'Calendar': calendar_name,
-                    'Title': summary,
-                    'Start': start_dt,
-                    'End': end_dt,
-                    'Duration': (end_dt - start_dt) if (start_dt and end_dt) else None,
-                    'Organizer': organizer
-                })
+                meetings.append(self._extract_event(component, calendar_name))
         return meetings
 
+    def _iter_ics_blocks(self, file_path):
+        """
+        Stream the raw VEVENT and VTIMEZONE blocks of an ICS file line by
+        line as (component name, block) pairs, without materializing the
+        whole calendar object tree. Folded continuation lines stay inside
+        their block; nested components (e.g. VALARM, STANDARD) are kept as
+        part of the enclosing one.
+        """
+        name = block = None
+        with self.source.open(file_path) as file:
+            for line in file:
+                stripped = line.rstrip(b'\r\n').upper()
+                if block is None:
+                    if stripped in (b'BEGIN:VEVENT', b'BEGIN:VTIMEZONE'):
+                        name, block = stripped[len(b'BEGIN:'):], [line]
+                    continue
+                block.append(line)
+                if stripped == b'END:' + name:
+                    yield name.decode('ascii'), b''.join(block)
+                    block = None
+
+    @staticmethod
+    def _unresolved_tzid(component, timezones):
+        # True if a start/end names a zone that is neither defined in the
+        # file so far nor known to icalendar (its value stays naive).
+        for prop in (component.get('dtstart'), component.get('dtend')):
+            if prop is None:
+                continue
+            tzid = prop.params.get('TZID')
+            if (tzid and tzid not in timezones and isinstance(prop.dt, datetime)
+                    and prop.dt.tzinfo is None):
+                return True
+        return False
+
+    def _iter_ics_events(self, file_path):
+        """
+        Yield the VEVENT components of an ICS file, one at a time, with the
+        TZIDs of their start and end resolved against the VTIMEZONE
+        definitions of the file, as Calendar.from_ical does (a zone cached
+        by icalendar from another file does not change the result). Events
+        naming a zone defined further down the file are held back until
+        the end of the file.
+        """
+        timezones, deferred = {}, []
+        for name, block in self._iter_ics_blocks(file_path):
+            if name == 'VTIMEZONE':
+                definition = Timezone.from_ical(block)
+                timezones[str(definition['TZID'])] = definition.to_tz()
+                continue
+            component = Event.from_ical(block)
+            if self._unresolved_tzid(component, timezones):
+                deferred.append(block)
+                continue
+            yield self._localize_event(component, timezones)
+        for block in deferred:
+            yield self._localize_event(Event.from_ical(block), timezones)
+
+    @staticmethod
+    def _localize_event(component, timezones):
+        # Attach the file's zone to the wall-clock start/end named by TZID.
+        for key in ('dtstart', 'dtend'):
+            prop = component.get(key)
+            if prop is None:
+                continue
+            tzid = prop.params.get('TZID')
+            if tzid in timezones and isinstance(prop.dt, datetime):
+                prop.dt = prop.dt.replace(tzinfo=timezones[tzid])
+        return component
+
+    @staticmethod
+    def _to_utc_naive(value):
+        """
+        Normalize an ICS date or datetime to a naive UTC datetime: aware
+        datetimes are converted to UTC and all-day dates start at midnight.
+        """
+        if isinstance(value, datetime):
+            if value.tzinfo is not None:
+                value = value.astimezone(timezone.utc).replace(tzinfo=None)
+            return value
+        if isinstance(value, date):
+            return datetime(value.year, value.month, value.day)
+        return None
+
+    def iter_ics_batches(self, file_path, batch_size=10000):
+        """
+        Stream the events of an ICS file as Arrow record batches of at most
+        batch_size rows, following CALENDAR_SCHEMA. Only one VEVENT is
+        parsed into an icalendar object at a time.
+        """
+        calendar_name = pathlib.Path(file_path).stem
+        columns = {name: [] for name in CALENDAR_SCHEMA.names}
+        for component in self._iter_ics_events(file_path):
+            event = self._extract_event(component, calendar_name)
+            start = self._to_utc_naive(event['Start'])
+            end = self._to_utc_naive(event['End'])
+            columns['Calendar'].append(calendar_name)
+            columns['Title'].append(str(event['Title']) if event['Title'] is not None else None)
+            columns['Start'].append(start)
+            columns['End'].append(end)
+            columns['Duration'].append(end - start if start and end else None)
+            columns['Organizer'].append(event['Organizer'])
+            if len(columns['Calendar']) >= batch_size:
+                yield pa.RecordBatch.from_pydict(columns, schema=CALENDAR_SCHEMA)
+                columns = {name: [] for name in CALENDAR_SCHEMA.names}
+        if columns['Calendar']:
+            yield pa.RecordBatch.from_pydict(columns, schema=CALENDAR_SCHEMA)
+
+    def _parse_ics_file_data(self, task):
+        """
+        Worker entry point: stream one ICS file, read through the source
+        sent along with it, and return its path with its event batches
+        serialized as an Arrow IPC stream.
+        """
+        file_path, self.source = task
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, CALENDAR_SCHEMA) as writer:
+            for batch in self.iter_ics_batches(file_path):
+                writer.write_batch(batch)
+        return file_path, sink.getvalue()
+
+    def iter_calendar_batches(self, file_paths):
+        """
+        Parse many ICS files in parallel (one file per task, largest files
+        first) and yield (file_path, Arrow table) pairs as files complete.
+        """
+        file_paths = sorted(file_paths, key=lambda path: self.source.stat(path)[0], reverse=True)
+        if not file_paths:
+            return
+        num_processes = min(len(file_paths), self.max_threads)
+        # Each task carries a source restricted to its own file, so the
+        # members an archive source keeps in memory are sent once.
+        tasks = [(file_path, self.source.restricted([file_path])) for file_path in file_paths]
+        worker = self._for_workers()
+        with Pool(processes=num_processes) as pool:
+            for file_path, buffer in pool.imap_unordered(worker._parse_ics_file_data, tasks):
+                yield file_path, pa.ipc.open_stream(buffer).read_all()
+
+    def read_calendar_files(self, file_paths):
+        """
+        Parse many ICS files in parallel and return {file_path: DataFrame}.
+        """
+        return {
+            file_path: table.to_pandas()
+            for file_path, table in self.iter_calendar_batches(file_paths)
+        }
+
+    # -------------------------------------------------------------------------
+    #                         CHROME HISTORY PARSING
+    # -------------------------------------------------------------------------
+    def iter_chrome_history_batches(self, file_path, batch_size=10000):
+        """
+        Stream the visits of a Chrome history JSON file as Arrow record
+        batches of at most batch_size rows, following CHROME_HISTORY_SCHEMA.
+        Entries are decoded one at a time from the "Browser History" array,
+        so memory stays bounded by the batch size whatever the file size.
+        """
+        columns = {name: [] for name in CHROME_HISTORY_SCHEMA.names}
+        with self.source.open(file_path) as file:
+            for entry in iter_json_array(file, CHROME_HISTORY_KEY):
+                time_usec = entry.get('time_usec')
+                columns['time_usec'].append(int(time_usec) if time_usec not in (None, '') else None)
+                for name in CHROME_HISTORY_SCHEMA.names[1:]:
+                    value = entry.get(name)
+                    columns[name].append(str(value) if value is not None else None)
+                if len(columns['time_usec']) >= batch_size:
+                    yield pa.RecordBatch.from_pydict(columns, schema=CHROME_HISTORY_SCHEMA)
+                    columns = {name: [] for name in CHROME_HISTORY_SCHEMA.names}
+        if columns['time_usec']:
+            yield pa.RecordBatch.from_pydict(columns, schema=CHROME_HISTORY_SCHEMA)
+
+    @contextmanager
+    def open_stream_reader(self, name, file_path, batch_size=10000):
+        """
+        Context manager yielding a pyarrow RecordBatchReader streaming a
+        file through one of the STREAM_READERS. DuckDB scans it batch by
+        batch, once. The reader, its batches and the file are closed on
+        exit, also when the scan fails midway.
+        """
+        if name not in self.STREAM_READERS:
+            raise ValueError(
+                f"Unsupported stream reader '{name}'. "
+                f"Expected one of: {', '.join(self.STREAM_READERS)}"
+            )
+        method, schema = self.STREAM_READERS[name]
+        batches = getattr(self, method)(file_path, batch_size=batch_size)
+        try:
+            reader = pa.RecordBatchReader.from_batches(schema, batches)
+            try:
+                yield reader
+            finally:
+                reader.close()
+        finally:
+            batches.close()
+
     # -------------------------------------------------------------------------
     #                           PROFILE DATA PARSING
     # -------------------------------------------------------------------------
@@ -229,10 +908,10 @@ class DataPreprocessor:
         Parse JSON profile data, returning a dictionary with keys like 
         givenName, formattedName, displayName, email, and genderType.
         """
-        if not self.profile_path or not os.path.isfile(self.profile_path):
+        if not self.profile_path or not self.source.isfile(self.profile_path):
             raise FileNotFoundError(f"Profile JSON path is invalid or not set: {self.profile_path}")
 
-        with open(self.profile_path, 'r') as file:
+        with self.source.open(self.profile_path) as file:
             data = json.load(file)
 
         return {
@@ -246,7 +925,107 @@ class DataPreprocessor:
     # -------------------------------------------------------------------------
     #                           DATA LOADING
     # -------------------------------------------------------------------------
-    def load_all_datasets(self):
+    def _calendar_files(self):
+        """Return the paths of all .ics files in the calendar directory."""
+        if not (self.calendar_path and self.source.isdir(self.calendar_path)):
+            return []
+        return [
+            os.path.join(self.calendar_path, name) for name in self.source.listdir(self.calendar_path)
+            if name.endswith('.ics')
+        ]
+
+    def dataset_sources(self, name):
+        """
+        Return the existing source files a dataset is parsed from, so callers
+        can detect whether it needs to be parsed again.
+        """
+        if name == "person_info":
+            candidates = [self.profile_path]
+        elif name == "subscribed_channels":
+            candidates = [self.subscribed_channels_csv]
+        elif name == "published_videos":
+            candidates = [self.published_videos_csv]
+        elif name == "calendar_events":
+            candidates = self._calendar_files()
+        elif name == "activity_logs":
+            candidates = self.activity_log_paths
+        else:
+            raise ValueError(f"Unknown dataset: {name}")
+        return [path for path in candidates if path and self.source.isfile(path)]
+
+    @contextmanager
+    def open_raw_reader(self, file_path):
+        """
+        Context manager reading a raw CSV or JSON takeout file through the
+        source into Arrow, for files DuckDB cannot scan by path (archive
+        members). CSV files are streamed as a RecordBatchReader, closed
+        with the file on exit; JSON files hold one object or a list of them
+        and become a Table with one row per object.
+        """
+        if file_path.endswith('.csv'):
+            with self.source.open(file_path) as file:
+                reader = pa_csv.open_csv(file)
+                try:
+                    yield reader
+                finally:
+                    reader.close()
+        elif file_path.endswith('.json'):
+            with self.source.open(file_path) as file:
+                data = json.load(file)
+            yield pa.Table.from_pylist(data if isinstance(data, list) else [data])
+        else:
+            raise ValueError(f"Unsupported file type for {file_path}")
+
+    def _parse_cached(self, file_path, kind, parse, **options):
+        """
+        Parse a source file into a DataFrame, going through the parse cache
+        when enabled. 'options' lists any setting that changes the output.
+        """
+        if self.parse_cache is None:
+            return parse(file_path)
+        return self.parse_cache.get_or_parse(
+            file_path, kind, parse, parser_version=PARSER_VERSION, lang=self.lang, **options
+        )
+
+    def _parse_many_cached(self, file_paths, kind, parse_many, **options):
+        """
+        Parse many source files with a batch parser (returning
+        {file_path: DataFrame}), only handing it the files that miss the
+        parse cache. Returns the DataFrames in the order of file_paths.
+        """
+        if self.parse_cache is None:
+            parsed = parse_many(file_paths)
+            return [parsed[path] for path in file_paths]
+
+        options = dict(options, parser_version=PARSER_VERSION, lang=self.lang)
+        keys = {path: self.parse_cache.key(path, kind, **options) for path in file_paths}
+        frames = {path: self.parse_cache.get(key) for path, key in keys.items()}
+        missing = [path for path, df in frames.items() if df is None]
+        if missing:
+            for path, df in parse_many(missing).items():
+                self.parse_cache.put(keys[path], df)
+                frames[path] = df
+        return [frames[path] for path in file_paths]
+
+    def clear_cache(self):
+        """Delete every entry of the on-disk parse cache."""
+        if self.parse_cache is not None:
+            self.parse_cache.clear()
+
+    @staticmethod
+    @contextmanager
+    def _dataset_errors(errors, name):
+        # Record a dataset's parse failure in `errors` instead of raising,
+        # when the caller collects them.
+        if errors is None:
+            yield
+            return
+        try:
+            yield
+        except Exception as e:
+            errors[name] = f"{type(e).__name__}: {e}"
+
+    def load_all_datasets(self, names=None, errors=None):
         """
         Load and process all configured datasets. Returns a dictionary of 
         non-empty DataFrames:
@@ -257,50 +1036,61 @@ class DataPreprocessor:
             "calendar_events": <DataFrame>,
             "activity_logs": <DataFrame>
           }
+
+        :param names: Optional iterable of dataset names to load. Datasets
+                      not listed are neither parsed nor returned.
+        :param errors: Optional dict. When given, a dataset failing to parse
+                       (e.g. a corrupt input file) is left out of the result
+                       and its error message stored under its name, and the
+                       other datasets are still loaded; otherwise the error
+                       is raised.
         """
+        wanted = set(self.DATASETS if names is None else names)
+        all_data = {}
+
         # 1. PROFILE
-        profile_df = pd.DataFrame([self.parse_profile_file()])
+        if "person_info" in wanted:
+            with self._dataset_errors(errors, "person_info"):
+                all_data["person_info"] = pd.DataFrame([self.parse_profile_file()])
 
         # 2. YOUTUBE SUBSCRIPTIONS
-        if self.subscribed_channels_csv and os.path.exists(self.subscribed_channels_csv):
-            subscribed_channels_df = pd.read_csv(self.subscribed_channels_csv)
-        else:
-            subscribed_channels_df = pd.DataFrame()
+        if "subscribed_channels" in wanted:
+            if self.subscribed_channels_csv and self.source.isfile(self.subscribed_channels_csv):
+                with self._dataset_errors(errors, "subscribed_channels"), \
+                        self.source.open(self.subscribed_channels_csv) as file:
+                    all_data["subscribed_channels"] = pd.read_csv(file)
 
         # 3. PUBLISHED VIDEOS
-        if self.published_videos_csv and os.path.exists(self.published_videos_csv):
-            published_videos_df = pd.read_csv(self.published_videos_csv)
-        else:
-            published_videos_df = pd.DataFrame()
+        if "published_videos" in wanted:
+            if self.published_videos_csv and self.source.isfile(self.published_videos_csv):
+                with self._dataset_errors(errors, "published_videos"), \
+                        self.source.open(self.published_videos_csv) as file:
+                    all_data["published_videos"] = pd.read_csv(file)
 
         # 4. CALENDAR ICS
-        calendar_frames = []
-        if self.calendar_path and os.path.isdir(self.calendar_path):
-            for entry in os.scandir(self.calendar_path):
-                if entry.is_file() and entry.path.endswith('.ics'):
-                    ics_events = self.parse_ics(entry.path)
-                    if ics_events:
-                        calendar_frames.append(pd.DataFrame(ics_events))
-        calendar_events_df = pd.concat(calendar_frames) if calendar_frames else pd.DataFrame()
+        if "calendar_events" in wanted:
+            with self._dataset_errors(errors, "calendar_events"):
+                calendar_frames = [
+                    df for df in self._parse_many_cached(
+                        self._calendar_files(), 'ics', self.read_calendar_files
+                    )
+                    if not df.empty
+                ]
+                if calendar_frames:
+                    all_data["calendar_events"] = pd.concat(calendar_frames, ignore_index=True)
 
         # 5. ACTIVITY LOGS (HTML)
-        activity_log_frames = []
-        for path in self.activity_log_paths:
-            if os.path.isfile(path):
-                activity_log_frames.append(self.read_activity_html(path))
-        activity_logs_df = (
-            pd.concat(activity_log_frames, ignore_index=True) 
-            if activity_log_frames else pd.DataFrame()
-        )
-
-        # Consolidate
-        all_data = {
-            "person_info": profile_df,
-            "subscribed_channels": subscribed_channels_df,
-            "published_videos": published_videos_df,
-            "calendar_events": calendar_events_df,
-            "activity_logs": activity_logs_df
-        }
+        if "activity_logs" in wanted:
+            with self._dataset_errors(errors, "activity_logs"):
+                activity_log_frames = self._parse_many_cached(
+                    [path for path in self.activity_log_paths if self.source.isfile(path)],
+                    'activity_html', self.read_activity_logs,
+                    include_all_strings=self.include_all_strings
+                )
+                if activity_log_frames:
+                    all_data["activity_logs"] = concat_categorical(
+                        activity_log_frames, CATEGORICAL_COLUMNS["activity_logs"]
+                    )
 
         # Return only non-empty DataFrames
         return {name: df for name, df in all_data.items() if not df.empty}
@@ -4,11 +4,14 @@ import xml.etree.ElementTree as ET
 import os
 import pathlib
 
+from app.takeout_source import LocalSource
+
 SUPPORTED_FILE_TYPES = ['.csv', '.html', '.xml', '.json']
 
 def find_leaf_files(directory):
     """
     Finds all files in the given directory that are leaves (i.e., files that are not directories themselves).
+    The tree is scanned in parallel (see app.takeout_source.LocalSource.scan).
     
     Args:
     - directory (str): The path to the directory to search within.
@@ -16,14 +19,10 @@ def find_leaf_files(directory):
     Returns:
     - list of str: A list of paths to leaf files.
     """
-    leaf_files = []
-    for root, dirs, files in os.walk(directory):
-        if files:  # Check if there are files in the current directory
-            # Append each file path to the leaf_files list
-            for file in files:
-                if pathlib.Path(file).suffix in SUPPORTED_FILE_TYPES: 
-                    leaf_files.append(os.path.join(root, file))
-    return leaf_files
+    return [
+        path for path, _, _ in LocalSource().scan(directory)
+        if pathlib.Path(path).suffix in SUPPORTED_FILE_TYPES
+    ]
 
 def parse_xml_to_dataframe(xml_file_path):
     """Parse XML file to a pandas DataFrame."""
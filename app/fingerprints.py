@@ -0,0 +1,43 @@
+import os
+import hashlib
+
+HASH_BLOCK_SIZE = 1 << 20
+
+
+def file_stat(path):
+    """Return the (size, mtime) pair used as a cheap change check for a file."""
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime
+
+
+def file_digest(path, block_size=HASH_BLOCK_SIZE):
+    """Return the BLAKE2b hex digest of a file's content, read in blocks."""
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def fingerprint_files(paths, known=None, source=None):
+    """
+    Fingerprint a list of files as {path: (size, mtime, content_hash)}.
+
+    Content hashes are only computed when a file's size or mtime differs
+    from the fingerprint recorded in 'known' (same shape as the result),
+    so unchanged files are never read. Files are read through 'source'
+    (see app.takeout_source) when given, e.g. to fingerprint the members
+    of a takeout archive from its metadata.
+    """
+    stat = source.stat if source is not None else file_stat
+    digest = source.digest if source is not None else file_digest
+    known = known or {}
+    fingerprints = {}
+    for path in paths:
+        size, mtime = stat(path)
+        previous = known.get(path)
+        if previous and previous[0] == size and previous[1] == mtime:
+            fingerprints[path] = previous
+        else:
+            fingerprints[path] = (size, mtime, digest(path))
+    return fingerprints
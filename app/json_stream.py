@@ -0,0 +1,104 @@
+import io
+import os
+import json
+
+READ_CHUNK_SIZE = 1 << 20
+
+_WHITESPACE = ' \t\n\r'
+# Characters that may continue a number (plus '' for the buffer edge).
+_NUMBER_TAIL = '0123456789+-.eE'
+
+
+class _JsonReader:
+    """
+    Incremental reader over a JSON text file: values are decoded one at a
+    time with json.JSONDecoder.raw_decode from a buffer that is refilled
+    from the file on demand, so only the current value and one read chunk
+    are ever held in memory.
+    """
+
+    def __init__(self, file, chunk_size):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self):
+        # Drop the consumed prefix before appending the next chunk.
+        chunk = self.file.read(self.chunk_size)
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        self.eof = not chunk
+        return bool(chunk)
+
+    def peek(self):
+        """Return the next non-whitespace character ('' at end of file)."""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer) or not self._fill():
+                return self.buffer[self.pos:self.pos + 1]
+
+    def expect(self, char):
+        """Consume the next non-whitespace character, which must be `char`."""
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Expected {char!r} in JSON stream, found {found or 'end of file'!r}")
+        self.pos += 1
+
+    def value(self):
+        """Decode and consume the next JSON value."""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # A number at the buffer edge, or followed by a character that
+            # could continue it ("1." or "1e" cut by a chunk boundary), may
+            # be cut short: decode it again with more data. A refill moves
+            # the buffer, so the position is only taken from a final decode.
+            if (not self.eof and isinstance(value, (int, float)) and not isinstance(value, bool)
+                    and self.buffer[end:end + 1] in _NUMBER_TAIL):
+                self._fill()
+                continue
+            self.pos = end
+            return value
+
+
+def iter_json_array(file, key, chunk_size=READ_CHUNK_SIZE):
+    """
+    Yield the elements of the array stored under `key` in the top-level
+    object of a JSON file, one at a time. Other top-level members are
+    decoded and skipped; a missing key yields nothing. `file` is a path or
+    a binary file object, which is closed once read.
+    """
+    if isinstance(file, (str, os.PathLike)):
+        file = open(file, 'rb')
+    with io.TextIOWrapper(file, encoding='utf-8') as file:
+        reader = _JsonReader(file, chunk_size)
+        reader.expect('{')
+        if reader.peek() == '}':
+            return
+        while True:
+            name = reader.value()
+            reader.expect(':')
+            if name == key and reader.peek() == '[':
+                reader.expect('[')
+                if reader.peek() != ']':
+                    while True:
+                        yield reader.value()
+                        if reader.peek() != ',':
+                            break
+                        reader.expect(',')
+                reader.expect(']')
+            else:
+                reader.value()
+            if reader.peek() != ',':
+                break
+            reader.expect(',')
+        reader.expect('}')
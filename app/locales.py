@@ -0,0 +1,191 @@
+import os
+import re
+from functools import lru_cache
+
+from babel.dates import get_month_names
+
+# UTC offsets, in minutes, of the timezone abbreviations found in takeouts.
+TIMEZONE_OFFSETS = {
+    'utc': 0, 'gmt': 0, 'z': 0, 'wet': 0, 'west': 60, 'bst': 60,
+    'cet': 60, 'cest': 120, 'eet': 120, 'eest': 180, 'msk': 180,
+    'ist': 330, 'jst': 540, 'aest': 600, 'aedt': 660,
+    'est': -300, 'edt': -240, 'cst': -360, 'cdt': -300,
+    'mst': -420, 'mdt': -360, 'pst': -480, 'pdt': -420,
+}
+
+# Whitespace class shared by Python's re and Arrow's RE2 (which only treats
+# ASCII characters as \s); takeouts use narrow no-break spaces before AM/PM.
+_SPACE = '[\\s \xa0]'
+_TIME = (
+    r'(?P<hour>\d{1,2}):(?P<minute>\d{2}):(?P<second>\d{2})'
+    rf'(?:{_SPACE}*(?P<ampm>[AaPp]\.?[Mm]\.?))?'
+    rf'(?:{_SPACE}*(?P<tz>[A-Za-z]{{1,5}}(?:[+-]\d{{1,2}}(?::?\d{{2}})?)?|[+-]\d{{1,2}}(?::?\d{{2}})?))?'
+    rf'{_SPACE}*$'
+)
+# "17 ene 2024, 10:22:33 CET"
+DAY_FIRST_PATTERN = (
+    rf'^{_SPACE}*(?P<day>\d{{1,2}}){_SPACE}+(?P<month>[^\W\d_]+)\.?{_SPACE}+'
+    rf'(?P<year>\d{{4}}),?{_SPACE}+' + _TIME
+)
+# "Jan 17, 2024, 10:22:33 AM CET"
+MONTH_FIRST_PATTERN = (
+    rf'^{_SPACE}*(?P<month>[^\W\d_]+)\.?{_SPACE}+(?P<day>\d{{1,2}}),{_SPACE}+'
+    rf'(?P<year>\d{{4}}),?{_SPACE}+' + _TIME
+)
+
+_NUMERIC_OFFSET_PATTERN = re.compile(r'^(?:[a-z]{1,5})?([+-])(\d{1,2})(?::?(\d{2}))?$')
+
+# Per-locale description of a takeout. Paths are relative to the takeout
+# root; action codes map the localized verb of an activity entry to a
+# language-independent action type.
+LOCALE_DEFINITIONS = {
+    'es': {
+        'babel_locale': 'es',
+        'timestamp_pattern': DAY_FIRST_PATTERN,
+        'activity_log_name': 'MiActividad.html',
+        'paths': {
+            "activity_root": ("Mi actividad",),
+            "profile_json": ("Perfil", "Perfil.json"),
+            "subscriptions_csv": ("YouTube y YouTube Music", "suscripciones", "suscripciones.csv"),
+            "video_metadata_csv": ("YouTube y YouTube Music", "metadatos del vídeo", "vídeos.csv"),
+            "playlists_csv": (
+                "YouTube y YouTube Music", "listas de reproducción", "Listas de reproducción.csv"
+            ),
+            "calendar": ("Calendar",),
+            "access_logs_csv": (
+                "Actividad de registro de accesos",
+                "Actividades_ una lista con los servicios de Google.csv"
+            ),
+            "chrome_history_json": ("Chrome", "Historial.json"),
+        },
+        'action_codes': {
+            'Has visto': 'watched',
+            'Has buscado': 'searched',
+            'Has visitado': 'visited',
+            'Has usado': 'used',
+            'Te has suscrito a': 'subscribed',
+            'Has dado "Me gusta" a': 'liked',
+            'Has descargado': 'downloaded',
+            'Has compartido': 'shared',
+            'Has respondido a': 'replied',
+            'Has comentado': 'commented',
+        },
+    },
+    'en': {
+        'babel_locale': 'en',
+        'timestamp_pattern': MONTH_FIRST_PATTERN,
+        'activity_log_name': 'MyActivity.html',
+        'paths': {
+            "activity_root": ("My Activity",),
+            "profile_json": ("Profile", "Profile.json"),
+            "subscriptions_csv": ("YouTube and YouTube Music", "subscriptions", "subscriptions.csv"),
+            "video_metadata_csv": ("YouTube and YouTube Music", "video metadata", "videos.csv"),
+            "playlists_csv": ("YouTube and YouTube Music", "playlists", "playlists.csv"),
+            "calendar": ("Calendar",),
+            "access_logs_csv": (
+                "Access Log Activity",
+                "Activities - A list of Google services accessed by.csv"
+            ),
+            "chrome_history_json": ("Chrome", "History.json"),
+        },
+        'action_codes': {
+            'Watched': 'watched',
+            'Searched for': 'searched',
+            'Visited': 'visited',
+            'Used': 'used',
+            'Subscribed to': 'subscribed',
+            'Liked': 'liked',
+            'Downloaded': 'downloaded',
+            'Shared': 'shared',
+            'Replied to': 'replied',
+            'Commented on': 'commented',
+        },
+    },
+}
+DEFAULT_LOCALE = 'es'
+
+
+def timezone_offset_minutes(token):
+    """
+    Return the UTC offset in minutes of a timezone token, 0 when there is
+    no token, or None when the token is unknown.
+    """
+    if not isinstance(token, str) or not token:
+        return 0
+    token = token.lower()
+    if token in TIMEZONE_OFFSETS:
+        return TIMEZONE_OFFSETS[token]
+    match = _NUMERIC_OFFSET_PATTERN.match(token)
+    if not match:
+        return None
+    sign, hours, minutes = match.groups()
+    offset = int(hours) * 60 + int(minutes or 0)
+    return -offset if sign == '-' else offset
+
+
+def _build_month_table(babel_locale):
+    """
+    Map every month token of a locale (abbreviated and wide names from
+    babel, lowercased and without dots, plus unambiguous 3-letter
+    prefixes) to its month number.
+    """
+    table = {}
+    prefixes = {}
+    for width in ('abbreviated', 'wide'):
+        for number, name in get_month_names(width, locale=babel_locale).items():
+            token = name.lower().rstrip('.')
+            table[token] = number
+            prefixes.setdefault(token[:3], set()).add(number)
+    for prefix, numbers in prefixes.items():
+        if len(numbers) == 1:
+            table.setdefault(prefix, numbers.pop())
+    return table
+
+
+class LocaleTables:
+    """Precompiled lookup tables of one takeout locale."""
+
+    def __init__(self, code):
+        definition = LOCALE_DEFINITIONS[code]
+        self.code = code
+        self.paths = definition['paths']
+        self.activity_log_name = definition['activity_log_name']
+        self.action_codes = definition['action_codes']
+        self.months = _build_month_table(definition['babel_locale'])
+        self.timestamp_pattern = definition['timestamp_pattern']
+        self.timestamp_regex = re.compile(self.timestamp_pattern)
+
+    def resolve_paths(self, takeout_path):
+        """Return the locale's logical paths resolved under a takeout root."""
+        return {
+            name: os.path.join(takeout_path, *parts) for name, parts in self.paths.items()
+        }
+
+
+@lru_cache(maxsize=None)
+def get_locale_tables(code):
+    """Return the (cached) precompiled tables of a locale code."""
+    if code not in LOCALE_DEFINITIONS:
+        raise ValueError(
+            f"Unsupported takeout locale '{code}'. "
+            f"Expected one of: {', '.join(LOCALE_DEFINITIONS)}"
+        )
+    return LocaleTables(code)
+
+
+def detect_locale(takeout_path, exists=os.path.exists):
+    """
+    Detect the locale of a takeout from the localized folder and file
+    names it contains. Falls back to DEFAULT_LOCALE when nothing matches.
+    'exists' checks a path, e.g. the exists method of a takeout source.
+    """
+    best_code, best_score = DEFAULT_LOCALE, 0
+    for code in LOCALE_DEFINITIONS:
+        paths = get_locale_tables(code).resolve_paths(takeout_path)
+        score = sum(
+            1 for name, path in paths.items()
+            if name != "calendar" and exists(path)
+        )
+        if score > best_score:
+            best_code, best_score = code, score
+    return best_code
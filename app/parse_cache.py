@@ -0,0 +1,114 @@
+import os
+import hashlib
+import uuid
+
+import pandas as pd
+import pyarrow as pa
+
+from app.fingerprints import file_digest
+
+DEFAULT_CACHE_MAX_BYTES = 2 * 1024 ** 3
+
+
+class ParseCache:
+    """
+    Content-addressed on-disk cache of parsed sources, stored as Parquet.
+
+    Entries are keyed by the content hash of the source file, the parser
+    version and any option that changes the parser output (such as the
+    takeout language), so identical files from different or overlapping
+    takeout exports share the same entry. The cache is capped in size and
+    evicts least recently used entries first.
+    """
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_CACHE_MAX_BYTES, digest=file_digest):
+        """
+        :param cache_dir: Directory holding the cached Parquet files.
+        :param max_bytes: Maximum total size of the cache before eviction.
+        :param digest: Callable(file_path) returning the content hash of a
+                       source file (e.g. the digest of a takeout source).
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.digest = digest
+
+    def key(self, file_path, kind, **options):
+        """
+        Build the cache key of a source file parsed by a given parser kind
+        with the given output-affecting options.
+        """
+        parts = [kind, self.digest(file_path)]
+        parts += [f"{name}={options[name]}" for name in sorted(options)]
+        return hashlib.sha256('|'.join(parts).encode('utf-8')).hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.parquet")
+
+    def get(self, key):
+        """Return the cached DataFrame for a key, or None on a miss."""
+        path = self._entry_path(key)
+        try:
+            df = pd.read_parquet(path)
+        except (FileNotFoundError, pa.ArrowException):
+            return None
+        # Refresh the mtime so eviction treats the entry as recently used.
+        os.utime(path)
+        return df
+
+    def put(self, key, df):
+        """
+        Store a DataFrame under a key, then evict old entries if the cache
+        exceeds its size cap. Frames that cannot be stored as Parquet are
+        simply not cached.
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._entry_path(key)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            df.to_parquet(tmp_path, index=False)
+        except pa.ArrowException as e:
+            print(f"Not caching {key}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def get_or_parse(self, file_path, kind, parse, **options):
+        """
+        Return the parsed DataFrame of a file from the cache, or call
+        parse(file_path) and cache its result on a miss.
+        """
+        key = self.key(file_path, kind, **options)
+        df = self.get(key)
+        if df is None:
+            df = parse(file_path)
+            self.put(key, df)
+        return df
+
+    def _entries(self):
+        if not os.path.isdir(self.cache_dir):
+            return []
+        return [
+            entry for entry in os.scandir(self.cache_dir)
+            if entry.is_file() and entry.name.endswith('.parquet')
+        ]
+
+    def size(self):
+        """Return the total size in bytes of the cached entries."""
+        return sum(entry.stat().st_size for entry in self._entries())
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits its cap."""
+        entries = sorted(self._entries(), key=lambda entry: entry.stat().st_mtime)
+        total = sum(entry.stat().st_size for entry in entries)
+        for entry in entries:
+            if total <= self.max_bytes:
+                break
+            total -= entry.stat().st_size
+            os.remove(entry.path)
+
+    def clear(self):
+        """Delete every cached entry."""
+        for entry in self._entries():
+            os.remove(entry.path)
@@ -0,0 +1,191 @@
+"""
+Registry of the named SQL statements used by the dashboard.
+
+Every statement is a constant SQL text with `$name` placeholders; callers
+bind user input as parameters instead of formatting it into the SQL. The
+text of a statement never changes between calls, so DuckDB sees a single
+statement per query and the query result cache keys on it plus params.
+
+Activity queries have rollup variants that read the pre-aggregated
+rollup_activity_* tables; route_activity_query picks one for a filter.
+"""
+from datetime import datetime, timedelta
+
+# Rollups built at the end of run_mapping (mappings/rollup_activity_history.sql).
+ROLLUP_TABLES = ('rollup_activity_daily', 'rollup_activity_monthly', 'rollup_activity_hourly')
+
+# Bounds used for an open side of the date range.
+MIN_TIMESTAMP = datetime(1, 1, 1)
+MAX_TIMESTAMP = datetime(9999, 12, 31, 23, 59, 59)
+
+# A NULL date leaves that side of the range open; an empty platform list
+# matches every platform.
+_PLATFORM_FILTER = "(len(CAST($platforms AS VARCHAR[])) = 0 OR platform = ANY(CAST($platforms AS VARCHAR[])))"
+
+_ACTIVITY_FILTER = """
+    ($start_date IS NULL OR activity_timestamp >= CAST($start_date AS TIMESTAMP))
+    AND ($end_date IS NULL OR activity_timestamp <= CAST($end_date AS TIMESTAMP))
+    AND """ + _PLATFORM_FILTER
+
+# Rollup variants split [start, end] into s <= d0 <= m0 <= m1 <= d1 <= e:
+# partial days at both edges are scanned from the clean table, whole days
+# come from the daily rollup and whole months from the monthly rollup.
+_ROLLUP_PARTS = f"""
+    SELECT platform, CAST(DATE_TRUNC('month', activity_timestamp) AS DATE) AS activity_month, COUNT(*) AS count
+    FROM clean_activity_history
+    WHERE $s < $d0 AND activity_timestamp >= $s AND activity_timestamp < $d0
+      AND {_PLATFORM_FILTER}
+    GROUP BY 1, 2
+    UNION ALL
+    SELECT platform, CAST(DATE_TRUNC('month', activity_timestamp) AS DATE), COUNT(*)
+    FROM clean_activity_history
+    WHERE $d1 <= $e AND activity_timestamp >= $d1 AND activity_timestamp <= $e
+      AND {_PLATFORM_FILTER}
+    GROUP BY 1, 2
+    UNION ALL
+    SELECT platform, CAST(DATE_TRUNC('month', activity_day) AS DATE), SUM(count)
+    FROM rollup_activity_daily
+    WHERE ((activity_day >= CAST($d0 AS DATE) AND activity_day < CAST($m0 AS DATE))
+           OR (activity_day >= CAST($m1 AS DATE) AND activity_day < CAST($d1 AS DATE)))
+      AND {_PLATFORM_FILTER}
+    GROUP BY 1, 2
+    UNION ALL
+    SELECT platform, activity_month, count
+    FROM rollup_activity_monthly
+    WHERE activity_month >= CAST($m0 AS DATE) AND activity_month < CAST($m1 AS DATE)
+      AND {_PLATFORM_FILTER}
+"""
+
+DASHBOARD_QUERIES = {
+    'profile_name': """
+        SELECT MAX(FormattedName) AS name
+        FROM clean_profiles
+    """,
+    'activity_platforms': """
+        SELECT DISTINCT platform
+        FROM clean_activity_history
+        ORDER BY platform
+    """,
+    'activity_date_range': """
+        SELECT MIN(activity_timestamp) AS start, MAX(activity_timestamp) AS "end"
+        FROM clean_activity_history
+    """,
+    'kpi_by_platform': f"""
+        SELECT platform, COUNT(*) AS count
+        FROM clean_activity_history
+        WHERE {_ACTIVITY_FILTER}
+        GROUP BY platform
+        ORDER BY count DESC, platform
+    """,
+    'kpi_by_platform_rollup': f"""
+        WITH parts AS ({_ROLLUP_PARTS})
+        SELECT platform, SUM(count)::BIGINT AS count
+        FROM parts
+        GROUP BY platform
+        ORDER BY count DESC, platform
+    """,
+    'monthly_timeline': f"""
+        SELECT
+            YEAR(activity_timestamp) AS period_year,
+            MONTH(activity_timestamp) AS month_no,
+            CONCAT(YEAR(activity_timestamp), '-', MONTH(activity_timestamp)) AS period,
+            COUNT(*) AS count
+        FROM clean_activity_history
+        WHERE {_ACTIVITY_FILTER}
+        GROUP BY 1, 2
+        ORDER BY period_year ASC, month_no ASC
+    """,
+    'monthly_timeline_rollup': f"""
+        WITH parts AS ({_ROLLUP_PARTS})
+        SELECT
+            YEAR(activity_month) AS period_year,
+            MONTH(activity_month) AS month_no,
+            CONCAT(YEAR(activity_month), '-', MONTH(activity_month)) AS period,
+            SUM(count)::BIGINT AS count
+        FROM parts
+        GROUP BY 1, 2, 3
+        ORDER BY period_year ASC, month_no ASC
+    """,
+    'activity_by_hour': f"""
+        SELECT hour_of_day, action_code, SUM(count)::BIGINT AS count
+        FROM rollup_activity_hourly
+        WHERE {_PLATFORM_FILTER}
+        GROUP BY 1, 2
+        ORDER BY 1, 2
+    """,
+}
+
+# Activity queries that have an equivalent rollup variant.
+ROLLUP_ROUTES = {
+    'kpi_by_platform': 'kpi_by_platform_rollup',
+    'monthly_timeline': 'monthly_timeline_rollup',
+}
+
+
+def get_query(name):
+    """Return the SQL text of a registered query. Unknown names raise ValueError."""
+    try:
+        return DASHBOARD_QUERIES[name]
+    except KeyError:
+        raise ValueError(f"Unknown query: {name}") from None
+
+
+def activity_filter_params(platforms, start_date, end_date):
+    """
+    Build the bound parameters of the activity filter from the dashboard
+    inputs. An empty or missing platform selection matches every platform
+    and a missing date leaves that side of the range open.
+    """
+    return {
+        'platforms': [str(platform) for platform in platforms or []],
+        'start_date': None if start_date is None else str(start_date),
+        'end_date': None if end_date is None else str(end_date),
+    }
+
+
+def _to_timestamp(value, default):
+    if value is None:
+        return default
+    return min(max(datetime.fromisoformat(str(value)), MIN_TIMESTAMP), MAX_TIMESTAMP)
+
+
+def _next_month(day):
+    return (day.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+
+def rollup_bounds(start_date, end_date):
+    """
+    Split the inclusive range [start_date, end_date] into the boundaries
+    s <= d0 <= m0 <= m1 <= d1 <= e of the rollup queries: [d0, d1) holds
+    the whole days of the range and [m0, m1) its whole months.
+    """
+    s = _to_timestamp(start_date, MIN_TIMESTAMP)
+    e = _to_timestamp(end_date, MAX_TIMESTAMP)
+    midnight = datetime(s.year, s.month, s.day)
+    d0 = midnight if midnight == s else midnight + timedelta(days=1)
+    # Day D is whole when its last microsecond is still <= e.
+    last = e + timedelta(microseconds=1)
+    d1 = datetime(last.year, last.month, last.day)
+    if d0 >= d1:
+        # No whole day: the edge scan covers [s, e] on its own.
+        d0 = d1 = m0 = m1 = s
+    else:
+        m0 = d0 if d0.day == 1 else _next_month(d0)
+        m1 = d1.replace(day=1)
+        if m0 >= m1:
+            m0 = m1 = d0
+    return {'s': s, 'd0': d0, 'm0': m0, 'm1': m1, 'd1': d1, 'e': e}
+
+
+def route_activity_query(name, platforms, start_date, end_date, use_rollups=True):
+    """
+    Pick the statement and parameters answering an activity query for the
+    dashboard filters. Queries with a rollup variant are answered from the
+    rollup tables plus an edge scan of partial days when use_rollups is
+    set; otherwise the clean table is filtered directly.
+    """
+    if use_rollups and name in ROLLUP_ROUTES:
+        params = rollup_bounds(start_date, end_date)
+        params['platforms'] = [str(platform) for platform in platforms or []]
+        return ROLLUP_ROUTES[name], params
+    return name, activity_filter_params(platforms, start_date, end_date)
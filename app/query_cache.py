@@ -0,0 +1,131 @@
+import re
+import json
+import time
+import threading
+from collections import OrderedDict
+
+DEFAULT_CACHE_MAX_BYTES = 256 * 1024 ** 2
+DEFAULT_CACHE_TTL = 15 * 60
+
+# Quoted literals/identifiers are kept verbatim when normalizing SQL.
+_QUOTED_PATTERN = re.compile(r"""('(?:[^']|'')*'|"(?:[^"]|"")*")""")
+_WHITESPACE_PATTERN = re.compile(r'\s+')
+
+
+def normalize_sql(query):
+    """
+    Normalize a SQL string for use as a cache key: runs of whitespace
+    outside quoted literals collapse to one space and trailing semicolons
+    are dropped. Quoted literals are left untouched.
+    """
+    parts = _QUOTED_PATTERN.split(query.strip())
+    for index in range(0, len(parts), 2):
+        parts[index] = _WHITESPACE_PATTERN.sub(' ', parts[index])
+    return ''.join(parts).strip().rstrip(';').strip()
+
+
+class QueryResultCache:
+    """
+    In-memory LRU/TTL cache of query results (DataFrames).
+
+    Entries are keyed by normalized SQL plus bound parameters. The cache
+    keeps the total DataFrame memory under a byte budget, expires entries
+    after a TTL, and can drop every entry that references a table when
+    that table is rebuilt. Hit/miss/eviction counters are kept for sizing.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_CACHE_MAX_BYTES, ttl=DEFAULT_CACHE_TTL):
+        """
+        :param max_bytes: Memory budget for all cached DataFrames.
+        :param ttl: Seconds after which an entry expires (None: never).
+        """
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def make_key(query, params=None):
+        """Build the cache key of a query and its parameters."""
+        return normalize_sql(query), json.dumps(params, sort_keys=True, default=str)
+
+    def _remove(self, key):
+        df, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def get(self, query, params=None):
+        """Return a cached result (shallow copy) or None on a miss."""
+        key = self.make_key(query, params)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl is not None and time.monotonic() - entry[2] > self.ttl:
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0].copy(deep=False)
+
+    def put(self, query, params, df):
+        """Store a result, evicting least recently used entries to fit the budget."""
+        key = self.make_key(query, params)
+        size = int(df.memory_usage(deep=True, index=True).sum())
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (df, size, time.monotonic())
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def get_or_execute(self, query, params, execute):
+        """Return the cached result of a query, or run execute() and cache it."""
+        df = self.get(query, params)
+        if df is None:
+            df = execute()
+            self.put(query, params, df)
+            df = df.copy(deep=False)
+        return df
+
+    def invalidate(self, tables):
+        """Drop every entry whose SQL references any of the given tables."""
+        patterns = [re.compile(rf'\b{re.escape(table)}\b', re.IGNORECASE) for table in tables]
+        with self._lock:
+            stale = [
+                key for key in self._entries
+                if any(pattern.search(key[0]) for pattern in patterns)
+            ]
+            for key in stale:
+                self._remove(key)
+            self.invalidations += len(stale)
+
+    def clear(self):
+        """Drop every entry."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """Return the cache counters and current size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
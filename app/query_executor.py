@@ -0,0 +1,207 @@
+import time
+import uuid
+import threading
+from collections import deque
+from concurrent.futures import Future
+
+# Scheduling classes: dashboard jobs are short and latency sensitive,
+# ad-hoc jobs come from the query page and may run for a long time.
+DASHBOARD = 'dashboard'
+ADHOC = 'adhoc'
+PRIORITIES = (DASHBOARD, ADHOC)
+
+DEFAULT_WORKERS = 4
+DEFAULT_RESERVED_WORKERS = 1
+DEFAULT_MAX_PENDING = 64
+DEFAULT_RESULT_TTL = 10 * 60
+
+
+class ExecutorBusyError(RuntimeError):
+    """Raised when a job is submitted while its queue is full."""
+
+
+class QueryJob:
+    """A unit of work submitted to the QueryExecutor, with its result future."""
+
+    def __init__(self, job_id, priority, fn, args, kwargs):
+        self.id = job_id
+        self.priority = priority
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.future = Future()
+        self.submitted_at = time.monotonic()
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def status(self):
+        """One of 'queued', 'running', 'cancelled', 'failed' or 'done'."""
+        if self.future.cancelled():
+            return 'cancelled'
+        if not self.future.done():
+            return 'running' if self.started_at is not None else 'queued'
+        return 'failed' if self.future.exception() is not None else 'done'
+
+    def result(self, timeout=None):
+        """Wait for the job and return its result (re-raising its error)."""
+        return self.future.result(timeout)
+
+
+class QueryExecutor:
+    """
+    Dedicated worker threads that run database jobs off the request threads.
+
+    Jobs wait in one bounded FIFO queue per scheduling class; a full queue
+    rejects new jobs with ExecutorBusyError (backpressure). Workers always
+    take dashboard jobs first, and `reserved_workers` of them only ever run
+    dashboard jobs, so short dashboard queries never wait behind long
+    ad-hoc ones. Finished jobs are kept for `result_ttl` seconds so their
+    results can be polled by id.
+    """
+
+    def __init__(self, workers=DEFAULT_WORKERS, reserved_workers=DEFAULT_RESERVED_WORKERS,
+                 max_pending=DEFAULT_MAX_PENDING, result_ttl=DEFAULT_RESULT_TTL, interrupt=None):
+        """
+        :param workers: Number of worker threads.
+        :param reserved_workers: Workers that only run dashboard jobs.
+        :param max_pending: Maximum queued jobs per scheduling class.
+        :param result_ttl: Seconds a finished job stays available for polling.
+        :param interrupt: Callable(job_id) stopping a running job, used by cancel().
+        """
+        if not 0 <= reserved_workers < workers:
+            raise ValueError("reserved_workers must leave at least one shared worker")
+        self.workers = workers
+        self.reserved_workers = reserved_workers
+        self.max_pending = max_pending
+        self.result_ttl = result_ttl
+        self.interrupt = interrupt
+        self._queues = {priority: deque() for priority in PRIORITIES}
+        self._jobs = {}
+        self._condition = threading.Condition()
+        self._threads = []
+        self._stopping = False
+
+    def _start(self):
+        # Workers are started lazily, on the first submitted job.
+        if self._threads:
+            return
+        for index in range(self.workers):
+            thread = threading.Thread(
+                target=self._work, args=(index < self.reserved_workers,),
+                name=f"query-executor-{index}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def _prune(self):
+        now = time.monotonic()
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished_at is not None and now - job.finished_at > self.result_ttl
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def submit(self, fn, *args, priority=ADHOC, job_id=None, **kwargs):
+        """
+        Queue fn(*args, **kwargs) and return its QueryJob without waiting.
+        Raises ExecutorBusyError when the queue of `priority` is full.
+        """
+        if priority not in self._queues:
+            raise ValueError(f"Unknown priority: {priority}")
+        job = QueryJob(job_id or uuid.uuid4().hex, priority, fn, args, kwargs)
+        with self._condition:
+            if self._stopping:
+                raise RuntimeError("Executor is shut down")
+            self._prune()
+            if job.id in self._jobs and self._jobs[job.id].finished_at is None:
+                raise ValueError(f"Job id already in use: {job.id}")
+            if len(self._queues[priority]) >= self.max_pending:
+                raise ExecutorBusyError(f"Too many pending {priority} queries, retry later")
+            self._start()
+            self._jobs[job.id] = job
+            self._queues[priority].append(job)
+            self._condition.notify_all()
+        return job
+
+    def run(self, fn, *args, priority=DASHBOARD, timeout=None, **kwargs):
+        """Submit a job and wait for its result."""
+        return self.submit(fn, *args, priority=priority, **kwargs).result(timeout)
+
+    def get(self, job_id):
+        """Return the job with this id, or None if it is unknown or expired."""
+        with self._condition:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        """
+        Cancel a job: queued jobs are dropped, running ones are interrupted
+        through the `interrupt` callable. Returns False if nothing was cancelled.
+        """
+        with self._condition:
+            job = self._jobs.get(job_id)
+            if job is None or job.future.done():
+                return False
+            if job.started_at is None:
+                self._queues[job.priority].remove(job)
+                job.future.cancel()
+                job.finished_at = time.monotonic()
+                return True
+        return bool(self.interrupt and self.interrupt(job_id))
+
+    def stats(self):
+        """Return queue lengths and job counts by status."""
+        with self._condition:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+            return {
+                'queued': {priority: len(queue) for priority, queue in self._queues.items()},
+                'jobs': counts,
+                'workers': self.workers,
+            }
+
+    def _next_job(self, reserved):
+        with self._condition:
+            while True:
+                if self._stopping:
+                    return None
+                if self._queues[DASHBOARD]:
+                    job = self._queues[DASHBOARD].popleft()
+                elif not reserved and self._queues[ADHOC]:
+                    job = self._queues[ADHOC].popleft()
+                else:
+                    self._condition.wait()
+                    continue
+                if job.future.set_running_or_notify_cancel():
+                    job.started_at = time.monotonic()
+                    return job
+
+    def _work(self, reserved):
+        while True:
+            job = self._next_job(reserved)
+            if job is None:
+                return
+            try:
+                job.future.set_result(job.fn(*job.args, **job.kwargs))
+            except BaseException as e:
+                job.future.set_exception(e)
+            finally:
+                job.finished_at = time.monotonic()
+
+    def shutdown(self, wait=True):
+        """Stop the workers; queued jobs are cancelled."""
+        with self._condition:
+            self._stopping = True
+            for queue in self._queues.values():
+                while queue:
+                    job = queue.popleft()
+                    job.future.cancel()
+                    job.finished_at = time.monotonic()
+            self._condition.notify_all()
+            threads, self._threads = self._threads, []
+        if wait:
+            for thread in threads:
+                thread.join()
+
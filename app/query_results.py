@@ -0,0 +1,134 @@
+import io
+import re
+import json
+import base64
+import hashlib
+
+import pyarrow as pa
+
+from app.query_cache import normalize_sql
+
+DEFAULT_PAGE_SIZE = 200
+MAX_PAGE_SIZE = 1000
+STREAM_BATCH_SIZE = 10000
+MAX_RESULT_ROWS = 1_000_000
+
+# Leading keywords of statements that can be wrapped as a subquery; others
+# (PRAGMA, EXPLAIN, SHOW, SET, ...) are run as they are, as a single page.
+PAGEABLE_KEYWORDS = ('select', 'with', 'from', 'values', 'table')
+_LEADING_COMMENTS = re.compile(r'\s*(?:(?:--[^\n]*(?:\n|$)|/\*.*?\*/)\s*)*', re.DOTALL)
+
+STREAM_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'arrow': 'application/vnd.apache.arrow.stream',
+}
+
+
+def prepare_user_query(query):
+    """
+    Clean up an ad-hoc query so it can be wrapped as a subquery: surrounding
+    whitespace and trailing semicolons are dropped.
+    """
+    query = query.strip().rstrip(';').strip()
+    if not query:
+        raise ValueError("No SQL query provided")
+    return query
+
+
+def is_pageable(query):
+    """Return True if a query is a SELECT-like statement that paged_query can wrap."""
+    body = query[_LEADING_COMMENTS.match(query).end():]
+    if body.startswith('('):
+        return True
+    match = re.match(r'[A-Za-z]+', body)
+    return bool(match) and match.group(0).lower() in PAGEABLE_KEYWORDS
+
+
+def paged_query(query):
+    """
+    Wrap a query so a page of it can be fetched with $limit/$offset. The
+    query sits on its own lines, so a trailing -- comment cannot swallow
+    the closing parenthesis.
+
+    Every page re-runs the query with a new OFFSET: unless the query has an
+    ORDER BY giving its rows a total order, DuckDB may return them in a
+    different order on each run (GROUP BY, parallel scans), so rows can be
+    repeated or missed across pages.
+    """
+    return f"SELECT * FROM (\n{query}\n) AS page_source LIMIT $limit OFFSET $offset"
+
+
+def _query_digest(query):
+    return hashlib.blake2b(normalize_sql(query).encode('utf-8'), digest_size=8).hexdigest()
+
+
+def encode_page_token(query, offset):
+    """Build the opaque token pointing at the page that starts at `offset`."""
+    payload = json.dumps({'q': _query_digest(query), 'offset': offset}).encode('utf-8')
+    return base64.urlsafe_b64encode(payload).decode('ascii')
+
+
+def decode_page_token(query, token):
+    """
+    Return the row offset of a page token (0 when there is no token).
+    Malformed tokens, or tokens issued for another query, raise ValueError.
+    """
+    if not token:
+        return 0
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token.encode('ascii')))
+        offset = int(payload['offset'])
+        digest = payload['q']
+    except (ValueError, KeyError, TypeError, UnicodeEncodeError):
+        raise ValueError("Invalid page token") from None
+    if digest != _query_digest(query) or offset < 0:
+        raise ValueError("Page token does not belong to this query")
+    return offset
+
+
+def clamp_page_size(page_size):
+    """Bound a requested page size to [1, MAX_PAGE_SIZE]."""
+    if page_size is None:
+        return DEFAULT_PAGE_SIZE
+    return max(1, min(int(page_size), MAX_PAGE_SIZE))
+
+
+def limit_batches(batches, max_rows):
+    """
+    Yield record batches until `max_rows` rows were produced, slicing the
+    last one. The source is closed afterwards so it can release its cursor.
+    """
+    remaining = max_rows
+    try:
+        for batch in batches if remaining > 0 else ():
+            if batch.num_rows > remaining:
+                batch = batch.slice(0, remaining)
+            remaining -= batch.num_rows
+            yield batch
+            if remaining <= 0:
+                break
+    finally:
+        close = getattr(batches, 'close', None)
+        if close is not None:
+            close()
+
+
+def iter_ndjson(batches):
+    """Encode record batches as newline-delimited JSON, one chunk per batch."""
+    for batch in batches:
+        lines = [json.dumps(row, default=str) for row in batch.to_pylist()]
+        if lines:
+            yield ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+def iter_arrow_ipc(schema, batches):
+    """Encode record batches as an Arrow IPC stream, one chunk per batch."""
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        for batch in batches:
+            writer.write_batch(batch)
+            yield sink.getvalue()
+            sink.seek(0)
+            sink.truncate()
+    # End-of-stream marker.
+    yield sink.getvalue()
@@ -1,14 +1,78 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, render_template, request, jsonify, Response, stream_with_context
 from dash_app import init_dash_app
-from data_interface import GoogleTakeoutProcessor 
+from data_interface import (
+    GoogleTakeoutProcessor, QueryCancelledError, DEFAULT_QUERY_TIME_LIMIT, MAX_QUERY_TIME_LIMIT
+)
+from app.query_executor import ExecutorBusyError
+from app.query_results import STREAM_FORMATS, MAX_RESULT_ROWS, iter_ndjson, iter_arrow_ipc
+from concurrent import futures
+import atexit
+import json
 import os
 
 # Initialize the GoogleTakeoutProcessor
 takeout_processor = GoogleTakeoutProcessor(
     takeout_path=os.environ.get('TAKEOUT_PATH', '/home/ivan/Desktop/datasets/other_takeouts/Takeout'),
     data_output_folder='data',
-    reset_db=True
+    reset_db=False
 )
+atexit.register(takeout_processor.close)
+
+def number_option(data, name, default, cast):
+    """Read a numeric option of a query request; invalid values raise ValueError."""
+    try:
+        return cast(data.get(name) or default)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid {name}: {data.get(name)!r}") from None
+
+def query_limits(data):
+    """Read the query id and the (capped) time limit of an ad-hoc query request."""
+    time_limit = number_option(data, 'timeout', DEFAULT_QUERY_TIME_LIMIT, float)
+    return data.get('query_id'), min(max(time_limit, 0.1), MAX_QUERY_TIME_LIMIT)
+
+def query_error_response(error):
+    """Map the error of a query to a JSON response and status code."""
+    if isinstance(error, ExecutorBusyError):
+        return jsonify({"error": str(error)}), 429, {"Retry-After": "1"}
+    if isinstance(error, ValueError):
+        return jsonify({"error": str(error)}), 400
+    if isinstance(error, TimeoutError):
+        return jsonify({"error": str(error)}), 408
+    if isinstance(error, (QueryCancelledError, futures.CancelledError)):
+        return jsonify({"error": str(error) or "Query was cancelled", "cancelled": True}), 409
+    return jsonify({"error": str(error)}), 500
+
+def page_response(job):
+    """JSON response of a query page job: its page once done, else its status."""
+    if not job.future.done():
+        return jsonify({"query_id": job.id, "status": job.status}), 202
+    try:
+        result_df, next_token = job.result()
+    except Exception as e:
+        return query_error_response(e)
+    return jsonify({
+        "query_id": job.id,
+        "status": job.status,
+        "data": result_df.to_dict(orient='records'),
+        "columns": list(result_df.columns),
+        "next_page_token": next_token
+    })
+
+def end_on_error(chunks, output_format):
+    """
+    Finish a streamed response whose query fails or is interrupted mid-stream.
+    NDJSON streams end with an {"error": ..., "cancelled": ...} record, so
+    clients can tell a truncated result from a complete one. Arrow IPC has no
+    in-band error record: the transfer is aborted before the end-of-stream
+    marker instead.
+    """
+    try:
+        yield from chunks
+    except Exception as e:
+        if output_format != 'ndjson':
+            raise
+        cancelled = isinstance(e, QueryCancelledError)
+        yield (json.dumps({"error": str(e), "cancelled": cancelled}) + '\n').encode('utf-8')
 
 def create_app():
     """Create and configure the Flask app."""
@@ -33,7 +97,14 @@ def create_app():
     def run_query():
         """
         API endpoint to execute a SQL query using the TakeoutProcessor.
-        Returns the results as JSON.
+        Returns one page of the results as JSON, plus the token of the next
+        page (null on the last page). Pages are capped at MAX_PAGE_SIZE rows.
+        The query runs under a wall-clock time limit ('timeout', seconds) and
+        can be cancelled through its 'query_id' while running.
+
+        Queries run on the query executor. With 'async': true the endpoint
+        returns 202 and the query id right away; poll GET
+        /api/run-query/<query_id> for the page. A full queue answers 429.
         """
         try:
             data = request.get_json(force=True)
@@ -41,12 +112,75 @@ def create_app():
             if not sql_query:
                 return jsonify({"error": "No SQL query provided"}), 400
 
-            result_df = takeout_processor.query_data(sql_query)
-            result_data = result_df.to_dict(orient='records')
-            
-            return jsonify({"data": result_data})
+            query_id, time_limit = query_limits(data)
+            job = takeout_processor.submit_query_page(
+                sql_query, data.get('page_size'), data.get('page_token'),
+                query_id=query_id, time_limit=time_limit
+            )
+            if not data.get('async'):
+                futures.wait([job.future])
+            return page_response(job)
         except Exception as e:
-            return jsonify({"error": str(e)}), 500
+            return query_error_response(e)
+
+    @server.route('/api/run-query/<query_id>')
+    def query_status(query_id):
+        """
+        API endpoint polling a submitted query. Waits up to 'wait' seconds
+        (query string, capped at 30) for it to finish, then returns its page,
+        or 202 with its status while it is still queued or running.
+        """
+        job = takeout_processor.query_executor.get(query_id)
+        if job is None:
+            return jsonify({"error": f"Unknown query id: {query_id}"}), 404
+        timeout = min(max(request.args.get('wait', 0, type=float), 0), 30)
+        futures.wait([job.future], timeout=timeout)
+        return page_response(job)
+
+    @server.route('/api/run-query/stream', methods=['POST'])
+    def stream_query():
+        """
+        API endpoint streaming the results of a SQL query, batch by batch,
+        as NDJSON (default) or an Arrow IPC stream. The result is never
+        materialized in full; at most `max_rows` rows are sent. A query that
+        fails or is interrupted mid-stream ends an NDJSON stream with an
+        {"error": ...} record (see end_on_error).
+        """
+        try:
+            data = request.get_json(force=True)
+            sql_query = data.get('sql')
+            output_format = data.get('format', 'ndjson')
+            if not sql_query:
+                return jsonify({"error": "No SQL query provided"}), 400
+            if output_format not in STREAM_FORMATS:
+                return jsonify({"error": f"Unsupported format: {output_format}"}), 400
+            max_rows = min(number_option(data, 'max_rows', MAX_RESULT_ROWS, int), MAX_RESULT_ROWS)
+            query_id, time_limit = query_limits(data)
+            schema, batches = takeout_processor.stream_query(
+                sql_query, max_rows=max_rows, query_id=query_id, time_limit=time_limit
+            )
+        except Exception as e:
+            return query_error_response(e)
+
+        chunks = iter_ndjson(batches) if output_format == 'ndjson' else iter_arrow_ipc(schema, batches)
+        return Response(
+            stream_with_context(end_on_error(chunks, output_format)), mimetype=STREAM_FORMATS[output_format]
+        )
+
+    @server.route('/api/run-query/<query_id>/cancel', methods=['POST'])
+    def cancel_query(query_id):
+        """API endpoint interrupting an in-flight query by its id."""
+        return jsonify({"query_id": query_id, "cancelled": takeout_processor.cancel_query(query_id)})
+
+    @server.route('/api/cache-stats')
+    def cache_stats():
+        """API endpoint exposing the query result cache counters."""
+        return jsonify(takeout_processor.query_cache.stats())
+
+    @server.route('/api/executor-stats')
+    def executor_stats():
+        """API endpoint exposing the query executor queues and job counts."""
+        return jsonify(takeout_processor.query_executor.stats())
     
     dash_app = init_dash_app(server, pathname='/dash/', takeout_processor=takeout_processor)
     return server
@@ -0,0 +1,358 @@
+import io
+import os
+import re
+import gzip
+import time
+import hashlib
+import tarfile
+import zipfile
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from app.fingerprints import file_stat, file_digest, HASH_BLOCK_SIZE
+
+ARCHIVE_SUFFIXES = ('.zip', '.tgz', '.tar.gz')
+DEFAULT_SCAN_WORKERS = 8
+# Caps of the tar members kept in memory by the indexing pass (per member
+# and per archive part), see ArchiveSource.
+SPOOL_MAX_MEMBER_BYTES = 64 << 20
+SPOOL_MAX_BYTES = 512 << 20
+# Folder every Google Takeout archive stores its files under.
+TAKEOUT_FOLDER = 'Takeout'
+# Takeout splits large exports into numbered parts:
+# takeout-20240101T000000Z-001.zip, takeout-20240101T000000Z-002.zip, ...
+_PART_PATTERN = re.compile(r'^(?P<prefix>.+)-(?P<number>\d{3})(?P<suffix>\.zip|\.tgz|\.tar\.gz)$')
+
+# Where a member is stored: its archive part, its name inside it, its size
+# and mtime, a digest from the archive metadata (zip) or content (tar), and
+# for tar parts the offset of its data in the uncompressed stream.
+ArchiveMember = namedtuple('ArchiveMember', 'part name size mtime digest offset')
+
+
+def is_archive(path):
+    """Return True if path names a Takeout archive file (.zip, .tgz or .tar.gz)."""
+    return path.lower().endswith(ARCHIVE_SUFFIXES) and os.path.isfile(path)
+
+
+def archive_parts(archive_path):
+    """
+    Return the parts of a split Takeout export, in order: the given archive
+    plus its numbered siblings with the same name prefix and suffix.
+    """
+    match = _PART_PATTERN.match(os.path.basename(archive_path))
+    if not match:
+        return [archive_path]
+    folder = os.path.dirname(archive_path)
+    parts = []
+    for entry in os.scandir(folder or '.'):
+        sibling = _PART_PATTERN.match(entry.name)
+        if (sibling and entry.is_file()
+                and sibling['prefix'] == match['prefix'] and sibling['suffix'] == match['suffix']):
+            parts.append(os.path.join(folder, entry.name))
+    return sorted(parts)
+
+
+def _member_path(name):
+    # Logical path of a member relative to the takeout root.
+    parts = [part for part in name.split('/') if part and part != '.']
+    if parts and parts[0] == TAKEOUT_FOLDER:
+        parts = parts[1:]
+    return '/'.join(parts)
+
+
+def _index_zip(part, spool=None):
+    members = []
+    with zipfile.ZipFile(part) as archive:
+        for info in archive.infolist():
+            if info.is_dir():
+                continue
+            members.append(ArchiveMember(
+                part, info.filename, info.file_size, time.mktime(info.date_time + (0, 0, -1)),
+                f"zip-{info.CRC:08x}-{info.file_size}", None
+            ))
+    return members, {}
+
+
+def _index_tar(part, spool=None):
+    # Listing a compressed tar decompresses it entirely anyway, so member
+    # contents are hashed on the way, and the members selected by `spool`
+    # are kept: reading them later would inflate the part again up to them.
+    members, spooled = [], {}
+    budget = SPOOL_MAX_BYTES
+    with tarfile.open(part, 'r:*') as archive:
+        for info in archive:
+            if not info.isfile():
+                continue
+            keep = (spool is not None and info.size <= min(SPOOL_MAX_MEMBER_BYTES, budget)
+                    and spool(_member_path(info.name)))
+            digest = hashlib.blake2b(digest_size=20)
+            blocks = []
+            with archive.extractfile(info) as file:
+                for block in iter(lambda: file.read(HASH_BLOCK_SIZE), b''):
+                    digest.update(block)
+                    if keep:
+                        blocks.append(block)
+            if keep:
+                spooled[info.name] = b''.join(blocks)
+                budget -= info.size
+            members.append(ArchiveMember(
+                part, info.name, info.size, info.mtime, digest.hexdigest(), info.offset_data
+            ))
+    return members, spooled
+
+
+def _scan_folder(folder):
+    # One os.scandir pass: the (path, size, mtime) of the files of a folder
+    # and its subfolders. Unreadable folders are skipped.
+    files, folders = [], []
+    try:
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    folders.append(entry.path)
+                elif entry.is_file():
+                    stat = entry.stat()
+                    files.append((entry.path, stat.st_size, stat.st_mtime))
+    except OSError:
+        pass
+    return files, folders
+
+
+class _TarMemberFile(io.RawIOBase):
+    """Raw reader over the data of one tar member, from its offset in the stream."""
+
+    def __init__(self, part, offset, size):
+        self.file = open(part, 'rb') if part.endswith('.tar') else gzip.open(part, 'rb')
+        self.file.seek(offset)
+        self.remaining = size
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        view = memoryview(buffer)[:self.remaining]
+        read = self.file.readinto(view) if len(view) else 0
+        self.remaining -= read
+        return read
+
+    def close(self):
+        if not self.closed:
+            self.file.close()
+        super().close()
+
+
+class LocalSource:
+    """
+    Takeout files read straight from the filesystem (an extracted takeout).
+    Every path based access of the pipeline goes through a source, so the
+    same logical paths work for extracted and archived takeouts.
+    """
+
+    def isfile(self, path):
+        return os.path.isfile(path)
+
+    def isdir(self, path):
+        return os.path.isdir(path)
+
+    def exists(self, path):
+        return os.path.exists(path)
+
+    def listdir(self, path):
+        """Return the names of the files directly inside a folder."""
+        return sorted(entry.name for entry in os.scandir(path) if entry.is_file())
+
+    def open(self, path):
+        """Open a file for binary reading."""
+        return open(path, 'rb')
+
+    def stat(self, path):
+        """Return the (size, mtime) pair of a file."""
+        return file_stat(path)
+
+    def digest(self, path):
+        """Return a content digest of a file."""
+        return file_digest(path)
+
+    def local_path(self, path):
+        """Return the filesystem path of a file, or None if it only lives in an archive."""
+        return path
+
+    def restricted(self, paths):
+        """Return a source able to read at least the given files."""
+        return self
+
+    def scan(self, path, max_workers=DEFAULT_SCAN_WORKERS):
+        """
+        Return the sorted (path, size, mtime) of every file under a folder.
+        Folders are scanned in parallel with os.scandir, each subfolder as
+        its own task as soon as its parent has been listed.
+        """
+        files = []
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            pending = {pool.submit(_scan_folder, path)}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    found, folders = future.result()
+                    files.extend(found)
+                    pending.update(pool.submit(_scan_folder, folder) for folder in folders)
+        return sorted(files)
+
+
+class ArchiveSource(LocalSource):
+    """
+    Takeout files read from the .zip or .tgz archives of an export, without
+    extracting them to disk.
+
+    The archive path stands for the takeout root: a member stored as
+    Takeout/Perfil/Perfil.json in any part of the export resolves to
+    <archive_path>/Perfil/Perfil.json, the path an extracted takeout would
+    have. Paths outside the archive root are read from the filesystem.
+    Only plain data is kept (no open handles), so a source can be sent to
+    worker processes, which open the members they need themselves.
+
+    Zip members are read directly. A tar member can only be reached by
+    inflating its part from the start, so the indexing pass, which
+    inflates every part once anyway, keeps in memory the members selected
+    by `spool` (a callable taking the member path relative to the takeout
+    root), up to SPOOL_MAX_MEMBER_BYTES each and SPOOL_MAX_BYTES per part.
+    Other tar members are inflated again up to their offset on each open.
+    """
+
+    def __init__(self, archive_path, spool=None):
+        self.root = archive_path
+        self.parts = archive_parts(archive_path)
+        self.members = {}
+        self.spooled = {}
+        self.folders = {'': []}
+        # Parts are indexed concurrently (zlib releases the GIL).
+        with ThreadPoolExecutor(max_workers=len(self.parts)) as pool:
+            indexes = list(pool.map(lambda part: self._index_part(part, spool), self.parts))
+        for members, spooled in indexes:
+            for member in members:
+                path = _member_path(member.name)
+                if not path or path in self.members:
+                    continue
+                self.members[path] = member
+                if member.name in spooled:
+                    self.spooled[path] = spooled[member.name]
+                folder, _, name = path.rpartition('/')
+                self.folders.setdefault(folder, []).append(name)
+                while folder:
+                    folder = folder.rpartition('/')[0]
+                    self.folders.setdefault(folder, [])
+
+    @staticmethod
+    def _index_part(part, spool=None):
+        if part.lower().endswith('.zip'):
+            return _index_zip(part, spool)
+        return _index_tar(part, spool)
+
+    def _relative(self, path):
+        # Logical path inside the archive, or None for paths outside it.
+        path = os.fspath(path)
+        if path == self.root:
+            return ''
+        prefix = self.root + os.sep
+        if not path.startswith(prefix):
+            return None
+        return os.path.normpath(path[len(prefix):]).replace(os.sep, '/')
+
+    def _member(self, path):
+        member = self.members.get(self._relative(path))
+        if member is None:
+            raise FileNotFoundError(f"No such file in {self.root}: {path}")
+        return member
+
+    def isfile(self, path):
+        relative = self._relative(path)
+        if relative is None:
+            return super().isfile(path)
+        return relative in self.members
+
+    def isdir(self, path):
+        relative = self._relative(path)
+        if relative is None:
+            return super().isdir(path)
+        return relative in self.folders
+
+    def exists(self, path):
+        relative = self._relative(path)
+        if relative is None:
+            return super().exists(path)
+        return relative in self.members or relative in self.folders
+
+    def listdir(self, path):
+        relative = self._relative(path)
+        if relative is None:
+            return super().listdir(path)
+        if relative not in self.folders:
+            raise FileNotFoundError(f"No such folder in {self.root}: {path}")
+        return sorted(self.folders[relative])
+
+    def open(self, path):
+        """Open a member for streaming binary reads, decompressed on the fly."""
+        relative = self._relative(path)
+        if relative is None:
+            return super().open(path)
+        if relative in self.spooled:
+            return io.BytesIO(self.spooled[relative])
+        member = self._member(path)
+        if member.offset is None:
+            with zipfile.ZipFile(member.part) as archive:
+                return archive.open(member.name)
+        return io.BufferedReader(_TarMemberFile(member.part, member.offset, member.size))
+
+    def stat(self, path):
+        if self._relative(path) is None:
+            return super().stat(path)
+        member = self._member(path)
+        return member.size, member.mtime
+
+    def digest(self, path):
+        if self._relative(path) is None:
+            return super().digest(path)
+        return self._member(path).digest
+
+    def local_path(self, path):
+        if self._relative(path) is None:
+            return path
+        return None
+
+    def scan(self, path, max_workers=DEFAULT_SCAN_WORKERS):
+        """Return the sorted (path, size, mtime) of every member under a folder, from the index."""
+        relative = self._relative(path)
+        if relative is None:
+            return super().scan(path, max_workers)
+        prefix = f"{relative}/" if relative else ''
+        return sorted(
+            (os.path.join(self.root, *name.split('/')), member.size, member.mtime)
+            for name, member in self.members.items() if name.startswith(prefix)
+        )
+
+    def restricted(self, paths):
+        """Return a copy of this source that only indexes the given members."""
+        source = object.__new__(ArchiveSource)
+        source.root = self.root
+        source.parts = self.parts
+        source.members = {}
+        source.spooled = {}
+        for path in paths:
+            relative = self._relative(path)
+            if relative in self.members:
+                source.members[relative] = self.members[relative]
+            if relative in self.spooled:
+                source.spooled[relative] = self.spooled[relative]
+        source.folders = {}
+        return source
+
+
+def open_source(takeout_path, spool=None):
+    """
+    Return the source reading a takeout: an ArchiveSource for archives
+    (keeping the tar members selected by `spool` in memory), else a
+    LocalSource.
+    """
+    if is_archive(takeout_path):
+        return ArchiveSource(takeout_path, spool)
+    return LocalSource()
@@ -0,0 +1,205 @@
+"""
+End-to-end timing of the takeout pipeline on a synthetic takeout.
+
+Generates a takeout (see benchmarks.synthetic_takeout) in a scratch folder
+and times each step on it: the file catalog scan, the HTML activity
+parser, the ICS parser,
+load_all_datasets, run_mapping (with the per-stage mapping report) and the
+dashboard queries, cache disabled. Results are printed as JSON, or written
+to --output, so runs can be compared over time. Run from the repo root.
+
+    python -m benchmarks.pipeline --activity-entries 200000 --output bench.json
+"""
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import statistics
+import subprocess
+import tempfile
+from datetime import datetime, timezone
+
+import duckdb
+import pandas as pd
+import pyarrow as pa
+
+from app.catalog import scan_takeout, catalog_activity_logs
+from app.data_interface import GoogleTakeoutProcessor
+from app.data_preprocessor import DataPreprocessor
+from app.locales import get_locale_tables
+from app.takeout_source import LocalSource
+from app.queries import route_activity_query
+from benchmarks.synthetic_takeout import generate_takeout, add_scale_arguments, scale_options
+
+MAPPING_CONFIG = os.path.join('config', 'mapping.json')
+
+# Dashboard filters, within the span of the synthetic activity (2019-2023).
+ACTIVITY_FILTERS = {
+    'all': (None, None, None),
+    'one_year': (None, '2021-01-01', '2021-12-31T23:59:59.999999'),
+    'one_month_youtube': (['YouTube'], '2021-03-01', '2021-03-31T23:59:59.999999'),
+    'partial_days': (['Drive', 'Takeout'], '2020-02-10T12:00:00', '2020-05-20T08:30:00'),
+}
+ACTIVITY_QUERIES = ('kpi_by_platform', 'monthly_timeline')
+# activity_by_hour reads the hourly rollup, which only has a platform filter.
+HOURLY_FILTERS = {'all': [], 'youtube': ['YouTube']}
+STATIC_QUERIES = ('profile_name', 'activity_platforms', 'activity_date_range')
+
+
+def timed(fn, repeat=1):
+    """Run fn `repeat` times; return (its last result, [seconds per run])."""
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        runs.append(time.perf_counter() - start)
+    return result, runs
+
+
+def summarize(runs, rows=None):
+    """Reduce a list of run times to the JSON entry of a measurement."""
+    entry = {
+        'seconds': round(min(runs), 4),
+        'median_seconds': round(statistics.median(runs), 4),
+        'runs': len(runs),
+    }
+    if rows is not None:
+        entry['rows'] = int(rows)
+    return entry
+
+
+def environment():
+    """Describe the machine and code version a run was measured on."""
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'duckdb': duckdb.__version__,
+        'pandas': pd.__version__,
+        'pyarrow': pa.__version__,
+    }
+
+
+def bench_parsers(takeout_path, lang, output_folder, repeat):
+    """Time the catalog scan, the raw parsers and load_all_datasets, parse cache disabled."""
+    paths = get_locale_tables(lang).resolve_paths(takeout_path)
+    results = {}
+    catalog, runs = timed(lambda: scan_takeout(LocalSource(), takeout_path, lang), repeat)
+    results['scan_catalog'] = summarize(runs, len(catalog))
+    activity_logs = catalog_activity_logs(catalog)
+    preprocessor = DataPreprocessor(
+        calendar_path=paths['calendar'],
+        profile_path=paths['profile_json'],
+        activity_log_paths=activity_logs,
+        subscribed_channels_csv=paths['subscriptions_csv'],
+        output_folder=output_folder,
+        lang=lang,
+        use_parse_cache=False,
+    )
+    frames, runs = timed(lambda: preprocessor.read_activity_logs(activity_logs), repeat)
+    results['read_activity_logs'] = summarize(runs, sum(len(df) for df in frames.values()))
+
+    calendars = preprocessor._calendar_files()
+    events, runs = timed(lambda: [preprocessor.parse_ics(path) for path in calendars], repeat)
+    results['parse_ics'] = summarize(runs, sum(len(found) for found in events))
+
+    datasets, runs = timed(preprocessor.load_all_datasets, repeat)
+    results['load_all_datasets'] = summarize(runs, sum(len(df) for df in datasets.values()))
+    return results
+
+
+def bench_processor(takeout_path, lang, output_folder, repeat, query_repeat):
+    """Time ingestion, run_mapping and the dashboard queries of a processor."""
+    results = {}
+    processor, runs = timed(lambda: GoogleTakeoutProcessor(
+        takeout_path, output_folder, reset_db=True, language_code=lang
+    ))
+    results['ingest'] = summarize(runs)
+    try:
+        _, runs = timed(lambda: processor.run_mapping(MAPPING_CONFIG, lang), repeat)
+        results['run_mapping'] = summarize(runs)
+        results['mapping_stages'] = processor.mapping_report
+
+        queries = {}
+        for name in STATIC_QUERIES:
+            df, runs = timed(lambda: processor.run_query(name, use_cache=False), query_repeat)
+            queries[name] = summarize(runs, len(df))
+        for name in ACTIVITY_QUERIES:
+            for label, (platforms, start_date, end_date) in ACTIVITY_FILTERS.items():
+                for use_rollups in sorted({False, processor.rollups_ready}):
+                    query_name, params = route_activity_query(
+                        name, platforms, start_date, end_date, use_rollups=use_rollups
+                    )
+                    df, runs = timed(
+                        lambda: processor.run_query(query_name, params, use_cache=False), query_repeat
+                    )
+                    queries[f"{query_name}[{label}]"] = summarize(runs, len(df))
+        if processor.rollups_ready:
+            for label, platforms in HOURLY_FILTERS.items():
+                df, runs = timed(lambda: processor.run_query(
+                    'activity_by_hour', {'platforms': platforms}, use_cache=False
+                ), query_repeat)
+                queries[f"activity_by_hour[{label}]"] = summarize(runs, len(df))
+        results['queries'] = queries
+    finally:
+        processor.close()
+    return results
+
+
+def run(scale, repeat=1, query_repeat=5):
+    """Generate a takeout at the given scale and time every pipeline step."""
+    results = {
+        'benchmark': 'pipeline',
+        'started_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'environment': environment(),
+    }
+    with tempfile.TemporaryDirectory() as scratch:
+        takeout_path = os.path.join(scratch, 'Takeout')
+        (summary, runs) = timed(lambda: generate_takeout(takeout_path, **scale))
+        summary.pop('path')
+        results['takeout'] = dict(summary, generate_seconds=round(runs[0], 4))
+
+        parser_output = os.path.join(scratch, 'parsers')
+        os.makedirs(parser_output)
+        results['stages'] = bench_parsers(takeout_path, scale['lang'], parser_output, repeat)
+
+        processor_output = os.path.join(scratch, 'data')
+        os.makedirs(processor_output)
+        processor_results = bench_processor(
+            takeout_path, scale['lang'], processor_output, repeat, query_repeat
+        )
+        results['queries'] = processor_results.pop('queries')
+        results['mapping_stages'] = processor_results.pop('mapping_stages')
+        results['stages'].update(processor_results)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    add_scale_arguments(parser)
+    parser.add_argument('--repeat', type=int, default=1,
+                        help="Runs of each pipeline stage (the best one is reported).")
+    parser.add_argument('--query-repeat', type=int, default=5,
+                        help="Runs of each dashboard query.")
+    parser.add_argument('--output', help="Write the JSON results to this file.")
+    args = parser.parse_args()
+    results = run(scale_options(args), args.repeat, args.query_repeat)
+    text = json.dumps(results, indent=2, default=str)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,267 @@
+"""
+Synthetic Google Takeout generator.
+
+Writes a takeout tree laid out like a real export of the given locale
+(see app.locales): a profile, one MiActividad.html per activity product
+(YouTube, Drive and Takeout, plus --extra-products smaller ones),
+a folder of ICS calendars, the Chrome history JSON and the YouTube
+subscriptions CSV. Content is random but reproducible for a given seed.
+
+    python -m benchmarks.synthetic_takeout /tmp/Takeout --activity-entries 100000
+"""
+import os
+import csv
+import json
+import html
+import random
+import argparse
+from datetime import datetime, timedelta
+
+from babel.dates import get_month_names
+
+from app.locales import LOCALE_DEFINITIONS, get_locale_tables
+
+# Activity products read by GoogleTakeoutProcessor, with their share of entries.
+ACTIVITY_PLATFORMS = {'YouTube': 0.7, 'Drive': 0.2, 'Takeout': 0.1}
+ACTIVITY_ACTIONS = {
+    'YouTube': ('watched', 'searched', 'liked', 'subscribed', 'commented'),
+    'Drive': ('used', 'visited', 'shared'),
+    'Takeout': ('downloaded', 'used'),
+}
+# Smaller products of large exports, each with EXTRA_PRODUCT_SHARE of the
+# entries (relative to the 1.0 of the products above).
+EXTRA_PRODUCTS = (
+    'Búsqueda', 'Maps', 'Gmail', 'Chrome', 'Google Play Store', 'Imágenes', 'Noticias',
+    'Shopping', 'Vídeos', 'Libros', 'Finanzas', 'Google Translate', 'Ayuda', 'Discover',
+    'Google Lens', 'Google Play Música', 'Google Fotos', 'Google Keep', 'Google Calendar',
+    'Google Meet', 'Google Pay', 'Google Assistant', 'Google Ads', 'Google Analytics',
+    'Google Cloud', 'Blogger', 'Developers', 'Hotels', 'Flights', 'Podcasts',
+    'Google Apps', 'Google Drive Docs', 'Google Sheets', 'Google Slides', 'Google Forms',
+    'Google Sites', 'Google Chat', 'Google Classroom', 'Google Arts & Culture', 'YouTube Kids',
+)
+EXTRA_PRODUCT_SHARE = 0.02
+EXTRA_PRODUCT_ACTIONS = ('used', 'visited', 'searched')
+DOMAINS = (
+    'www.google.com', 'www.youtube.com', 'github.com', 'stackoverflow.com',
+    'en.wikipedia.org', 'es.wikipedia.org', 'news.ycombinator.com', 'www.bbc.co.uk',
+    'docs.python.org', 'duckdb.org', 'mail.google.com', 'drive.google.com',
+)
+SUBSCRIPTION_HEADERS = {
+    'es': ('Id. del canal', 'URL del canal', 'Título del canal'),
+    'en': ('Channel Id', 'Channel Url', 'Channel Title'),
+}
+
+DEFAULT_START = datetime(2019, 1, 1)
+DEFAULT_DAYS = 5 * 365
+
+OUTER_CELL = (
+    '<div class="outer-cell mdl-cell mdl-cell--12-col mdl-shadow--2dp">'
+    '<div class="mdl-grid">'
+    '<div class="header-cell mdl-cell mdl-cell--12-col">'
+    '<p class="mdl-typography--title">{platform}<br></p></div>'
+    '<div class="content-cell mdl-cell mdl-cell--6-col mdl-typography--body-1">'
+    '{action}\xa0{links}{timestamp}</div>'
+    '<div class="content-cell mdl-cell mdl-cell--12-col mdl-typography--caption">'
+    '<b>{platform}</b><br></div>'
+    '</div></div>\n'
+)
+
+
+def _random_times(rng, count, start, days):
+    span = days * 24 * 3600
+    return [start + timedelta(seconds=rng.randrange(span)) for _ in range(count)]
+
+
+class _TimestampFormatter:
+    """Format datetimes the way the activity log of a locale prints them."""
+
+    def __init__(self, lang):
+        babel_locale = LOCALE_DEFINITIONS[lang]['babel_locale']
+        self.lang = lang
+        self.months = {
+            number: name.rstrip('.')
+            for number, name in get_month_names('abbreviated', locale=babel_locale).items()
+        }
+
+    def __call__(self, value):
+        month = self.months[value.month]
+        if self.lang == 'en':
+            return f"{month} {value.day}, {value.year}, {value:%I:%M:%S} {value:%p} CET"
+        return f"{value.day} {month} {value.year}, {value:%H:%M:%S} CET"
+
+
+def write_activity_logs(takeout_path, lang, entries, rng, extra_products=0,
+                        start=DEFAULT_START, days=DEFAULT_DAYS):
+    """Write one activity log per product; returns {path: entries}."""
+    tables = get_locale_tables(lang)
+    verbs = {action_type: code for code, action_type in tables.action_codes.items()}
+    formatter = _TimestampFormatter(lang)
+    activity_root = os.path.join(takeout_path, *tables.paths['activity_root'])
+    shares = dict(ACTIVITY_PLATFORMS)
+    shares.update((product, EXTRA_PRODUCT_SHARE) for product in EXTRA_PRODUCTS[:extra_products])
+    total_share = sum(shares.values())
+    written = {}
+    for platform, share in shares.items():
+        count = round(entries * share / total_share)
+        actions = ACTIVITY_ACTIONS.get(platform, EXTRA_PRODUCT_ACTIONS)
+        folder = os.path.join(activity_root, platform)
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, tables.activity_log_name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('<html><head><meta charset="utf-8"></head><body>'
+                    '<div class="mdl-grid">\n')
+            for moment in sorted(_random_times(rng, count, start, days), reverse=True):
+                action = verbs[rng.choice(actions)]
+                item = rng.randrange(max(count // 4, 1))
+                links = (f'<a href="https://www.youtube.com/watch?v=v{item}">'
+                         f'{html.escape(f"{platform} item {item} & more")}</a><br>')
+                if platform == 'YouTube':
+                    channel = item % 500
+                    links += (f'<a href="https://www.youtube.com/channel/UC{channel}">'
+                              f'Channel {channel}</a><br>')
+                f.write(OUTER_CELL.format(
+                    platform=platform, action=html.escape(action), links=links,
+                    timestamp=formatter(moment)
+                ))
+            f.write('</div></body></html>')
+        written[path] = count
+    return written
+
+
+def write_calendars(takeout_path, lang, events, calendars, rng, start=DEFAULT_START, days=DEFAULT_DAYS):
+    """Write `calendars` ICS files sharing `events` events; returns {path: events}."""
+    folder = os.path.join(takeout_path, *get_locale_tables(lang).paths['calendar'])
+    os.makedirs(folder, exist_ok=True)
+    written = {}
+    for index in range(calendars):
+        count = events // calendars + (1 if index < events % calendars else 0)
+        path = os.path.join(folder, f"calendar_{index}.ics")
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            f.write("BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//synthetic//takeout//EN\r\n")
+            for i, moment in enumerate(_random_times(rng, count, start, days)):
+                end = moment + timedelta(minutes=rng.choice((15, 30, 60, 90)))
+                f.write(
+                    "BEGIN:VEVENT\r\n"
+                    f"UID:{index}-{i}@synthetic\r\n"
+                    f"SUMMARY:Meeting {i} of calendar {index}\r\n"
+                    f"DTSTART:{moment:%Y%m%dT%H%M%S}Z\r\n"
+                    f"DTEND:{end:%Y%m%dT%H%M%S}Z\r\n"
+                    f"ORGANIZER:mailto:organizer{i % 20}@example.com\r\n"
+                    "END:VEVENT\r\n"
+                )
+            f.write("END:VCALENDAR\r\n")
+        written[path] = count
+    return written
+
+
+def write_chrome_history(takeout_path, lang, visits, rng, start=DEFAULT_START, days=DEFAULT_DAYS):
+    """Write the Chrome browser history JSON; returns its path."""
+    path = os.path.join(takeout_path, *get_locale_tables(lang).paths['chrome_history_json'])
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    history = []
+    for i, moment in enumerate(_random_times(rng, visits, start, days)):
+        domain = rng.choice(DOMAINS)
+        history.append({
+            'favicon_url': f"https://{domain}/favicon.ico",
+            'page_transition_qualifier': rng.choice(('CLIENT_REDIRECT', 'SERVER_REDIRECT', '')),
+            'title': f"Page {i} on {domain}",
+            'url': f"https://{domain}/path/{rng.randrange(1000)}?q={i}",
+            'time_usec': int((moment - datetime(1970, 1, 1)).total_seconds() * 1_000_000),
+            'client_id': f"client{i % 3}",
+        })
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'Browser History': history}, f)
+    return path
+
+
+def write_subscriptions(takeout_path, lang, subscriptions):
+    """Write the YouTube subscriptions CSV; returns its path."""
+    path = os.path.join(takeout_path, *get_locale_tables(lang).paths['subscriptions_csv'])
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(SUBSCRIPTION_HEADERS[lang])
+        for i in range(subscriptions):
+            writer.writerow((f"UC{i}", f"http://www.youtube.com/channel/UC{i}", f"Channel {i}"))
+    return path
+
+
+def write_profile(takeout_path, lang):
+    """Write the profile JSON; returns its path."""
+    path = os.path.join(takeout_path, *get_locale_tables(lang).paths['profile_json'])
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'name': {'givenName': 'Synthetic', 'formattedName': 'Synthetic User'},
+            'displayName': 'Synthetic',
+            'emails': [{'value': 'synthetic@example.com'}],
+            'gender': {'type': 'unknown'},
+        }, f)
+    return path
+
+
+def generate_takeout(takeout_path, activity_entries=10_000, calendar_events=1_000, calendars=2,
+                     chrome_visits=5_000, subscriptions=200, extra_products=0, lang='es', seed=0):
+    """
+    Write a synthetic takeout under takeout_path and return a summary of
+    what was generated (counts and file sizes).
+    """
+    rng = random.Random(seed)
+    activity = write_activity_logs(takeout_path, lang, activity_entries, rng, extra_products)
+    calendar = write_calendars(takeout_path, lang, calendar_events, calendars, rng)
+    files = [
+        write_profile(takeout_path, lang),
+        write_chrome_history(takeout_path, lang, chrome_visits, rng),
+        write_subscriptions(takeout_path, lang, subscriptions),
+    ] + list(activity) + list(calendar)
+    return {
+        'path': takeout_path,
+        'lang': lang,
+        'seed': seed,
+        'activity_entries': sum(activity.values()),
+        'activity_logs': len(activity),
+        'calendar_events': sum(calendar.values()),
+        'calendars': calendars,
+        'chrome_visits': chrome_visits,
+        'subscriptions': subscriptions,
+        'bytes': sum(os.path.getsize(path) for path in files),
+    }
+
+
+def add_scale_arguments(parser):
+    """Register the takeout scale options shared by the benchmarks."""
+    parser.add_argument('--activity-entries', type=int, default=10_000)
+    parser.add_argument('--calendar-events', type=int, default=1_000)
+    parser.add_argument('--calendars', type=int, default=2)
+    parser.add_argument('--chrome-visits', type=int, default=5_000)
+    parser.add_argument('--subscriptions', type=int, default=200)
+    parser.add_argument('--extra-products', type=int, default=0,
+                        help=f"Smaller activity products added (up to {len(EXTRA_PRODUCTS)}).")
+    parser.add_argument('--lang', choices=sorted(LOCALE_DEFINITIONS), default='es')
+    parser.add_argument('--seed', type=int, default=0)
+
+
+def scale_options(args):
+    """Return generate_takeout keyword arguments from parsed scale options."""
+    return {
+        'activity_entries': args.activity_entries,
+        'calendar_events': args.calendar_events,
+        'calendars': args.calendars,
+        'chrome_visits': args.chrome_visits,
+        'subscriptions': args.subscriptions,
+        'extra_products': args.extra_products,
+        'lang': args.lang,
+        'seed': args.seed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('takeout_path')
+    add_scale_arguments(parser)
+    args = parser.parse_args()
+    print(json.dumps(generate_takeout(args.takeout_path, **scale_options(args)), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""
+Row-group pruning of date-range filters on clean_activity_history.
+
+Builds a synthetic activity table twice in a scratch DuckDB file: once in
+arbitrary (shuffled) order, as the parallel HTML workers return it, and
+once rewritten by the mapping sort key (platform, activity_timestamp).
+Each date-range query is profiled and the rows the table scan actually
+read are reported next to its latency.
+
+    python -m benchmarks.zone_map_pruning --rows 5000000
+"""
+import os
+import json
+import time
+import argparse
+import tempfile
+
+import duckdb
+
+from app.data_interface import DuckDBInterface
+
+SORT_BY = ["platform", "activity_timestamp"]
+
+QUERIES = {
+    'one_week': (
+        "SELECT COUNT(*) FROM clean_activity_history "
+        "WHERE activity_timestamp BETWEEN TIMESTAMP '2020-03-01' AND TIMESTAMP '2020-03-08'"
+    ),
+    'one_month_one_platform': (
+        "SELECT COUNT(*) FROM clean_activity_history "
+        "WHERE activity_timestamp BETWEEN TIMESTAMP '2020-03-01' AND TIMESTAMP '2020-04-01' "
+        "AND platform IN ('YouTube')"
+    ),
+    'one_year': (
+        "SELECT platform, COUNT(*) FROM clean_activity_history "
+        "WHERE activity_timestamp BETWEEN TIMESTAMP '2019-01-01' AND TIMESTAMP '2020-01-01' "
+        "GROUP BY platform"
+    ),
+}
+
+
+def build_table(conn, rows, sort):
+    """Create a synthetic clean_activity_history spanning ten years."""
+    conn.execute(f"""
+        CREATE OR REPLACE TABLE clean_activity_history AS
+        SELECT
+            (['YouTube', 'Drive', 'Takeout'])[1 + CAST(hash(i) % 3 AS BIGINT)] AS platform,
+            'Has visto' AS action_code,
+            TIMESTAMP '2015-01-01' + TO_SECONDS(CAST(hash(i * 7) % 315360000 AS BIGINT)) AS activity_timestamp
+        FROM range({rows}) AS t(i)
+    """)
+    if sort:
+        DuckDBInterface.sort_table(conn, 'clean_activity_history', SORT_BY)
+    conn.execute("CHECKPOINT")
+
+
+def profile_query(conn, query, profile_path, repeat):
+    """Return (best latency in seconds, rows read by the table scan)."""
+    conn.execute("PRAGMA enable_profiling='json'")
+    conn.execute(f"PRAGMA profiling_output='{profile_path}'")
+    conn.execute(
+        "SET custom_profiling_settings='{\"CUMULATIVE_ROWS_SCANNED\": \"true\"}'"
+    )
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        conn.execute(query).fetchall()
+        best = min(best, time.perf_counter() - start)
+    conn.execute("PRAGMA disable_profiling")
+    with open(profile_path) as f:
+        rows_scanned = json.load(f)['cumulative_rows_scanned']
+    return best, rows_scanned
+
+
+def run(rows, repeat):
+    """Run every query against the shuffled and the sorted layout."""
+    results = {'rows': rows, 'sort_by': SORT_BY, 'layouts': {}}
+    with tempfile.TemporaryDirectory() as scratch:
+        conn = duckdb.connect(os.path.join(scratch, 'bench.duckdb'))
+        profile_path = os.path.join(scratch, 'profile.json')
+        try:
+            for layout, sort in (('unsorted', False), ('sorted', True)):
+                build_table(conn, rows, sort)
+                results['layouts'][layout] = {}
+                for name, query in QUERIES.items():
+                    seconds, scanned = profile_query(conn, query, profile_path, repeat)
+                    results['layouts'][layout][name] = {
+                        'seconds': round(seconds, 4),
+                        'rows_scanned': scanned,
+                    }
+        finally:
+            conn.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=5_000_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    print(json.dumps(run(args.rows, args.repeat), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+-- Placeholders so the dimensions build even when one of the link sources
+-- had no data (the source stages replace them when they run).
+CREATE TABLE IF NOT EXISTS clean_activity_history (
+    platform VARCHAR, action_code VARCHAR, action_type VARCHAR, activity_timestamp TIMESTAMP,
+    link_action_name VARCHAR, link_action_text VARCHAR, channel_link VARCHAR,
+    channel_name VARCHAR, link3 VARCHAR, link3_text VARCHAR
+);
+CREATE TABLE IF NOT EXISTS clean_chrome_history (
+    datetime_value TIMESTAMP, favicon_url VARCHAR,
+    page_transition_qualifier VARCHAR, title VARCHAR, url VARCHAR
+);
+
+-- Public suffixes made of two labels, under which the registrable domain
+-- keeps three labels (www.bbc.co.uk -> bbc.co.uk). Common ones only.
+CREATE OR REPLACE TEMP MACRO registrable_domain(host) AS CASE
+    WHEN host NOT LIKE '%.%' OR regexp_matches(host, '^[0-9.]+$') OR host LIKE '[%' THEN host
+    WHEN regexp_extract(host, '[^.]+\.[^.]+$') IN (
+        'co.uk', 'org.uk', 'ac.uk', 'gov.uk', 'me.uk', 'net.uk', 'ltd.uk', 'plc.uk',
+        'com.au', 'net.au', 'org.au', 'edu.au', 'gov.au', 'co.nz', 'org.nz', 'govt.nz',
+        'co.jp', 'ne.jp', 'or.jp', 'ac.jp', 'go.jp', 'co.kr', 'or.kr', 'co.in', 'net.in',
+        'org.in', 'gov.in', 'co.za', 'org.za', 'gov.za', 'co.il', 'co.id', 'com.cn',
+        'net.cn', 'org.cn', 'gov.cn', 'com.hk', 'com.tw', 'com.sg', 'com.my', 'com.ph',
+        'com.vn', 'com.tr', 'com.ua', 'com.pl', 'com.br', 'net.br', 'org.br', 'gov.br',
+        'com.mx', 'org.mx', 'gob.mx', 'com.ar', 'gob.ar', 'com.co', 'gov.co', 'com.pe',
+        'gob.pe', 'com.ve', 'com.uy', 'cl.cl', 'com.es', 'org.es', 'gob.es', 'nom.es',
+        'edu.es', 'github.io', 'blogspot.com', 'appspot.com', 'herokuapp.com',
+        'web.app', 'firebaseapp.com', 'azurewebsites.net', 'cloudfront.net'
+    ) THEN coalesce(nullif(regexp_extract(host, '[^.]+\.[^.]+\.[^.]+$'), ''), host)
+    ELSE regexp_extract(host, '[^.]+\.[^.]+$')
+END;
+
+-- Every distinct link URL with its lowercased host (scheme, userinfo and
+-- port dropped; bracketed IPv6 hosts kept whole).
+CREATE OR REPLACE TEMP TABLE url_hosts AS
+WITH urls AS (
+    SELECT link_action_name AS url FROM clean_activity_history
+    UNION SELECT channel_link FROM clean_activity_history
+    UNION SELECT link3 FROM clean_activity_history
+    UNION SELECT url FROM clean_chrome_history
+)
+SELECT
+    url,
+    lower(regexp_extract(url, '^(?:[a-zA-Z][a-zA-Z0-9+.-]*://)?(?:[^/?#@]*@)?(\[[^\]]+\]|[^/?#:]+)', 1)) AS domain
+FROM urls
+WHERE url IS NOT NULL AND url <> '';
+
+CREATE OR REPLACE TABLE dim_registrable_domain AS
+SELECT
+    CAST(row_number() OVER (ORDER BY registrable_domain) AS INTEGER) AS registrable_domain_id,
+    registrable_domain
+FROM (SELECT DISTINCT registrable_domain(domain) AS registrable_domain FROM url_hosts);
+
+CREATE OR REPLACE TABLE dim_domain AS
+SELECT
+    CAST(row_number() OVER (ORDER BY d.domain) AS INTEGER) AS domain_id,
+    d.domain,
+    r.registrable_domain_id
+FROM (SELECT DISTINCT domain FROM url_hosts) AS d
+JOIN dim_registrable_domain AS r ON r.registrable_domain = registrable_domain(d.domain);
+
+-- URL ids follow (domain, url) order, so the URLs of a domain are contiguous.
+CREATE OR REPLACE TABLE dim_url AS
+SELECT
+    CAST(row_number() OVER (ORDER BY d.domain, u.url) AS INTEGER) AS url_id,
+    u.url,
+    d.domain_id
+FROM url_hosts AS u
+JOIN dim_domain AS d USING (domain);
+
+DROP TABLE url_hosts;
+
+-- Integer keys on the fact tables. UPDATE keeps the stored row order (and
+-- with it the zone maps of the sort key); scalar subqueries are decorrelated
+-- into hash joins, much faster here than UPDATE ... FROM.
+ALTER TABLE clean_activity_history ADD COLUMN IF NOT EXISTS link_action_url_id INTEGER;
+ALTER TABLE clean_activity_history ADD COLUMN IF NOT EXISTS channel_url_id INTEGER;
+ALTER TABLE clean_activity_history ADD COLUMN IF NOT EXISTS link3_url_id INTEGER;
+UPDATE clean_activity_history AS f SET
+    link_action_url_id = (SELECT url_id FROM dim_url WHERE url = f.link_action_name),
+    channel_url_id = (SELECT url_id FROM dim_url WHERE url = f.channel_link),
+    link3_url_id = (SELECT url_id FROM dim_url WHERE url = f.link3);
+
+ALTER TABLE clean_chrome_history ADD COLUMN IF NOT EXISTS url_id INTEGER;
+ALTER TABLE clean_chrome_history ADD COLUMN IF NOT EXISTS domain_id INTEGER;
+UPDATE clean_chrome_history AS f SET
+    url_id = (SELECT url_id FROM dim_url WHERE url = f.url),
+    domain_id = (SELECT domain_id FROM dim_url WHERE url = f.url);
@@ -0,0 +1,27 @@
+CREATE OR REPLACE TABLE rollup_activity_daily AS
+SELECT
+    platform,
+    CAST(activity_timestamp AS DATE) AS activity_day,
+    COUNT(*) AS count
+FROM clean_activity_history
+GROUP BY 1, 2
+ORDER BY 1, 2;
+
+CREATE OR REPLACE TABLE rollup_activity_monthly AS
+SELECT
+    platform,
+    CAST(DATE_TRUNC('month', activity_day) AS DATE) AS activity_month,
+    SUM(count)::BIGINT AS count
+FROM rollup_activity_daily
+GROUP BY 1, 2
+ORDER BY 1, 2;
+
+CREATE OR REPLACE TABLE rollup_activity_hourly AS
+SELECT
+    platform,
+    action_code,
+    HOUR(activity_timestamp) AS hour_of_day,
+    COUNT(*) AS count
+FROM clean_activity_history
+GROUP BY 1, 2, 3
+ORDER BY 1, 2, 3;
@@ -0,0 +1,73 @@
+import os
+import json
+import pytest
+import tempfile
+import shutil
+
+from app.data_interface import GoogleTakeoutProcessor
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ACTIVITY_CELL = (
+    '<div class="outer-cell mdl-cell mdl-cell--12-col mdl-shadow--2dp">'
+    '<div class="mdl-grid">'
+    '<div class="header-cell mdl-cell mdl-cell--12-col">'
+    '<p class="mdl-typography--title">{platform}<br></p></div>'
+    '<div class="content-cell mdl-cell mdl-cell--6-col mdl-typography--body-1">'
+    'Has visto\xa0<a href="https://www.youtube.com/watch?v={i}">Vídeo {i}</a><br>'
+    '<a href="https://www.youtube.com/channel/c{channel}">Canal {channel}</a><br>'
+    '{day:02d} ene 2024, 10:22:33 CET</div>'
+    '</div></div>'
+)
+
+
+@pytest.fixture
+def temporary_dir():
+    """
+    Create a temporary directory for testing files and return its path.
+    Clean up after tests complete.
+    """
+    temp_dir = tempfile.mkdtemp()
+    yield temp_dir
+    shutil.rmtree(temp_dir)
+
+
+@pytest.fixture
+def sample_takeout(temporary_dir):
+    """
+    Build a minimal Spanish takeout tree (profile plus a YouTube activity
+    log) and return its root path.
+    """
+    takeout_path = os.path.join(temporary_dir, "Takeout")
+    os.makedirs(os.path.join(takeout_path, "Perfil"))
+    with open(os.path.join(takeout_path, "Perfil", "Perfil.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "name": {"givenName": "John", "formattedName": "John Doe"},
+            "displayName": "Johnny",
+            "emails": [{"value": "john@example.com"}],
+            "gender": {"type": "male"}
+        }, f)
+
+    youtube_dir = os.path.join(takeout_path, "Mi actividad", "YouTube")
+    os.makedirs(youtube_dir)
+    with open(os.path.join(youtube_dir, "MiActividad.html"), "w", encoding="utf-8") as f:
+        f.write('<html><body><div class="mdl-grid">')
+        for i in range(30):
+            f.write(ACTIVITY_CELL.format(platform="YouTube", i=i, channel=i % 3, day=i % 28 + 1))
+        f.write('</div></body></html>')
+    return takeout_path
+
+
+@pytest.fixture
+def output_dir(temporary_dir):
+    """Return an empty folder for the DuckDB file and staging outputs."""
+    path = os.path.join(temporary_dir, "data")
+    os.makedirs(path)
+    return path
+
+
+@pytest.fixture
+def processor(sample_takeout, output_dir, monkeypatch):
+    """Ingest the sample takeout with the default (direct) staging."""
+    monkeypatch.chdir(REPO_ROOT)
+    return GoogleTakeoutProcessor(sample_takeout, output_dir, reset_db=True)
@@ -0,0 +1,35 @@
+import os
+import tempfile
+
+import pytest
+
+from app.data_interface import GoogleTakeoutProcessor
+from benchmarks.synthetic_takeout import generate_takeout
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.mark.parametrize("lang", ["es", "en"])
+def test_synthetic_takeout_is_ingested(lang, monkeypatch):
+    """
+    A generated takeout is detected as its locale and every generated
+    activity entry and calendar event reaches the clean tables.
+    """
+    monkeypatch.chdir(REPO_ROOT)
+    with tempfile.TemporaryDirectory() as scratch:
+        takeout_path = os.path.join(scratch, "Takeout")
+        summary = generate_takeout(takeout_path, activity_entries=200, calendar_events=30,
+                                   chrome_visits=20, subscriptions=5, lang=lang)
+        os.makedirs(os.path.join(scratch, "data"))
+        processor = GoogleTakeoutProcessor(takeout_path, os.path.join(scratch, "data"))
+        try:
+            assert processor.language_code == lang
+            activity = processor.query_data(
+                "SELECT COUNT(*) AS n, COUNT(activity_timestamp) AS dated FROM clean_activity_history"
+            )
+            assert activity.to_dict("records") == [{"n": 200, "dated": 200}]
+            events = processor.query_data("SELECT COUNT(*) AS n FROM clean_calendar_events")
+            assert events["n"].iloc[0] == summary["calendar_events"] == 30
+            assert processor.mapping_report["chrome_history"]["status"] == "finished"
+        finally:
+            processor.close()
@@ -0,0 +1,606 @@
+import os
+import json
+import pytest
+import threading
+import time
+import tarfile
+import zipfile
+import duckdb
+
+from app.data_interface import GoogleTakeoutProcessor, QueryCancelledError, DuckDBInterface
+import app.data_preprocessor as dp
+from app.data_preprocessor import DataPreprocessor
+from tests.conftest import REPO_ROOT, ACTIVITY_CELL
+
+
+def test_direct_ingestion_skips_text_staging(processor, output_dir):
+    """
+    Parsed datasets are registered straight into DuckDB: the mapping tables
+    are populated and no CSV staging files are written.
+    """
+    df = processor.query_data("SELECT COUNT(*) AS n FROM clean_activity_history")
+    assert df["n"].iloc[0] == 30
+    profile = processor.query_data("SELECT FormattedName FROM clean_profiles")
+    assert profile["FormattedName"].iloc[0] == "John Doe"
+    assert not [name for name in os.listdir(output_dir) if name.endswith(".csv")]
+
+
+def test_parquet_staging(sample_takeout, output_dir, monkeypatch):
+    """
+    With staging_format='parquet' the parsed datasets are persisted as
+    Parquet files and the mappings read from them.
+    """
+    monkeypatch.chdir(REPO_ROOT)
+    processor = GoogleTakeoutProcessor(
+        sample_takeout, output_dir, reset_db=True, staging_format='parquet'
+    )
+    assert os.path.isfile(os.path.join(output_dir, "activity_logs.parquet"))
+    df = processor.query_data("SELECT COUNT(*) AS n FROM clean_activity_history")
+    assert df["n"].iloc[0] == 30
+
+
+def test_incremental_reingestion(processor, sample_takeout, output_dir, monkeypatch):
+    """
+    Without reset_db, unchanged sources are not parsed again; touching a
+    file without changing its content is not a change; editing an activity
+    log re-parses only that dataset.
+    """
+    parsed = []
+    original_load = processor.data_preprocessor.__class__.load_all_datasets
+
+    def recording_load(self, names=None, **kwargs):
+        parsed.append(set(names))
+        return original_load(self, names, **kwargs)
+
+    monkeypatch.setattr(processor.data_preprocessor.__class__, "load_all_datasets", recording_load)
+
+    GoogleTakeoutProcessor(sample_takeout, output_dir, reset_db=False)
+    assert parsed[-1] == set()
+
+    html_path = os.path.join(sample_takeout, "Mi actividad", "YouTube", "MiActividad.html")
+    os.utime(html_path, (1, 1))
+    GoogleTakeoutProcessor(sample_takeout, output_dir, reset_db=False)
+    assert parsed[-1] == set()
+
+    with open(html_path, "a", encoding="utf-8") as f:
+        f.write(ACTIVITY_CELL.format(platform="YouTube", i=99, channel=0, day=5))
+    reloaded = GoogleTakeoutProcessor(sample_takeout, output_dir, reset_db=False)
+    assert parsed[-1] == {"activity_logs"}
+    df = reloaded.query_data("SELECT COUNT(*) AS n FROM clean_activity_history")
+    assert df["n"].iloc[0] == 31
+
+
+def test_stage_settings_mark_stages_stale(processor, sample_takeout, output_dir, monkeypatch):
+    """
+    With unchanged sources, a new PARSER_VERSION re-parses the datasets of
+    the parsed stages, and another locale reruns every stage.
+    """
+    parsed = []
+    original_load = DataPreprocessor.load_all_datasets
+
+    def recording_load(self, names=None, **kwargs):
+        parsed.append(set(names))
+        return original_load(self, names, **kwargs)
+
+    monkeypatch.setattr(DataPreprocessor, "load_all_datasets", recording_load)
+    monkeypatch.setattr(dp, "PARSER_VERSION", dp.PARSER_VERSION + 1)
+    GoogleTakeoutProcessor(sample_takeout, output_dir, reset_db=False).close()
+    assert "activity_logs" in parsed[-1]
+    GoogleTakeoutProcessor(sample_takeout, output_dir, reset_db=False).close()
+    assert parsed[-1] == set()
+
+    english = GoogleTakeoutProcessor(sample_takeout, output_dir, reset_db=False, language_code="en")
+    enabled = {key for key, cfg in english.load_config(os.path.join("config", "mapping.json"), "en").items()
+               if cfg["enabled"]}
+    assert set(english.mapping_report) >= enabled
+    english.close()
+
+
+def test_connection_pool_reuses_thread_cursors(processor):
+    """
+    Queries from one thread reuse its cursor, concurrent threads get their
+    own cursors, and a closed pool transparently reopens.
+    """
+    pool = processor.connection_pool
+    with pool.cursor() as first:
+        pass
+    with pool.cursor() as second:
+        pass
+    assert first is second
+
+    results = []
+
+    def run_query():
+        results.append(processor.query_data(
+            "SELECT COUNT(*) AS n FROM clean_activity_history WHERE platform = $platform",
+            {"platform": "YouTube"}, use_cache=False
+        )["n"].iloc[0])
+
+    threads = [threading.Thread(target=run_query) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == [30] * 4
+
+    # Cursors of finished threads are dropped when the next one is created.
+    worker = threading.Thread(target=run_query)
+    worker.start()
+    worker.join()
+    assert len(pool._cursors) == 2
+
+    processor.close()
+    assert pool._cursors == {}
+    assert processor.query_data("SELECT 1 AS one")["one"].iloc[0] == 1
+
+
+def test_query_cache_invalidated_by_mapping(processor):
+    """
+    Repeated queries are served from the result cache until run_mapping
+    rebuilds the table they read.
+    """
+    query = "SELECT COUNT(*) AS n FROM clean_activity_history"
+    processor.query_data(query)
+    processor.query_data(query)
+    assert processor.query_cache.stats()["hits"] == 1
+
+    processor.datasets = processor.data_preprocessor.load_all_datasets(["activity_logs"])
+    processor.run_mapping(os.path.join("config", "mapping.json"), stages=["activity_history"])
+    assert processor.query_cache.get(query) is None
+
+
+def test_registered_queries_bind_filters(processor):
+    """
+    Dashboard queries bind the filter values as parameters: an empty
+    platform list matches everything and quotes in a platform name are
+    matched literally rather than spliced into the SQL.
+    """
+    from app.queries import activity_filter_params
+
+    all_rows = processor.run_query("kpi_by_platform", activity_filter_params(None, None, None))
+    assert all_rows.to_dict("records") == [{"platform": "YouTube", "count": 30}]
+
+    injected = processor.run_query(
+        "kpi_by_platform", activity_filter_params(["x') OR 1=1 --"], "2024-01-01", "2024-12-31")
+    )
+    assert injected.empty
+
+    timeline = processor.run_query(
+        "monthly_timeline", activity_filter_params(["YouTube"], "2024-01-01", "2024-01-10T23:59:59")
+    )
+    assert timeline["count"].tolist() == [12]
+
+    with pytest.raises(ValueError):
+        processor.run_query("DROP TABLE clean_activity_history")
+
+
+def test_rollups_built_by_mapping(processor):
+    """
+    run_mapping materializes the activity rollups and dashboard activity
+    queries are answered from them.
+    """
+    assert processor.rollups_ready
+    daily = processor.query_data("SELECT SUM(count) AS n FROM rollup_activity_daily")
+    assert daily["n"].iloc[0] == 30
+
+    kpi = processor.run_activity_query("kpi_by_platform", ["YouTube"], "2024-01-01", "2024-01-10T23:59:59")
+    assert kpi.to_dict("records") == [{"platform": "YouTube", "count": 12}]
+
+
+def test_mapping_stages_report_and_isolate_failures(processor, temporary_dir):
+    """
+    Stages run in dependency order and each gets a report entry; a failed
+    stage blocks only its dependents, independent stages still finish.
+    """
+    report = processor.mapping_report
+    assert report["activity_history"]["status"] == "finished"
+    assert report["activity_rollups"]["status"] == "finished"
+    assert report["calendar_events"]["status"] == "skipped"
+
+    broken = os.path.join(temporary_dir, "broken.sql")
+    with open(broken, "w") as f:
+        f.write("CREATE OR REPLACE TABLE clean_activity_history AS SELECT * FROM missing_table;")
+    with open(os.path.join("config", "mapping.json")) as f:
+        config = json.load(f)
+    for item in config["data_files"]:
+        if item["id"] == "activity_history":
+            item["mapping_file"] = broken
+    config_path = os.path.join(temporary_dir, "mapping.json")
+    with open(config_path, "w") as f:
+        json.dump(config, f)
+
+    processor.datasets = processor.data_preprocessor.load_all_datasets(["activity_logs"])
+    finished = processor.run_mapping(config_path)
+    assert processor.mapping_report["activity_history"]["status"] == "failed"
+    assert processor.mapping_report["activity_rollups"]["status"] == "blocked"
+    assert processor.mapping_report["video_metadata"]["status"] == "ignored"
+    assert "profiles" in finished and "activity_history" not in finished
+    # The tables of the failed stage and its dependents are left untouched.
+    assert processor.query_data("SELECT SUM(count) AS n FROM rollup_activity_daily")["n"].iloc[0] == 30
+
+
+def test_corrupt_input_fails_only_its_stages(sample_takeout, output_dir, monkeypatch):
+    """
+    A dataset failing to parse (here a corrupt calendar) fails the stages
+    mapping it; ingestion goes on and the other stages still finish.
+    """
+    os.makedirs(os.path.join(sample_takeout, "Calendar"))
+    with open(os.path.join(sample_takeout, "Calendar", "broken.ics"), "w", newline="") as f:
+        f.write("BEGIN:VCALENDAR\r\nBEGIN:VEVENT\r\nBEGIN:VALARM\r\nEND:VEVENT\r\nEND:VCALENDAR\r\n")
+    monkeypatch.chdir(REPO_ROOT)
+    processor = GoogleTakeoutProcessor(sample_takeout, output_dir, reset_db=True)
+    report = processor.mapping_report
+    assert report["calendar_events"]["status"] == "failed"
+    assert "calendar_events failed to parse" in report["calendar_events"]["error"]
+    assert report["activity_history"]["status"] == "finished"
+    assert report["profiles"]["status"] == "finished"
+    df = processor.query_data("SELECT COUNT(*) AS n FROM clean_activity_history")
+    assert df["n"].iloc[0] == 30
+    processor.close()
+
+
+def test_mapping_dependencies_validated(processor, temporary_dir):
+    """Unknown dependencies and dependency cycles are rejected."""
+    config_path = os.path.join(temporary_dir, "mapping.json")
+    for depends_on in (["nope"], ["second"]):
+        with open(config_path, "w") as f:
+            json.dump({"data_files": [
+                {"id": "first", "depends_on": depends_on, "mapping_file": "a.sql"},
+                {"id": "second", "depends_on": ["first"], "mapping_file": "b.sql"},
+            ]}, f)
+        with pytest.raises(ValueError):
+            processor.load_config(config_path)
+
+
+def test_url_dimensions(sample_takeout, output_dir, monkeypatch):
+    """
+    Link URLs of the activity and Chrome history tables are normalized into
+    URL, domain and registrable-domain dimensions referenced by integer keys.
+    """
+    os.makedirs(os.path.join(sample_takeout, "Chrome"))
+    visits = [
+        {"url": url, "title": "t", "time_usec": 1700000000000000 + i}
+        for i, url in enumerate([
+            "https://www.bbc.co.uk/news", "https://news.bbc.co.uk/sport", "http://user@Example.com:8080/a",
+            "https://www.youtube.com/watch?v=1", "https://www.bbc.co.uk/news", "http://[::1]:8080/",
+        ])
+    ]
+    with open(os.path.join(sample_takeout, "Chrome", "Historial.json"), "w", encoding="utf-8") as f:
+        json.dump({"Browser History": visits}, f)
+    monkeypatch.chdir(REPO_ROOT)
+    processor = GoogleTakeoutProcessor(sample_takeout, output_dir, reset_db=True)
+    assert processor.mapping_report["url_dimensions"]["status"] == "finished"
+
+    by_domain = processor.query_data("""
+        SELECT r.registrable_domain, COUNT(*) AS visits
+        FROM clean_chrome_history AS c
+        JOIN dim_domain AS d USING (domain_id)
+        JOIN dim_registrable_domain AS r USING (registrable_domain_id)
+        GROUP BY 1 ORDER BY 1
+    """)
+    assert by_domain.to_dict("records") == [
+        {"registrable_domain": "[::1]", "visits": 1},
+        {"registrable_domain": "bbc.co.uk", "visits": 3},
+        {"registrable_domain": "example.com", "visits": 1},
+        {"registrable_domain": "youtube.com", "visits": 1},
+    ]
+    # Activity links share the dimension: the Chrome visit to watch?v=1 and
+    # the activity entry linking it get the same URL id.
+    unmatched = processor.query_data("""
+        SELECT COUNT(*) AS n FROM clean_activity_history AS a
+        LEFT JOIN dim_url AS u ON u.url_id = a.link_action_url_id
+        WHERE u.url IS DISTINCT FROM a.link_action_name OR a.channel_url_id IS NULL
+    """)
+    assert unmatched["n"].iloc[0] == 0
+    counts = processor.query_data(
+        "SELECT COUNT(*) AS urls, COUNT(DISTINCT url) AS distinct_urls, MAX(url_id) AS max_id FROM dim_url"
+    )
+    assert counts.to_dict("records") == [{"urls": 37, "distinct_urls": 37, "max_id": 37}]
+    columns = processor.query_data("DESCRIBE clean_chrome_history")["column_name"].tolist()
+    assert "domain" not in columns and "domain_id" in columns
+    processor.close()
+
+
+def test_low_cardinality_columns_are_enums(processor, sample_takeout, output_dir, monkeypatch):
+    """
+    Low-cardinality activity columns are Categoricals in the parsed dataset
+    and sorted ENUMs in DuckDB, with the direct and the Parquet staging.
+    """
+    activity = processor.data_preprocessor.load_all_datasets(["activity_logs"])["activity_logs"]
+    assert activity["platform"].dtype == "category"
+    assert list(activity["channel_name"].cat.categories) == ["Canal 0", "Canal 1", "Canal 2"]
+
+    def column_types(instance):
+        return dict(instance.query_data(
+            "SELECT column_name, data_type FROM information_schema.columns "
+            "WHERE table_name = 'clean_activity_history'"
+        ).itertuples(index=False))
+
+    direct = column_types(processor)
+    processor.close()
+    monkeypatch.chdir(REPO_ROOT)
+    staged = GoogleTakeoutProcessor(sample_takeout, output_dir, reset_db=True, staging_format='parquet')
+    for types in (direct, column_types(staged)):
+        assert types["platform"] == "ENUM('YouTube')"
+        assert types["channel_name"] == "ENUM('Canal 0', 'Canal 1', 'Canal 2')"
+        assert types["link_action_name"] == "VARCHAR"
+    staged.close()
+
+
+def test_enum_encoding_skips_columns_without_values():
+    """Columns with no values (empty table or only NULLs) stay VARCHAR."""
+    conn = duckdb.connect()
+    conn.execute("CREATE TABLE empty_events (platform VARCHAR, action VARCHAR)")
+    DuckDBInterface.encode_enums(conn, "empty_events", ["platform", "action"])
+    conn.execute("CREATE TABLE null_events AS SELECT NULL::VARCHAR AS platform, 'Watched' AS action")
+    DuckDBInterface.encode_enums(conn, "null_events", ["platform", "action"])
+    types = dict(conn.execute(
+        "SELECT table_name || '.' || column_name, data_type FROM information_schema.columns"
+    ).fetchall())
+    assert types == {
+        "empty_events.platform": "VARCHAR", "empty_events.action": "VARCHAR",
+        "null_events.platform": "VARCHAR", "null_events.action": "ENUM('Watched')",
+    }
+
+
+def write_takeout_archive(takeout_path, folder, suffix, parts=2):
+    """
+    Pack a takeout tree into a Takeout export split in `parts` archives
+    (.zip or .tgz), files dealt round-robin; returns the first part.
+    """
+    files = sorted(
+        os.path.relpath(os.path.join(root, name), takeout_path)
+        for root, _, names in os.walk(takeout_path) for name in names
+    )
+    paths = [os.path.join(folder, f"takeout-20240101T000000Z-{i:03d}{suffix}") for i in range(1, parts + 1)]
+    for index, path in enumerate(paths):
+        members = files[index::parts]
+        if suffix == ".zip":
+            with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+                for name in members:
+                    archive.write(os.path.join(takeout_path, name), f"Takeout/{name}")
+        else:
+            with tarfile.open(path, "w:gz") as archive:
+                for name in members:
+                    archive.add(os.path.join(takeout_path, name), f"Takeout/{name}")
+    return paths[0]
+
+
+@pytest.mark.parametrize("suffix", [".zip", ".tgz"])
+def test_archive_ingestion_matches_extracted_takeout(sample_takeout, temporary_dir, monkeypatch, suffix):
+    """
+    A takeout split into several .zip/.tgz parts is read in place, without
+    extracting it: every stage builds the same tables as from the extracted
+    tree, and re-ingesting the unchanged archives parses nothing.
+    """
+    os.makedirs(os.path.join(sample_takeout, "Chrome"))
+    with open(os.path.join(sample_takeout, "Chrome", "Historial.json"), "w", encoding="utf-8") as f:
+        json.dump({"Browser History": [
+            {"url": f"https://example.com/{i}", "title": f"Page {i}", "time_usec": 1700000000000000 + i}
+            for i in range(5)
+        ]}, f)
+    os.makedirs(os.path.join(sample_takeout, "Calendar"))
+    with open(os.path.join(sample_takeout, "Calendar", "work.ics"), "w", encoding="utf-8", newline="") as f:
+        f.write("BEGIN:VCALENDAR\r\n")
+        for i in range(3):
+            f.write(f"BEGIN:VEVENT\r\nSUMMARY:Meeting {i}\r\nDTSTART:2024010{i + 1}T100000Z\r\n"
+                    f"DTEND:2024010{i + 1}T110000Z\r\nEND:VEVENT\r\n")
+        f.write("END:VCALENDAR\r\n")
+    access_dir = os.path.join(sample_takeout, "Actividad de registro de accesos")
+    os.makedirs(access_dir)
+    with open(os.path.join(access_dir, "Actividades_ una lista con los servicios de Google.csv"), "w") as f:
+        f.write("Service,Count\nGmail,3\nDrive,5\nGmail,3\n")
+    archive_path = write_takeout_archive(sample_takeout, temporary_dir, suffix)
+
+    monkeypatch.chdir(REPO_ROOT)
+    tables = {
+        "clean_activity_history": "SELECT * EXCLUDE (link_action_url_id, channel_url_id, link3_url_id) "
+                                  "FROM clean_activity_history",
+        "clean_profiles": "SELECT * FROM clean_profiles",
+        "clean_calendar_events": "SELECT * FROM clean_calendar_events",
+        "clean_chrome_history": "SELECT * FROM clean_chrome_history",
+        "clean_all_activity_accesses": "SELECT * FROM clean_all_activity_accesses",
+        "dim_url": "SELECT * FROM dim_url",
+    }
+    results = []
+    for path in (sample_takeout, archive_path):
+        output = os.path.join(temporary_dir, f"data_{len(results)}")
+        os.makedirs(output)
+        processor = GoogleTakeoutProcessor(path, output, reset_db=True)
+        assert processor.language_code == "es"
+        results.append({
+            name: processor.query_data(f"SELECT * FROM ({query}) ORDER BY ALL").astype(str)
+            for name, query in tables.items()
+        })
+        processor.close()
+    extracted, archived = results
+    if suffix == ".tgz":
+        # Parsed files are kept by the indexing pass instead of being
+        # inflated again from the start of their part.
+        assert {"Calendar/work.ics", "Perfil/Perfil.json", "Chrome/Historial.json"} <= set(processor.source.spooled)
+    for name in tables:
+        assert not extracted[name].empty, name
+        assert archived[name].to_dict("records") == extracted[name].to_dict("records"), name
+
+    parsed = []
+    original_load = DataPreprocessor.load_all_datasets
+
+    def recording_load(self, names=None, **kwargs):
+        parsed.append(set(names))
+        return original_load(self, names, **kwargs)
+
+    monkeypatch.setattr(DataPreprocessor, "load_all_datasets", recording_load)
+    GoogleTakeoutProcessor(archive_path, output, reset_db=False).close()
+    assert parsed == [set()]
+
+
+def test_catalog_feeds_every_activity_log(sample_takeout, output_dir, monkeypatch):
+    """
+    Every file of the takeout is cataloged by product, kind and size in
+    DuckDB, and the activity logs of all products are ingested, largest
+    first, not only a fixed list of products.
+    """
+    for product, entries in (("Búsqueda", 5), ("Maps", 2)):
+        os.makedirs(os.path.join(sample_takeout, "Mi actividad", product))
+        with open(os.path.join(sample_takeout, "Mi actividad", product, "MiActividad.html"), "w",
+                  encoding="utf-8") as f:
+            f.write('<html><body><div class="mdl-grid">')
+            for i in range(entries):
+                f.write(ACTIVITY_CELL.format(platform=product, i=i, channel=0, day=i + 1))
+            f.write('</div></body></html>')
+    os.makedirs(os.path.join(sample_takeout, "Fotos", "2024"))
+    with open(os.path.join(sample_takeout, "Fotos", "2024", "photo.jpg"), "wb") as f:
+        f.write(b"\xff\xd8" * 10)
+
+    monkeypatch.chdir(REPO_ROOT)
+    processor = GoogleTakeoutProcessor(sample_takeout, output_dir, reset_db=True)
+    assert [path.split(os.sep)[-2] for path in processor.activity_logs] == ["YouTube", "Búsqueda", "Maps"]
+    platforms = processor.query_data(
+        "SELECT platform::VARCHAR AS platform, COUNT(*) AS n FROM clean_activity_history GROUP BY 1 ORDER BY 1"
+    )
+    assert platforms.to_dict("records") == [
+        {"platform": "Búsqueda", "n": 5}, {"platform": "Maps", "n": 2}, {"platform": "YouTube", "n": 30},
+    ]
+    catalog = processor.query_data(
+        "SELECT relative_path, product, kind, format, size FROM takeout_catalog ORDER BY relative_path"
+    )
+    assert catalog[["relative_path", "product", "kind", "format"]].to_dict("records") == [
+        {"relative_path": "Fotos/2024/photo.jpg", "product": "Fotos", "kind": "other", "format": "jpg"},
+        {"relative_path": "Mi actividad/Búsqueda/MiActividad.html", "product": "Búsqueda",
+         "kind": "activity_log", "format": "html"},
+        {"relative_path": "Mi actividad/Maps/MiActividad.html", "product": "Maps",
+         "kind": "activity_log", "format": "html"},
+        {"relative_path": "Mi actividad/YouTube/MiActividad.html", "product": "YouTube",
+         "kind": "activity_log", "format": "html"},
+        {"relative_path": "Perfil/Perfil.json", "product": "Perfil", "kind": "profile_json", "format": "json"},
+    ]
+    assert catalog["size"].iloc[0] == 20
+    processor.close()
+
+
+def test_mapping_sort_key_orders_table(processor):
+    """Tables with a sort_by key in the mapping config are stored in that order."""
+    stored = processor.query_data("SELECT platform, activity_timestamp FROM clean_activity_history")
+    expected = stored.sort_values(["platform", "activity_timestamp"], kind="stable")
+    assert stored["activity_timestamp"].tolist() == expected["activity_timestamp"].tolist()
+
+
+def test_query_pages_and_stream(processor):
+    """
+    Ad-hoc queries are served page by page through opaque tokens, and
+    streamed in record batches without going past the row cap.
+    """
+    query = "SELECT link_action_text FROM clean_activity_history ORDER BY activity_timestamp;"
+    rows, token = [], None
+    while True:
+        page, token = processor.query_page(query, page_size=8, page_token=token)
+        assert len(page) <= 8
+        rows.extend(page["link_action_text"])
+        if token is None:
+            break
+    assert rows == processor.query_data(query)["link_action_text"].tolist()
+
+    with pytest.raises(ValueError):
+        processor.query_page("SELECT 1", page_token=processor.query_page(query, page_size=8)[1])
+
+    schema, batches = processor.stream_query(query, max_rows=25, batch_size=10)
+    assert schema.names == ["link_action_text"]
+    assert [batch.num_rows for batch in batches] == [10, 10, 5]
+    # The pooled cursor was released once the stream ended.
+    assert processor.connection_pool._slots._value == processor.connection_pool.pool_size
+
+
+def test_query_pages_of_any_statement(processor):
+    """
+    Queries ending in a -- comment are paged, and statements that cannot be
+    wrapped (PRAGMA, SHOW, EXPLAIN) come back as a single page.
+    """
+    page, token = processor.query_page(
+        "SELECT link_action_text FROM clean_activity_history ORDER BY 1 -- first videos", page_size=8
+    )
+    assert len(page) == 8 and token is not None
+    page, token = processor.query_page("PRAGMA table_info('clean_profiles')")
+    assert "GivenName" in page["name"].tolist() and token is None
+    page, token = processor.query_page("SHOW TABLES;")
+    assert "clean_activity_history" in page["name"].tolist() and token is None
+    page, token = processor.query_page("EXPLAIN SELECT * FROM clean_profiles")
+    assert not page.empty and token is None
+
+
+SLOW_QUERY = "SELECT COUNT(*) AS n FROM range(1000000000) a, range(1000) b WHERE a.range * b.range = 7"
+
+
+def test_query_time_limit_and_cancel(processor):
+    """
+    Queries past their time limit are interrupted with TimeoutError, running
+    queries can be cancelled by id, and the cursor keeps working afterwards.
+    """
+    with pytest.raises(TimeoutError):
+        processor.query_data(SLOW_QUERY, use_cache=False, time_limit=0.2)
+
+    errors = []
+
+    def run_slow():
+        try:
+            processor.query_data(SLOW_QUERY, use_cache=False, query_id="slow-1")
+        except Exception as e:
+            errors.append(e)
+
+    worker = threading.Thread(target=run_slow, daemon=True)
+    worker.start()
+    while not processor.cancel_query("slow-1"):
+        assert worker.is_alive()
+        time.sleep(0.01)
+    worker.join(timeout=10)
+    assert not worker.is_alive()
+    assert [type(e).__name__ for e in errors] == ["QueryCancelledError"]
+
+    assert processor.cancel_query("slow-1") is False
+    assert processor.query_data("SELECT 1 AS one", use_cache=False)["one"].iloc[0] == 1
+    settings = processor.query_data(
+        "SELECT current_setting('threads') AS threads", use_cache=False
+    )
+    assert settings["threads"].iloc[0] == int(processor.connection_pool.settings["threads"])
+
+
+def test_stream_interrupted_mid_stream(processor):
+    """
+    A stream interrupted while its batches are being fetched raises
+    TimeoutError or QueryCancelledError, not pyarrow's OSError, and
+    releases its cursor.
+    """
+    def consume(batches):
+        for _ in batches:
+            time.sleep(0.005)
+
+    _, batches = processor.stream_query("SELECT * FROM range(100000000)", batch_size=1000, time_limit=0.5)
+    with pytest.raises(TimeoutError):
+        consume(batches)
+
+    _, batches = processor.stream_query(
+        "SELECT * FROM range(100000000)", batch_size=1000, query_id="stream-1", time_limit=None
+    )
+    next(batches)
+    assert processor.cancel_query("stream-1")
+    with pytest.raises(QueryCancelledError):
+        consume(batches)
+
+    assert processor.connection_pool._slots._value == processor.connection_pool.pool_size
+    assert processor.query_data("SELECT 1 AS one", use_cache=False)["one"].iloc[0] == 1
+
+
+def test_submitted_query_pages(processor):
+    """
+    Ad-hoc pages run as executor jobs whose id is also the query id, and
+    dashboard queries run on the executor too.
+    """
+    job = processor.submit_query_page(
+        "SELECT COUNT(*) AS n FROM clean_activity_history", query_id="page-1"
+    )
+    page, next_token = job.result(timeout=10)
+    assert job.id == "page-1"
+    assert page["n"].iloc[0] == 30 and next_token is None
+    assert processor.query_executor.get("page-1").status == "done"
+
+    assert processor.run_query("profile_name")["name"].iloc[0] == "John Doe"
+    assert processor.query_executor.stats()["jobs"]["done"] == 2
@@ -1,21 +1,17 @@
+import io
 import os
+import sys
+import json
+import pickle
+import tarfile
+import subprocess
 import pytest
-import tempfile
-import shutil
+import duckdb
 import pandas as pd
 
 from app.data_preprocessor import DataPreprocessor
-
-
-@pytest.fixture
-def temporary_dir():
-    """
-    Create a temporary directory for testing files and return its path.
-    Clean up after tests complete.
-    """
-    temp_dir = tempfile.mkdtemp()
-    yield temp_dir
-    shutil.rmtree(temp_dir)
+from app.json_stream import iter_json_array
+from app.takeout_source import ArchiveSource
 
 
 @pytest.fixture
@@ -71,6 +67,9 @@ def test_parse_date(data_preprocessor_instance):
     result = dp.parse_date(date_str, lang='es')
     assert result == "2023-01-01 12:30:00", "Should parse Spanish months to correct datetime."
 
+    dp.lang = 'en'
+    assert dp.parse_date("Jan 1, 2023, 12:30:00 PM CET") == "2023-01-01 12:30:00"
+
 
 def test_parse_profile_file(data_preprocessor_instance):
     """
@@ -154,3 +153,411 @@ def test_load_all_datasets(data_preprocessor_instance):
     assert isinstance(results, dict), "Should return a dictionary of DataFrames."
     assert "person_info" in results, "person_info should be included if profile is parsed."
     assert not results["person_info"].empty, "person_info DataFrame should not be empty."
+
+
+@pytest.fixture
+def sample_activity_html(temporary_dir):
+    """
+    Create a MiActividad.html-like file covering the shapes seen in real
+    takeouts: multiple links, entities, <br> separators and a missing title.
+    Returns the file path.
+    """
+    cell = (
+        '<div class="outer-cell mdl-cell mdl-cell--12-col mdl-shadow--2dp">'
+        '<div class="mdl-grid">'
+        '<div class="header-cell mdl-cell mdl-cell--12-col">'
+        '<p class="mdl-typography--title">{platform}<br></p></div>'
+        '<div class="content-cell mdl-cell mdl-cell--6-col mdl-typography--body-1">'
+        '{body}</div>'
+        '<div class="content-cell mdl-cell mdl-cell--6-col mdl-typography--body-1 '
+        'mdl-typography--text-right"></div>'
+        '<div class="content-cell mdl-cell mdl-cell--12-col mdl-typography--caption">'
+        '<b>Productos:</b><br>&emsp;{platform}<br></div>'
+        '</div></div>'
+    )
+    bodies = [
+        ('YouTube', 'Has visto\xa0<a href="https://www.youtube.com/watch?v=1">Vídeo &amp; más</a><br>'
+                    '<a href="https://www.youtube.com/channel/c1">Canal Uno</a><br>'
+                    '17 ene 2024, 10:22:33 CET'),
+        ('YouTube', 'Has buscado\xa0<a href="https://www.youtube.com/results?q=x">x</a><br>'
+                    '02 feb 2023, 08:00:00 CET'),
+        ('Drive', 'Has usado Drive<br>03 mar 2023, 10:00:00 CET'),
+        ('Takeout', 'Has visitado <a href="https://a.example/1">uno</a> y '
+                    '<a href="https://b.example/2"><span>dos</span></a> con '
+                    '<a href="https://c.example/3">tres</a><br>01 dic 2022, 23:59:59 CET'),
+    ]
+    html = '<html><head><title>Mi actividad</title></head><body><div class="mdl-grid">'
+    html += ''.join(cell.format(platform=p, body=b) for p, b in bodies)
+    html += (
+        '<div class="outer-cell mdl-cell mdl-cell--12-col mdl-shadow--2dp">'
+        '<div class="content-cell mdl-cell mdl-cell--6-col mdl-typography--body-1">'
+        'Sin título<br>04 abr 2023, 10:00:00 CET</div></div>'
+    )
+    html += '</div></body></html>'
+
+    file_path = os.path.join(temporary_dir, "MiActividad.html")
+    with open(file_path, "w", encoding="utf-8") as f:
+        f.write(html)
+    return file_path
+
+
+def test_html_engine_parity(data_preprocessor_instance, sample_activity_html):
+    """
+    The lxml engine must emit exactly the records of the BeautifulSoup
+    reference engine.
+    """
+    dp = data_preprocessor_instance
+    with open(sample_activity_html, "r", encoding="utf-8") as f:
+        html_content = f.read()
+
+    dp.html_engine = 'bs4'
+    reference = dp._extract_html_chunk_data(html_content)
+    dp.html_engine = 'lxml'
+    fast = dp._extract_html_chunk_data(html_content)
+
+    assert len(reference["platform"]) == 5
+    assert fast == reference
+    assert reference["channel_name"][0] == "Canal Uno"
+    assert reference["platform"][4] is None
+
+
+def test_unsupported_html_engine(sample_profile_json):
+    """
+    Unknown extraction engines should be rejected at construction time.
+    """
+    with pytest.raises(ValueError):
+        DataPreprocessor(profile_path=sample_profile_json, html_engine='regex')
+
+
+def test_record_ranges_never_split_entries(data_preprocessor_instance, sample_activity_html,
+                                           monkeypatch):
+    """
+    Byte ranges must tile the file and only start at an outer-cell div, so
+    parsing with chunks smaller than one entry still yields every entry.
+    """
+    dp = data_preprocessor_instance
+    file_size = os.path.getsize(sample_activity_html)
+    ranges = dp._find_record_ranges(sample_activity_html, chunk_size=64)
+
+    assert ranges[0][0] == 0
+    assert sum(length for _, length in ranges) == file_size
+    with open(sample_activity_html, "rb") as f:
+        content = f.read()
+    for offset, _ in ranges[1:]:
+        assert content[offset:].startswith(b'<div class="outer-cell')
+
+    monkeypatch.setattr(DataPreprocessor, "_calculate_chunk_size", lambda self, factor=None: 64)
+    df = dp.read_activity_html(sample_activity_html)
+    assert len(df) == 5, "No activity entry should be split or lost."
+
+
+def test_html_transports_agree(data_preprocessor_instance, sample_activity_html):
+    """
+    The mmap and shared_memory transports must hand workers the same bytes.
+    """
+    dp = data_preprocessor_instance
+    frames = {}
+    for transport in DataPreprocessor.HTML_TRANSPORTS:
+        dp.html_transport = transport
+        frames[transport] = dp.read_activity_html(sample_activity_html)
+
+    assert len(frames['mmap']) == 5
+    pd.testing.assert_frame_equal(
+        frames['mmap'].sort_values("timestamp").reset_index(drop=True),
+        frames['shared_memory'].sort_values("timestamp").reset_index(drop=True)
+    )
+
+
+def test_worker_tasks_do_not_carry_the_archive(temporary_dir):
+    """
+    The copy of the preprocessor sent with every pool task leaves out the
+    tar members the archive source keeps in memory, including through the
+    parse cache's digest.
+    """
+    archive_path = os.path.join(temporary_dir, "takeout.tgz")
+    with tarfile.open(archive_path, "w:gz") as archive:
+        data = os.urandom(1 << 20)
+        info = tarfile.TarInfo("Takeout/Calendar/big.ics")
+        info.size = len(data)
+        archive.addfile(info, io.BytesIO(data))
+    source = ArchiveSource(archive_path, spool=lambda path: True)
+    assert source.spooled
+    dp = DataPreprocessor(output_folder=temporary_dir, source=source)
+    assert len(pickle.dumps(dp._for_workers()._extract_html_range_data)) < 10_000
+
+
+def test_shared_memory_workers_leave_no_leaks(sample_activity_html, temporary_dir):
+    """
+    Activity logs read through shared memory by forked workers leave no
+    block behind for the resource tracker to report as leaked.
+    """
+    script = (
+        "import multiprocessing\n"
+        "from app.data_preprocessor import DataPreprocessor\n"
+        "multiprocessing.set_start_method('fork')\n"
+        f"paths = [{sample_activity_html!r}] * 3\n"
+        "dp = DataPreprocessor(html_chunk_factor=2, max_threads=2, html_transport='shared_memory',\n"
+        f"                     output_folder={temporary_dir!r}, use_parse_cache=False)\n"
+        "print(sum(len(df) for df in dp.read_activity_logs(paths).values()))\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", script], capture_output=True, text=True, timeout=120,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    )
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "5"
+    assert "resource_tracker" not in result.stderr
+
+
+def test_all_strings_column_is_optional(data_preprocessor_instance, sample_activity_html):
+    """
+    The "all" column is only produced when include_all_strings is enabled.
+    """
+    dp = data_preprocessor_instance
+    df = dp.read_activity_html(sample_activity_html)
+    assert "all" not in df.columns
+
+    dp.include_all_strings = True
+    df = dp.read_activity_html(sample_activity_html)
+    assert "all" in df.columns
+    assert "Canal Uno" in list(df.sort_values("timestamp")["all"].iloc[-1])
+
+
+def test_load_all_datasets_uses_parse_cache(data_preprocessor_instance, sample_activity_html,
+                                            monkeypatch):
+    """
+    A second load of an unchanged activity log is served from the parse
+    cache, and clear_cache forces a fresh parse.
+    """
+    dp = data_preprocessor_instance
+    dp.activity_log_paths = [sample_activity_html]
+    calls = []
+    original_read = DataPreprocessor.read_activity_html
+
+    def counting_read(self, file_path):
+        calls.append(file_path)
+        return original_read(self, file_path)
+
+    monkeypatch.setattr(DataPreprocessor, "read_activity_html", counting_read)
+
+    first = dp.load_all_datasets(["activity_logs"])["activity_logs"]
+    second = dp.load_all_datasets(["activity_logs"])["activity_logs"]
+    assert len(calls) == 1
+    assert len(second) == len(first) == 5
+
+    dp.clear_cache()
+    dp.load_all_datasets(["activity_logs"])
+    assert len(calls) == 2
+
+
+def test_parse_timestamps(data_preprocessor_instance, capsys):
+    """
+    The vectorized parser applies timezone suffixes, returns naive UTC
+    datetime64 values and maps unparseable entries to NaT. Unknown
+    timezones keep the wall-clock time and are reported once.
+    """
+    dp = data_preprocessor_instance
+    result = dp.parse_timestamps([
+        "17 ene 2024, 10:22:33 CET",
+        "1 jul 2023, 9:05:00 CEST",
+        "3 sept 2023, 10:00:00 GMT+02:00",
+        "17 ene 2024, 10:22:33 CET",
+        "not a date",
+        "3 sep 2023, 10:00:00 XYZ",
+        "4 sep 2023, 11:00:00 XYZ",
+    ], lang='es')
+
+    assert str(result.dtype).startswith("datetime64")
+    assert list(result[:4]) == [
+        pd.Timestamp("2024-01-17 09:22:33"),
+        pd.Timestamp("2023-07-01 07:05:00"),
+        pd.Timestamp("2023-09-03 08:00:00"),
+        pd.Timestamp("2024-01-17 09:22:33"),
+    ]
+    assert pd.isna(result[4])
+    assert list(result[5:]) == [pd.Timestamp("2023-09-03 10:00:00"), pd.Timestamp("2023-09-04 11:00:00")]
+    assert capsys.readouterr().out.count("'XYZ'") == 1
+
+
+def test_english_locale_timestamps_and_actions(data_preprocessor_instance):
+    """
+    English takeouts use month-first, 12-hour timestamps; action codes are
+    classified into language-independent action types.
+    """
+    dp = data_preprocessor_instance
+    result = dp.parse_timestamps(
+        ["Jan 17, 2024, 10:22:33 PM CET", "Dec 1, 2023, 12:05:00 AM UTC"], lang='en'
+    )
+    assert list(result) == [pd.Timestamp("2024-01-17 21:22:33"), pd.Timestamp("2023-12-01 00:05:00")]
+    assert dp.parse_date("Jan 17, 2024, 10:22:33 PM CET", lang='en') == "2024-01-17 22:22:33"
+
+    dp.lang = 'en'
+    assert dp._classify_actions(["Watched", "Something else"]).to_pylist() == ["watched", None]
+
+
+@pytest.fixture
+def sample_calendar_dir(temporary_dir):
+    """
+    Create a calendar folder with two ICS files covering timezone-aware,
+    UTC and all-day events, a folded line and a nested VALARM.
+    Returns the folder path.
+    """
+    calendar_dir = os.path.join(temporary_dir, "calendar_files")
+    os.makedirs(calendar_dir)
+    work = (
+        "BEGIN:VCALENDAR\r\nVERSION:2.0\r\n"
+        "BEGIN:VEVENT\r\nSUMMARY:Planning with a very long title that gets\r\n"
+        "  folded\r\nDTSTART;TZID=Europe/Madrid:20230110T100000\r\n"
+        "DTEND;TZID=Europe/Madrid:20230110T113000\r\n"
+        "ORGANIZER:mailto:boss@example.com\r\n"
+        "BEGIN:VALARM\r\nACTION:DISPLAY\r\nTRIGGER:-PT10M\r\nEND:VALARM\r\n"
+        "END:VEVENT\r\n"
+        "BEGIN:VEVENT\r\nSUMMARY:Retro\r\nDTSTART:20230111T150000Z\r\n"
+        "DTEND:20230111T160000Z\r\nEND:VEVENT\r\n"
+        "END:VCALENDAR\r\n"
+    )
+    personal = (
+        "BEGIN:VCALENDAR\r\nVERSION:2.0\r\n"
+        "BEGIN:VEVENT\r\nSUMMARY:Holiday\r\nDTSTART;VALUE=DATE:20230801\r\n"
+        "DTEND;VALUE=DATE:20230815\r\nEND:VEVENT\r\n"
+        "END:VCALENDAR\r\n"
+    )
+    for name, content in (("work.ics", work), ("personal.ics", personal)):
+        with open(os.path.join(calendar_dir, name), "w", encoding="utf-8") as f:
+            f.write(content)
+    return calendar_dir
+
+
+def test_streaming_ics_matches_reference(data_preprocessor_instance, sample_calendar_dir):
+    """
+    The streaming VEVENT scanner yields the same events as parse_ics,
+    with start/end normalized to naive UTC.
+    """
+    dp = data_preprocessor_instance
+    path = os.path.join(sample_calendar_dir, "work.ics")
+    reference = dp.parse_ics(path)
+    batches = list(dp.iter_ics_batches(path, batch_size=1))
+
+    assert len(batches) == len(reference) == 2
+    rows = [row for batch in batches for row in batch.to_pylist()]
+    assert [row["Title"] for row in rows] == [str(event["Title"]) for event in reference]
+    assert rows[0]["Title"] == "Planning with a very long title that gets folded"
+    assert rows[0]["Start"] == pd.Timestamp("2023-01-10 09:00:00")
+    assert rows[0]["Duration"] == pd.Timedelta(minutes=90)
+    assert rows[0]["Organizer"] == "boss@example.com"
+
+
+def test_streaming_ics_uses_file_timezones(data_preprocessor_instance, temporary_dir):
+    """
+    TZIDs that are not Olson names resolve against the VTIMEZONE
+    definitions of the file, wherever they are, like parse_ics does.
+    """
+    definition = (
+        "BEGIN:VTIMEZONE\r\nTZID:Streaming Test Plus Five\r\n"
+        "BEGIN:STANDARD\r\nDTSTART:19700101T000000\r\nTZOFFSETFROM:+0500\r\n"
+        "TZOFFSETTO:+0500\r\nEND:STANDARD\r\nEND:VTIMEZONE\r\n"
+    )
+    event = (
+        "BEGIN:VEVENT\r\nSUMMARY:{title}\r\n"
+        "DTSTART;TZID=Streaming Test Plus Five:20240110T100000\r\n"
+        "DTEND;TZID=Streaming Test Plus Five:20240110T110000\r\nEND:VEVENT\r\n"
+    )
+    path = os.path.join(temporary_dir, "custom.ics")
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write("BEGIN:VCALENDAR\r\nVERSION:2.0\r\n" + event.format(title="Before")
+                + definition + event.format(title="After") + "END:VCALENDAR\r\n")
+    dp = data_preprocessor_instance
+
+    # Streamed first, before icalendar has cached the zone in this process.
+    rows = [row for batch in dp.iter_ics_batches(path) for row in batch.to_pylist()]
+    reference = dp.parse_ics(path)
+    assert sorted(row["Title"] for row in rows) == ["After", "Before"]
+    assert [row["Start"] for row in rows] == [pd.Timestamp("2024-01-10 05:00:00")] * 2
+    assert {dp._to_utc_naive(event["Start"]) for event in reference} == {rows[0]["Start"]}
+
+
+def test_load_all_datasets_parses_calendars_in_parallel(data_preprocessor_instance,
+                                                        sample_calendar_dir):
+    """
+    Every ICS file of the calendar folder is parsed (through the process
+    pool) into one typed calendar_events DataFrame.
+    """
+    dp = data_preprocessor_instance
+    events = dp.load_all_datasets(["calendar_events"])["calendar_events"]
+
+    assert len(events) == 3
+    assert set(events["Calendar"]) == {"work", "personal"}
+    holiday = events[events["Title"] == "Holiday"].iloc[0]
+    assert holiday["Start"] == pd.Timestamp("2023-08-01")
+    assert holiday["Duration"] == pd.Timedelta(days=14)
+
+
+@pytest.fixture
+def sample_chrome_history(temporary_dir):
+    """Write a Chrome history JSON with an extra top-level member before the visits."""
+    visits = [
+        {"favicon_url": f"https://site{i}.com/favicon.ico", "page_transition_qualifier": "CLIENT_REDIRECT",
+         "title": f"Página {i} \"quoted\" [x]", "url": f"https://site{i}.com/a?b={i}",
+         "time_usec": 1700000000000000 + i, "client_id": "abc"}
+        for i in range(25)
+    ]
+    visits[3]["time_usec"] = str(visits[3]["time_usec"])
+    del visits[4]["title"]
+    path = os.path.join(temporary_dir, "Historial.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"Other": {"nested": [1, 2, {"Browser History": []}]}, "Browser History": visits}, f,
+                  ensure_ascii=False, indent=1)
+    return path, visits
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 13, 39, 1 << 20])
+def test_iter_json_array_streams_elements(sample_chrome_history, temporary_dir, chunk_size):
+    """
+    Array elements are decoded one by one, whatever the read chunk size,
+    also when a chunk boundary cuts a number after "." or "e".
+    """
+    path, visits = sample_chrome_history
+    assert list(iter_json_array(path, "Browser History", chunk_size=chunk_size)) == visits
+    assert list(iter_json_array(path, "Missing", chunk_size=chunk_size)) == []
+
+    numbers_path = os.path.join(temporary_dir, "numbers.json")
+    with open(numbers_path, "w", encoding="utf-8") as f:
+        f.write('{"Browser History":[{"a":1},1.5,-2.25e3,7E-2,10],"z":1.5,"w":3e2}')
+    assert list(iter_json_array(numbers_path, "Browser History", chunk_size=chunk_size)) == [
+        {"a": 1}, 1.5, -2250.0, 0.07, 10
+    ]
+    assert list(iter_json_array(numbers_path, "w", chunk_size=chunk_size)) == []
+
+
+def test_chrome_history_batches(data_preprocessor_instance, sample_chrome_history):
+    """
+    Chrome visits are streamed as bounded, typed record batches that DuckDB
+    scans through the stream reader.
+    """
+    path, visits = sample_chrome_history
+    dp = data_preprocessor_instance
+    batches = list(dp.iter_chrome_history_batches(path, batch_size=10))
+    assert [batch.num_rows for batch in batches] == [10, 10, 5]
+    rows = [row for batch in batches for row in batch.to_pylist()]
+    assert [row["time_usec"] for row in rows] == [1700000000000000 + i for i in range(25)]
+    assert rows[4]["title"] is None
+    assert rows[0]["page_transition"] is None
+
+    conn = duckdb.connect()
+    with dp.open_stream_reader("chrome_history", path, batch_size=4) as reader:
+        conn.register("raw_chrome_history", reader)
+        count, max_usec = conn.execute("SELECT COUNT(*), MAX(time_usec) FROM raw_chrome_history").fetchone()
+    assert (count, max_usec) == (25, 1700000000000024)
+    with pytest.raises(ValueError):
+        with dp.open_stream_reader("nope", path):
+            pass
+
+    # A mapping failing midway still closes the file.
+    opened = []
+    open_file = dp.source.open
+    dp.source.open = lambda file_path: opened.append(open_file(file_path)) or opened[-1]
+    with pytest.raises(RuntimeError):
+        with dp.open_stream_reader("chrome_history", path, batch_size=4) as reader:
+            reader.read_next_batch()
+            raise RuntimeError("mapping failed")
+    assert len(opened) == 1 and opened[0].closed
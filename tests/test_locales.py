@@ -0,0 +1,43 @@
+import os
+import pytest
+import shutil
+
+from app.locales import get_locale_tables, detect_locale, timezone_offset_minutes
+
+
+def test_month_tables_are_built_from_babel():
+    """
+    Month tables include babel's abbreviated and wide names plus
+    unambiguous 3-letter prefixes, and are cached per locale.
+    """
+    es = get_locale_tables('es')
+    assert es.months['ene'] == 1
+    assert es.months['sept'] == es.months['sep'] == es.months['septiembre'] == 9
+    assert get_locale_tables('en').months['dec'] == 12
+    assert get_locale_tables('es') is es
+
+
+def test_unknown_locale_is_rejected():
+    """Unsupported locale codes raise a ValueError."""
+    with pytest.raises(ValueError):
+        get_locale_tables('xx')
+
+
+def test_detect_locale(temporary_dir):
+    """A takeout is detected from its localized folder names."""
+    os.makedirs(os.path.join(temporary_dir, "My Activity"))
+    os.makedirs(os.path.join(temporary_dir, "Profile"))
+    assert detect_locale(temporary_dir) == 'en'
+
+    shutil.rmtree(os.path.join(temporary_dir, "My Activity"))
+    shutil.rmtree(os.path.join(temporary_dir, "Profile"))
+    os.makedirs(os.path.join(temporary_dir, "Mi actividad"))
+    assert detect_locale(temporary_dir) == 'es'
+
+
+def test_timezone_offset_minutes():
+    """Abbreviations and numeric offsets resolve; unknown tokens do not."""
+    assert timezone_offset_minutes('CEST') == 120
+    assert timezone_offset_minutes('GMT-05:30') == -330
+    assert timezone_offset_minutes(None) == 0
+    assert timezone_offset_minutes('XYZ') is None
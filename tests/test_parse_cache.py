@@ -0,0 +1,58 @@
+import os
+import pytest
+import shutil
+import pandas as pd
+
+from app.parse_cache import ParseCache
+
+
+@pytest.fixture
+def source_file(temporary_dir):
+    """Create a small source file and return its path."""
+    path = os.path.join(temporary_dir, "source.html")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("<div>source</div>")
+    return path
+
+
+def test_get_or_parse_hits_on_same_content(temporary_dir, source_file):
+    """
+    A second parse of identical content, even under another path, is served
+    from the cache; changing an output option misses.
+    """
+    cache = ParseCache(os.path.join(temporary_dir, "cache"))
+    calls = []
+
+    def parse(path):
+        calls.append(path)
+        return pd.DataFrame({"value": [1, 2, 3]})
+
+    first = cache.get_or_parse(source_file, "html", parse, lang="es")
+    copy_path = os.path.join(temporary_dir, "copy.html")
+    shutil.copy(source_file, copy_path)
+    second = cache.get_or_parse(copy_path, "html", parse, lang="es")
+
+    assert calls == [source_file]
+    pd.testing.assert_frame_equal(first, second)
+
+    cache.get_or_parse(source_file, "html", parse, lang="en")
+    assert len(calls) == 2
+
+
+def test_eviction_and_clear(temporary_dir, source_file):
+    """
+    The least recently used entry is evicted once the cache exceeds its
+    cap, and clear() removes everything.
+    """
+    cache = ParseCache(os.path.join(temporary_dir, "cache"))
+    frame = pd.DataFrame({"value": list(range(100))})
+    cache.put("old", frame)
+    os.utime(cache._entry_path("old"), (1, 1))
+    cache.max_bytes = cache.size() + 1
+    cache.put("new", frame)
+
+    assert cache.get("old") is None
+    assert cache.get("new") is not None
+
+    cache.clear()
+    assert cache.size() == 0
@@ -0,0 +1,71 @@
+import os
+import random
+from datetime import datetime, timedelta
+
+import duckdb
+import pandas as pd
+import pytest
+
+from app.queries import get_query, route_activity_query, rollup_bounds
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def activity_db():
+    """
+    In-memory database with a random clean_activity_history spanning
+    several months, plus the rollup tables built from it.
+    """
+    rng = random.Random(7)
+    base = datetime(2023, 11, 20)
+    rows = pd.DataFrame({
+        "platform": [rng.choice(["YouTube", "Drive", "Takeout"]) for _ in range(5000)],
+        "action_code": [rng.choice(["Has visto", "Has buscado"]) for _ in range(5000)],
+        "activity_timestamp": [
+            base + timedelta(seconds=rng.randrange(120 * 24 * 3600)) for _ in range(5000)
+        ],
+    })
+    conn = duckdb.connect()
+    conn.register("rows", rows)
+    conn.execute("CREATE TABLE clean_activity_history AS SELECT * FROM rows")
+    with open(os.path.join(REPO_ROOT, "mappings", "rollup_activity_history.sql")) as f:
+        conn.execute(f.read())
+    yield conn
+    conn.close()
+
+
+def _run(conn, name, params):
+    return conn.execute(get_query(name), params).df()
+
+
+@pytest.mark.parametrize("start_date, end_date, platforms", [
+    (None, None, None),
+    ("2023-12-01", "2024-02-29T23:59:59.999999", None),
+    ("2023-11-25T13:45:00", "2024-03-02T08:00:00", ["YouTube"]),
+    ("2024-01-10T01:00:00", "2024-01-10T22:00:00", ["Drive", "Takeout"]),
+    ("2024-01-03", "2024-01-20", None),
+    ("2024-02-01", "2024-01-01", None),
+])
+def test_rollup_routes_match_full_scan(activity_db, start_date, end_date, platforms):
+    """
+    Rollup variants (rollups plus edge scans) return exactly what the
+    full-scan queries return, for aligned, unaligned and empty ranges.
+    """
+    for name in ("kpi_by_platform", "monthly_timeline"):
+        expected = _run(activity_db, *route_activity_query(
+            name, platforms, start_date, end_date, use_rollups=False))
+        routed_name, params = route_activity_query(name, platforms, start_date, end_date)
+        assert routed_name == f"{name}_rollup"
+        actual = _run(activity_db, routed_name, params)
+        pd.testing.assert_frame_equal(actual, expected, check_dtype=False)
+
+
+def test_rollup_bounds_split_whole_days_and_months():
+    """Bounds are ordered and cut at day and month boundaries."""
+    bounds = rollup_bounds("2024-01-10T12:00:00", "2024-03-05T23:59:59.999999")
+    assert bounds == {
+        "s": datetime(2024, 1, 10, 12), "d0": datetime(2024, 1, 11),
+        "m0": datetime(2024, 2, 1), "m1": datetime(2024, 3, 1),
+        "d1": datetime(2024, 3, 6), "e": datetime(2024, 3, 5, 23, 59, 59, 999999),
+    }
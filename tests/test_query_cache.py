@@ -0,0 +1,57 @@
+import time
+import pandas as pd
+
+from app.query_cache import QueryResultCache, normalize_sql
+
+
+def test_normalize_sql_keeps_literals():
+    """Whitespace collapses outside quoted literals only."""
+    assert normalize_sql("SELECT  *\n FROM t ;") == "SELECT * FROM t"
+    assert normalize_sql("SELECT 'a   b'") == "SELECT 'a   b'"
+
+
+def test_hits_misses_and_parameters():
+    """
+    Equivalent SQL hits the same entry; different parameters do not.
+    Counters track every lookup.
+    """
+    cache = QueryResultCache()
+    calls = []
+
+    def execute():
+        calls.append(1)
+        return pd.DataFrame({"n": [len(calls)]})
+
+    cache.get_or_execute("SELECT n FROM clean_x WHERE a = $a", {"a": 1}, execute)
+    cached = cache.get_or_execute("SELECT n\n  FROM clean_x WHERE a = $a;", {"a": 1}, execute)
+    cache.get_or_execute("SELECT n FROM clean_x WHERE a = $a", {"a": 2}, execute)
+
+    assert len(calls) == 2
+    assert cached["n"].iloc[0] == 1
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 2, 2)
+
+
+def test_budget_ttl_and_invalidation(monkeypatch):
+    """
+    Entries are evicted LRU-first to fit the memory budget, expire after
+    the TTL, and are dropped when a referenced table is rebuilt.
+    """
+    frame = pd.DataFrame({"n": list(range(1000))})
+    size = int(frame.memory_usage(deep=True, index=True).sum())
+    cache = QueryResultCache(max_bytes=2 * size, ttl=60)
+
+    cache.put("SELECT * FROM clean_a", None, frame)
+    cache.put("SELECT * FROM clean_b", None, frame)
+    cache.get("SELECT * FROM clean_a", None)
+    cache.put("SELECT * FROM clean_c", None, frame)
+    assert cache.get("SELECT * FROM clean_b", None) is None
+    assert cache.stats()["evictions"] == 1
+
+    cache.invalidate(["clean_a"])
+    assert cache.get("SELECT * FROM clean_a", None) is None
+    assert cache.get("SELECT * FROM clean_c", None) is not None
+
+    now = time.monotonic()
+    monkeypatch.setattr("app.query_cache.time.monotonic", lambda: now + 120)
+    assert cache.get("SELECT * FROM clean_c", None) is None
@@ -0,0 +1,60 @@
+import time
+import threading
+
+import pytest
+
+from app.query_executor import QueryExecutor, ExecutorBusyError, DASHBOARD, ADHOC
+
+
+@pytest.fixture
+def executor():
+    """Two workers, one of them reserved for dashboard jobs."""
+    executor = QueryExecutor(workers=2, reserved_workers=1, max_pending=2)
+    yield executor
+    executor.shutdown()
+
+
+@pytest.fixture
+def blocking_job(executor):
+    """An ad-hoc job occupying the shared worker until the test ends."""
+    release = threading.Event()
+    job = executor.submit(release.wait, priority=ADHOC)
+    while job.status != "running":
+        time.sleep(0.001)
+    yield job
+    release.set()
+
+
+def test_dashboard_jobs_bypass_long_adhoc_jobs(executor, blocking_job):
+    """
+    A long ad-hoc job holds the only shared worker; dashboard jobs still run
+    on the reserved worker while further ad-hoc jobs wait in their queue.
+    """
+    queued = executor.submit(lambda: "adhoc", priority=ADHOC)
+
+    assert executor.run(lambda: "dashboard", priority=DASHBOARD, timeout=5) == "dashboard"
+    assert queued.status == "queued"
+    assert blocking_job.status == "running"
+
+
+def test_backpressure_and_cancel(executor, blocking_job):
+    """Full queues reject jobs; queued jobs can be cancelled by id."""
+    first = executor.submit(lambda: 1, priority=ADHOC, job_id="first")
+    executor.submit(lambda: 2, priority=ADHOC)
+    with pytest.raises(ExecutorBusyError):
+        executor.submit(lambda: 3, priority=ADHOC)
+
+    assert executor.cancel("first")
+    assert first.status == "cancelled"
+    assert not executor.cancel("first")
+    assert executor.stats()["queued"][ADHOC] == 1
+
+
+def test_job_errors_are_kept():
+    """Exceptions raised by a job are re-raised to whoever reads its result."""
+    executor = QueryExecutor(workers=1, reserved_workers=0)
+    job = executor.submit(lambda: 1 / 0)
+    with pytest.raises(ZeroDivisionError):
+        job.result(timeout=5)
+    assert job.status == "failed"
+    executor.shutdown()
@@ -0,0 +1,48 @@
+import pyarrow as pa
+import pytest
+
+from app.query_results import (
+    encode_page_token, decode_page_token, clamp_page_size, prepare_user_query, is_pageable,
+    iter_ndjson, iter_arrow_ipc, MAX_PAGE_SIZE,
+)
+
+
+def test_page_tokens_are_bound_to_their_query():
+    """Tokens round-trip for the same (normalized) query and are rejected otherwise."""
+    token = encode_page_token("SELECT * FROM t", 400)
+    assert decode_page_token("SELECT *\n  FROM t", token) == 400
+    assert decode_page_token("SELECT * FROM t", None) == 0
+    with pytest.raises(ValueError):
+        decode_page_token("SELECT * FROM u", token)
+    with pytest.raises(ValueError):
+        decode_page_token("SELECT * FROM t", "not-a-token")
+
+
+def test_page_size_and_query_cleanup():
+    """Page sizes are capped and trailing semicolons are dropped."""
+    assert clamp_page_size(10 ** 9) == MAX_PAGE_SIZE
+    assert clamp_page_size(0) == 1
+    assert prepare_user_query("  SELECT 1 ;; ") == "SELECT 1"
+    with pytest.raises(ValueError):
+        prepare_user_query(" ; ")
+
+
+def test_pageable_statements():
+    """SELECT-like statements can be wrapped for paging, even behind comments."""
+    assert is_pageable("-- recent\n/* all */ WITH t AS (SELECT 1) SELECT * FROM t")
+    assert is_pageable("FROM t") and is_pageable("(SELECT 1)")
+    assert not is_pageable("PRAGMA table_info('t')")
+    assert not is_pageable("  explain SELECT 1")
+    assert not is_pageable("SHOW TABLES")
+
+
+def test_stream_encoders():
+    """NDJSON and Arrow IPC chunks decode back to the original rows."""
+    batch = pa.record_batch({"a": [1, 2], "b": ["x", None]})
+    ndjson = b"".join(iter_ndjson([batch, batch]))
+    assert ndjson.decode("utf-8").splitlines()[1] == '{"a": 2, "b": null}'
+
+    ipc = b"".join(iter_arrow_ipc(batch.schema, [batch, batch]))
+    table = pa.ipc.open_stream(ipc).read_all()
+    assert table.num_rows == 4
+    assert table.column("b").to_pylist() == ["x", None, "x", None]